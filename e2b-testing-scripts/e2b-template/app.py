@@ -5,21 +5,42 @@
 2. /sum - 返回文件数量
 3. /action - 创建文件并写入模拟新闻内容，支持文件数量管理
 4. /search - 使用浏览器访问 Google 并进行随机搜索
-5. /terminal - 执行随机终端命令
-6. /network - 执行网络 I/O 操作
+5. /browser - 基于本地页面集的浏览器负载场景（多标签页、滚动、截图、PDF、SPA）
+6. /terminal - 执行随机终端命令
+7. /network - 执行网络 I/O 操作
+8. Blob 服务（独立端口 BLOB_PORT）- GET /blob/{size} 下载（优先 sendfile 零拷贝）、PUT /blob 流式上传
+9. /ws/echo - WebSocket 回显（可选附加服务端时间戳）
+10. /idle/sse、/idle/stats - 保持大量空闲 SSE 长连接并统计连接数和内存
+11. /stats/resources - 每个接口的资源消耗滚动平均（每个响应另带 X-Res-* 头）
+12. /debug/profile - 按需采样分析（默认关闭，DEBUG_PROFILING=1 开启）
+13. /load/status、/load/target、/load/control - 负载控制服务的状态查询和控制（经 Unix socket 立即生效）
 """
 
-from fastapi import FastAPI, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, HTTPException, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import JSONResponse, StreamingResponse, PlainTextResponse
+from fastapi.staticfiles import StaticFiles
 import aiofiles
 import asyncio
 import os
 import random
+import shutil
 import subprocess
+import uuid
+import zipfile
+import hashlib
+import base64
+import json
+import resource
+import sys
+import threading
+import tracemalloc
+from collections import deque, Counter
+from urllib.parse import urlsplit, parse_qs
+import time
 import httpx
 from datetime import datetime
 from pathlib import Path
-from typing import Optional, List
+from typing import Optional, List, Dict, Set, Tuple, Union
 from playwright.async_api import async_playwright, Browser, Page
 
 # FastAPI应用实例
@@ -30,7 +51,7 @@ app = FastAPI(
 )
 
 # 配置
-FILE_DIR = "/home/ubuntu/"
+FILE_DIR = os.environ.get("FILE_DIR", "/home/ubuntu/")
 MAX_FILES = 10
 
 # ⭐ 无锁设计：最大化并发性能
@@ -81,6 +102,86 @@ TERMINAL_COMMANDS = [
     {"cmd": ["echo", "Hello from terminal!"], "description": "输出问候信息"}
 ]
 
+# /terminal 默认负载画像：basic（上面的轻量命令）或 dev（开发者任务）
+TERMINAL_PROFILE = os.environ.get("TERMINAL_PROFILE", "basic")
+
+# 开发者任务的工作目录：fixture 为一次性生成的素材，runs 为每次执行的临时目录
+DEV_WORKSPACE = os.path.join(FILE_DIR, "devwork")
+DEV_FIXTURE_DIR = os.path.join(DEV_WORKSPACE, "fixture")
+DEV_RUNS_DIR = os.path.join(DEV_WORKSPACE, "runs")
+DEV_SOURCE_FILES = 300     # 源码树文件数（grep / tar / git 使用）
+DEV_C_SOURCES = 24         # C 项目源文件数
+DEV_C_FUNCTIONS = 25       # 每个 C 源文件包含的函数数
+DEV_WHEEL_MODULES = 40     # 本地 wheel 包含的模块数
+DEV_MAKE_JOBS = os.cpu_count() or 2
+
+# 开发者任务画像（按 weight 加权随机选择）
+# - phases: 按顺序执行的阶段，命令中的 {fixture}/{run}/{jobs} 在执行时替换
+# - concurrency: 默认同时运行的实例数，可通过 /terminal?concurrency= 覆盖
+DEV_TASKS = [
+    {
+        "name": "git_clone",
+        "description": "从本地裸仓库 git clone 并查看历史",
+        "weight": 3.0,
+        "concurrency": 2,
+        "phases": [
+            ("clone", ["git", "clone", "-q", "{fixture}/repo.git", "{run}/clone"]),
+            ("status", ["git", "-C", "{run}/clone", "status", "--porcelain"]),
+            ("log", ["git", "-C", "{run}/clone", "log", "--stat", "-n", "20"])
+        ]
+    },
+    {
+        "name": "pip_install",
+        "description": "从本地 wheel 目录 pip install 并导入",
+        "weight": 2.0,
+        "concurrency": 1,
+        "phases": [
+            ("install", ["python", "-m", "pip", "install", "-q", "--no-index", "--no-deps",
+                         "--disable-pip-version-check", "--find-links", "{fixture}/wheels",
+                         "--target", "{run}/site", "devload-fixture"]),
+            ("import", ["python", "-c",
+                        "import sys; sys.path.insert(0, '{run}/site'); import devload_fixture; devload_fixture.load_all()"])
+        ]
+    },
+    {
+        "name": "make_build",
+        "description": "使用 make -j 编译小型 C 项目",
+        "weight": 2.0,
+        "concurrency": 1,
+        "phases": [
+            ("copy", ["cp", "-r", "{fixture}/cproj", "{run}/cproj"]),
+            ("build", ["make", "-s", "-C", "{run}/cproj", "-j{jobs}"]),
+            ("run", ["{run}/cproj/app"]),
+            ("clean", ["make", "-s", "-C", "{run}/cproj", "clean"])
+        ]
+    },
+    {
+        "name": "tar_gzip",
+        "description": "tar 打包并 gzip 压缩源码树后解压",
+        "weight": 2.0,
+        "concurrency": 2,
+        "phases": [
+            ("tar", ["tar", "-cf", "{run}/src.tar", "-C", "{fixture}", "src"]),
+            ("gzip", ["gzip", "-6", "{run}/src.tar"]),
+            ("extract", ["tar", "-xzf", "{run}/src.tar.gz", "-C", "{run}"])
+        ]
+    },
+    {
+        "name": "grep_tree",
+        "description": "在源码树上执行 grep -r 和 find",
+        "weight": 3.0,
+        "concurrency": 2,
+        "phases": [
+            ("grep_todo", ["grep", "-rn", "TODO", "{fixture}/src"]),
+            ("grep_regex", ["grep", "-rlE", "def [a-z_]+[0-9_]+\\(", "{fixture}/src"]),
+            ("find", ["find", "{fixture}/src", "-type", "f", "-name", "*.py"])
+        ]
+    }
+]
+
+# /search 访问的搜索页面
+SEARCH_URL = os.environ.get("SEARCH_URL", "https://www.google.com")
+
 # 网络 I/O 测试配置（全部为互联网公网地址）
 NETWORK_TEST_URLS = [
     # httpbin.org - 公开的 HTTP 测试服务
@@ -164,6 +265,66 @@ NETWORK_TEST_URLS = [
     }
 ]
 
+# Blob 服务配置：uvicorn 无法使用 sendfile，因此在独立端口上运行一个
+# 基于 asyncio 的精简 HTTP/1.1 服务。下载优先走 loop.sendfile（os.sendfile 零拷贝），
+# uvloop 不支持 sendfile，此时退回按块读文件并写入连接
+BLOB_PORT = int(os.environ.get("BLOB_PORT", "8081"))
+BLOB_SOURCE_FILE = "/tmp/blob_source.bin"
+BLOB_SOURCE_SIZE = 64 * 1024 * 1024        # 预生成的源文件大小，更大的请求循环发送
+BLOB_UPLOAD_DIR = "/tmp/blob_uploads"
+BLOB_MAX_SIZE = 64 * 1024 * 1024 * 1024    # 单次请求最大 64GB
+BLOB_IO_CHUNK = 1024 * 1024                # 上传读取 / 下载退回分块发送的块大小
+BLOB_MAX_LINE = 8192                       # 请求行和单个请求头的最大长度
+BLOB_MAX_HEADERS = 100                     # 最多请求头数量
+BLOB_READ_TIMEOUT = 30.0                   # 读取请求头 / 请求体的超时（秒），也是 keep-alive 空闲超时
+BLOB_SIZE_UNITS = {"": 1, "K": 1024, "M": 1024 ** 2, "G": 1024 ** 3}
+
+# 浏览器公共启动参数（/search 与 /browser 共用）
+BROWSER_LAUNCH_ARGS = [
+    '--no-sandbox',
+    '--disable-dev-shm-usage',
+    '--disable-blink-features=AutomationControlled'
+]
+
+# 浏览器场景配置：页面集由服务启动时本地生成，并通过本服务的 /pages 提供
+APP_PORT = int(os.environ.get("APP_PORT", "8080"))
+BROWSER_PAGES_DIR = os.path.join(FILE_DIR, "browser_pages")
+BROWSER_PAGES_URL = f"http://127.0.0.1:{APP_PORT}/pages"
+BROWSER_ARTICLE_COUNT = 6       # 多标签页场景使用的文章页数量
+BROWSER_TABS = 4                # 多标签页场景同时打开的标签页数量
+BROWSER_SCROLL_STEPS = 20       # 滚动场景的滚动次数
+BROWSER_RSS_SAMPLE_INTERVAL = 0.2  # 浏览器进程 RSS 采样间隔（秒）
+
+BROWSER_SCENARIOS = {
+    "multi_tab": "多标签页浏览（并发打开多篇文章并切换标签页）",
+    "scroll": "长页面滚动（懒加载内容）",
+    "screenshot": "报表页面截图（视口 + 整页）",
+    "pdf": "报表页面渲染为 PDF",
+    "spa": "JS 密集型单页应用（渲染、路由切换、过滤）"
+}
+
+# Navigation Timing API 采集脚本（单位：毫秒，相对 navigationStart）
+NAVIGATION_TIMING_JS = """() => {
+    const e = performance.getEntriesByType('navigation')[0];
+    if (!e) { return null; }
+    const paints = {};
+    for (const p of performance.getEntriesByType('paint')) { paints[p.name] = p.startTime; }
+    return {
+        dns_ms: e.domainLookupEnd - e.domainLookupStart,
+        connect_ms: e.connectEnd - e.connectStart,
+        ttfb_ms: e.responseStart - e.requestStart,
+        response_ms: e.responseEnd - e.responseStart,
+        dom_interactive_ms: e.domInteractive,
+        dom_content_loaded_ms: e.domContentLoadedEventEnd,
+        load_event_ms: e.loadEventEnd,
+        duration_ms: e.duration,
+        transfer_size: e.transferSize,
+        decoded_body_size: e.decodedBodySize,
+        first_paint_ms: paints['first-paint'] ?? null,
+        first_contentful_paint_ms: paints['first-contentful-paint'] ?? null
+    };
+}"""
+
 
 def generate_mock_news() -> str:
     """
@@ -244,6 +405,371 @@ async def get_files_sorted_by_mtime() -> list[str]:
         return []
 
 
+def build_browser_pages() -> int:
+    """
+    生成浏览器场景使用的本地页面集
+
+    页面内容使用固定随机种子生成，保证每次启动得到相同的页面，
+    便于不同沙箱规格之间横向对比。
+
+    Returns:
+        int: 生成的页面数量
+    """
+    rng = random.Random(42)
+    Path(BROWSER_PAGES_DIR).mkdir(parents=True, exist_ok=True)
+    pages: Dict[str, str] = {}
+
+    # 文章页：多标签页场景使用，包含较多文本、表格和内联 SVG
+    for i in range(BROWSER_ARTICLE_COUNT):
+        paragraphs = []
+        for _ in range(60):
+            category = rng.choice(NEWS_CATEGORIES)
+            paragraphs.append(
+                f"<p>这是一条关于{category}的新闻内容，包含重要信息和详细报道。" * rng.randint(2, 5) + "</p>"
+            )
+        rows = "".join(
+            f"<tr><td>{j}</td><td>{rng.choice(NEWS_TITLES)}</td><td>{rng.randint(100, 99999)}</td></tr>"
+            for j in range(200)
+        )
+        bars = "".join(
+            f'<rect x="{j * 12}" y="{200 - h}" width="10" height="{h}" fill="hsl({j * 7},60%,50%)"/>'
+            for j, h in enumerate(rng.randint(10, 200) for _ in range(60))
+        )
+        pages[f"article_{i}.html"] = f"""<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>文章 {i}: {rng.choice(NEWS_TITLES)}</title>
+<style>body{{font-family:sans-serif;max-width:960px;margin:auto}} td{{border:1px solid #ccc;padding:2px 6px}}</style>
+</head><body><h1>{rng.choice(NEWS_TITLES)}</h1>
+<svg width="720" height="200">{bars}</svg>
+{''.join(paragraphs)}
+<table>{rows}</table>
+</body></html>"""
+
+    # 长页面：滚动场景使用，接近底部时通过 IntersectionObserver 懒加载更多内容
+    blocks = "".join(
+        f'<section class="card"><h2>#{j} {rng.choice(NEWS_TITLES)}</h2>'
+        f'<p>{"这是一条用于滚动测试的新闻内容。" * rng.randint(5, 15)}</p></section>'
+        for j in range(400)
+    )
+    pages["long.html"] = f"""<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>长页面滚动</title>
+<style>.card{{margin:12px;padding:12px;box-shadow:0 2px 6px rgba(0,0,0,.3);border-radius:8px}}</style>
+</head><body><div id="feed">{blocks}</div><div id="sentinel">loading...</div>
+<script>
+let loaded = 0;
+const feed = document.getElementById('feed');
+new IntersectionObserver((entries) => {{
+    if (!entries[0].isIntersecting) return;
+    for (let k = 0; k < 50; k++) {{
+        const s = document.createElement('section');
+        s.className = 'card';
+        s.innerHTML = '<h2>lazy #' + (loaded++) + '</h2><p>' + '懒加载内容。'.repeat(20) + '</p>';
+        feed.appendChild(s);
+    }}
+}}).observe(document.getElementById('sentinel'));
+</script></body></html>"""
+
+    # 报表页：截图和 PDF 场景使用，包含 canvas 图表和大表格
+    table_rows = "".join(
+        "<tr>" + "".join(f"<td>{rng.randint(0, 10000)}</td>" for _ in range(8)) + "</tr>"
+        for _ in range(300)
+    )
+    pages["report.html"] = f"""<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>报表</title>
+<style>body{{font-family:sans-serif}} td{{border:1px solid #999;padding:2px 8px;text-align:right}}</style>
+</head><body><h1>资源使用报表</h1>
+<canvas id="chart" width="1200" height="400"></canvas>
+<table>{table_rows}</table>
+<script>
+const ctx = document.getElementById('chart').getContext('2d');
+for (let s = 0; s < 6; s++) {{
+    ctx.beginPath();
+    ctx.strokeStyle = 'hsl(' + s * 60 + ',70%,45%)';
+    for (let x = 0; x < 1200; x += 2) {{
+        const y = 200 + Math.sin(x / (30 + s * 10)) * (60 + s * 15) + Math.cos(x / 7) * 10;
+        x === 0 ? ctx.moveTo(x, y) : ctx.lineTo(x, y);
+    }}
+    ctx.stroke();
+}}
+</script></body></html>"""
+
+    # SPA：在浏览器端生成数据、渲染列表、支持 hash 路由和过滤，渲染完成后设置 __spaReady
+    pages["spa.html"] = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>SPA</title>
+<style>.item{padding:4px;border-bottom:1px solid #eee} nav a{margin-right:12px}</style>
+</head><body>
+<nav><a id="nav-list" href="#/list">列表</a><a id="nav-stats" href="#/stats">统计</a><a id="nav-grid" href="#/grid">网格</a></nav>
+<input id="filter" placeholder="过滤">
+<div id="view"></div>
+<script>
+const items = [];
+let seed = 42;
+function rnd() { seed = (seed * 1103515245 + 12345) % 2147483648; return seed / 2147483648; }
+for (let i = 0; i < 20000; i++) {
+    items.push({id: i, name: 'item-' + i.toString(36) + '-' + Math.floor(rnd() * 1e6), score: rnd() * 1000, tags: [rnd() > .5 ? 'a' : 'b', rnd() > .5 ? 'c' : 'd']});
+}
+const view = document.getElementById('view');
+function renderList(filter) {
+    const rows = items.filter(it => !filter || it.name.includes(filter))
+        .sort((a, b) => b.score - a.score).slice(0, 3000)
+        .map(it => '<div class="item">' + it.name + ' <b>' + it.score.toFixed(2) + '</b> ' + it.tags.join(',') + '</div>');
+    view.innerHTML = rows.join('');
+}
+function renderStats() {
+    const buckets = new Array(100).fill(0);
+    for (let round = 0; round < 20; round++) { for (const it of items) { buckets[Math.floor(it.score / 10)] += 1; } }
+    view.innerHTML = '<pre>' + JSON.stringify(buckets) + '</pre>';
+}
+function renderGrid() {
+    let html = '<table>';
+    for (let r = 0; r < 150; r++) { html += '<tr>'; for (let c = 0; c < 30; c++) { html += '<td>' + ((r * 31 + c * 17) % 97) + '</td>'; } html += '</tr>'; }
+    view.innerHTML = html + '</table>';
+}
+function route() {
+    const filter = document.getElementById('filter').value;
+    const h = location.hash || '#/list';
+    if (h === '#/stats') renderStats(); else if (h === '#/grid') renderGrid(); else renderList(filter);
+    window.__spaRoute = h;
+}
+window.addEventListener('hashchange', route);
+document.getElementById('filter').addEventListener('input', route);
+route();
+window.__spaReady = true;
+</script></body></html>"""
+
+    for name, html in pages.items():
+        with open(os.path.join(BROWSER_PAGES_DIR, name), "w", encoding="utf-8") as f:
+            f.write(html)
+    return len(pages)
+
+
+def _write_fixture_wheel(wheel_dir: str, rng: random.Random):
+    """手工生成一个纯 Python wheel（无需 setuptools / 网络）"""
+    dist = "devload_fixture"
+    version = "1.0.0"
+    files: Dict[str, bytes] = {}
+    for i in range(DEV_WHEEL_MODULES):
+        body = "\n".join(
+            f"def func_{i}_{j}(x):\n    return [x * {rng.randint(1, 99)} + k for k in range({rng.randint(10, 200)})]\n"
+            for j in range(30)
+        )
+        files[f"{dist}/mod_{i}.py"] = body.encode()
+    files[f"{dist}/__init__.py"] = (
+        "import importlib\n\n"
+        "def load_all():\n"
+        f"    return [importlib.import_module(f'{dist}.mod_{{i}}') for i in range({DEV_WHEEL_MODULES})]\n"
+    ).encode()
+    dist_info = f"{dist}-{version}.dist-info"
+    files[f"{dist_info}/METADATA"] = (
+        f"Metadata-Version: 2.1\nName: devload-fixture\nVersion: {version}\n"
+    ).encode()
+    files[f"{dist_info}/WHEEL"] = (
+        "Wheel-Version: 1.0\nGenerator: app.py\nRoot-Is-Purelib: true\nTag: py3-none-any\n"
+    ).encode()
+    record_lines = []
+    for name, data in files.items():
+        digest = base64.urlsafe_b64encode(hashlib.sha256(data).digest()).rstrip(b"=").decode()
+        record_lines.append(f"{name},sha256={digest},{len(data)}")
+    record_lines.append(f"{dist_info}/RECORD,,")
+    files[f"{dist_info}/RECORD"] = ("\n".join(record_lines) + "\n").encode()
+
+    Path(wheel_dir).mkdir(parents=True, exist_ok=True)
+    wheel_path = os.path.join(wheel_dir, f"{dist}-{version}-py3-none-any.whl")
+    with zipfile.ZipFile(wheel_path, "w", zipfile.ZIP_DEFLATED) as zf:
+        for name, data in files.items():
+            zf.writestr(name, data)
+
+
+def _write_dev_fixture(tmp_dir: str):
+    """在 tmp_dir 下生成源码树、本地裸仓库、本地 wheel 目录和小型 C 项目"""
+    rng = random.Random(7)
+
+    # 1. 源码树：多层目录下的 Python 文件
+    src_dir = os.path.join(tmp_dir, "src")
+    for i in range(DEV_SOURCE_FILES):
+        module_dir = os.path.join(src_dir, f"pkg_{i % 12}", f"sub_{i % 5}")
+        Path(module_dir).mkdir(parents=True, exist_ok=True)
+        lines = []
+        for j in range(rng.randint(20, 60)):
+            lines.append(f"def handler_{i}_{j}(request):")
+            if rng.random() < 0.2:
+                lines.append(f"    # TODO: {rng.choice(NEWS_TITLES)}")
+            lines.append(f"    return {{'id': {j}, 'value': {rng.randint(0, 10 ** 6)}, 'tag': '{rng.choice(NEWS_CATEGORIES)}'}}")
+            lines.append("")
+        with open(os.path.join(module_dir, f"module_{i}.py"), "w", encoding="utf-8") as f:
+            f.write("\n".join(lines))
+
+    # 2. 本地裸仓库
+    git = ["git", "-c", "user.name=devload", "-c", "user.email=devload@localhost", "-c", "init.defaultBranch=main"]
+    work_repo = os.path.join(tmp_dir, "repo_work")
+    shutil.copytree(src_dir, work_repo)
+    subprocess.run(git + ["init", "-q", work_repo], check=True)
+    subprocess.run(git + ["-C", work_repo, "add", "-A"], check=True)
+    subprocess.run(git + ["-C", work_repo, "commit", "-q", "-m", "initial import"], check=True)
+    subprocess.run(git + ["clone", "-q", "--bare", work_repo, os.path.join(tmp_dir, "repo.git")], check=True)
+    shutil.rmtree(work_repo)
+
+    # 3. 本地 wheel 目录
+    _write_fixture_wheel(os.path.join(tmp_dir, "wheels"), rng)
+
+    # 4. 小型 C 项目：每个源文件包含若干计算函数，main 依次调用
+    cproj = os.path.join(tmp_dir, "cproj")
+    Path(cproj).mkdir(parents=True, exist_ok=True)
+    for i in range(DEV_C_SOURCES):
+        funcs = []
+        for j in range(DEV_C_FUNCTIONS):
+            funcs.append(
+                f"double unit_{i}_{j}(int n) {{ double acc = {rng.random():.6f}; "
+                f"for (int k = 1; k < n; k++) {{ acc += (double)(k * {rng.randint(1, 97)} % {rng.randint(3, 101)}) / k; }} "
+                f"return acc; }}"
+            )
+        funcs.append(
+            f"double unit_{i}(int n) {{ return " + " + ".join(f"unit_{i}_{j}(n)" for j in range(DEV_C_FUNCTIONS)) + "; }"
+        )
+        with open(os.path.join(cproj, f"unit_{i}.c"), "w") as f:
+            f.write("\n".join(funcs) + "\n")
+    decls = "\n".join(f"double unit_{i}(int n);" for i in range(DEV_C_SOURCES))
+    calls = " + ".join(f"unit_{i}(2000)" for i in range(DEV_C_SOURCES))
+    with open(os.path.join(cproj, "main.c"), "w") as f:
+        f.write(f"#include <stdio.h>\n{decls}\nint main(void) {{ printf(\"%f\\n\", {calls}); return 0; }}\n")
+    with open(os.path.join(cproj, "Makefile"), "w") as f:
+        f.write(
+            "CC ?= gcc\nCFLAGS ?= -O2\n"
+            "SRCS := $(wildcard *.c)\nOBJS := $(SRCS:.c=.o)\n\n"
+            "app: $(OBJS)\n\t$(CC) $(CFLAGS) -o $@ $^\n\n"
+            "%.o: %.c\n\t$(CC) $(CFLAGS) -c -o $@ $<\n\n"
+            "clean:\n\trm -f $(OBJS) app\n"
+        )
+
+
+def build_dev_fixture() -> str:
+    """
+    生成开发者任务使用的本地素材（只在首次使用时生成）
+
+    生成到临时目录后再原子地重命名，避免并发请求看到半成品；
+    生成失败或其他请求已先完成时删除临时目录。
+
+    Returns:
+        str: fixture 目录路径
+    """
+    if os.path.isdir(DEV_FIXTURE_DIR):
+        return DEV_FIXTURE_DIR
+
+    tmp_dir = f"{DEV_FIXTURE_DIR}.tmp-{uuid.uuid4().hex[:8]}"
+    try:
+        _write_dev_fixture(tmp_dir)
+        try:
+            os.rename(tmp_dir, DEV_FIXTURE_DIR)
+        except OSError:
+            # 并发场景：其他请求已完成生成，丢弃本次结果
+            pass
+    finally:
+        # 重命名成功后临时目录已不存在；生成中途抛出异常时清理半成品
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    return DEV_FIXTURE_DIR
+
+
+def _read_proc_ppid_map() -> Dict[int, int]:
+    """读取 /proc 下所有进程的父进程映射 {pid: ppid}"""
+    ppids: Dict[int, int] = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat", "r") as f:
+                stat = f.read()
+            # comm 字段可能包含空格，从最后一个 ')' 之后解析
+            ppids[int(entry)] = int(stat[stat.rindex(")") + 2:].split()[1])
+        except (OSError, ValueError, IndexError):
+            continue
+    return ppids
+
+
+def find_browser_pids() -> Set[int]:
+    """查找本服务进程树中所有 Chromium 相关进程的 PID"""
+    ppids = _read_proc_ppid_map()
+    children: Dict[int, List[int]] = {}
+    for pid, ppid in ppids.items():
+        children.setdefault(ppid, []).append(pid)
+
+    result: Set[int] = set()
+    stack = [os.getpid()]
+    while stack:
+        for child in children.get(stack.pop(), []):
+            stack.append(child)
+            try:
+                with open(f"/proc/{child}/comm", "r") as f:
+                    comm = f.read().strip()
+            except OSError:
+                continue
+            if "chrom" in comm or "headless" in comm:
+                result.add(child)
+    return result
+
+
+def read_rss_kb(pid: int) -> int:
+    """读取进程的 VmRSS（KB），进程不存在时返回 0"""
+    try:
+        with open(f"/proc/{pid}/status", "r") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except (OSError, ValueError):
+        pass
+    return 0
+
+
+class BrowserRssSampler:
+    """
+    在场景运行期间周期性采样浏览器进程 RSS
+
+    只统计启动浏览器之后新出现的 Chromium 进程；
+    高并发下其他请求同时启动的浏览器也可能被计入。
+    """
+
+    def __init__(self, interval: float = BROWSER_RSS_SAMPLE_INTERVAL):
+        self.interval = interval
+        self.baseline_pids: Set[int] = set()
+        self.samples_mb: List[float] = []
+        self.peak_processes = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def mark_baseline(self):
+        """记录启动浏览器之前已存在的 Chromium 进程"""
+        self.baseline_pids = find_browser_pids()
+
+    def sample_once(self):
+        pids = find_browser_pids() - self.baseline_pids
+        if not pids:
+            return
+        self.peak_processes = max(self.peak_processes, len(pids))
+        self.samples_mb.append(sum(read_rss_kb(pid) for pid in pids) / 1024)
+
+    async def _run(self):
+        while True:
+            await asyncio.to_thread(self.sample_once)
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> dict:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        samples = self.samples_mb
+        return {
+            "samples": len(samples),
+            "interval_seconds": self.interval,
+            "peak_mb": round(max(samples), 1) if samples else 0.0,
+            "avg_mb": round(sum(samples) / len(samples), 1) if samples else 0.0,
+            "last_mb": round(samples[-1], 1) if samples else 0.0,
+            "peak_processes": self.peak_processes
+        }
+
+
 @app.get("/health")
 async def health_check():
     """
@@ -389,11 +915,7 @@ async def google_search():
             print(f"[浏览器] 启动 Chromium 浏览器...")
             browser = await p.chromium.launch(
                 headless=True,
-                args=[
-                    '--no-sandbox',
-                    '--disable-dev-shm-usage',
-                    '--disable-blink-features=AutomationControlled'
-                ]
+                args=BROWSER_LAUNCH_ARGS
             )
 
             # 创建新页面
@@ -402,7 +924,7 @@ async def google_search():
 
             try:
                 # 访问 Google
-                await page.goto('https://www.google.com', timeout=30000)
+                await page.goto(SEARCH_URL, timeout=30000)
                 await asyncio.sleep(1)
 
                 # 查找搜索框并输入关键词
@@ -464,20 +986,326 @@ async def google_search():
         )
 
 
+async def _timed(operations: List[dict], name: str, coro):
+    """执行一个浏览器操作并记录耗时（毫秒）"""
+    op_start = time.perf_counter()
+    result = await coro
+    operations.append({
+        "name": name,
+        "duration_ms": round((time.perf_counter() - op_start) * 1000, 2)
+    })
+    return result
+
+
+async def _navigation_timing(page: Page) -> Optional[dict]:
+    """读取页面的 Navigation Timing / Paint Timing 数据"""
+    timing = await page.evaluate(NAVIGATION_TIMING_JS)
+    if timing:
+        timing = {k: (round(v, 2) if isinstance(v, float) else v) for k, v in timing.items()}
+        timing["url"] = page.url
+    return timing
+
+
+async def _scenario_multi_tab(context, operations: List[dict], timings: List[dict]):
+    articles = random.sample(range(BROWSER_ARTICLE_COUNT), min(BROWSER_TABS, BROWSER_ARTICLE_COUNT))
+    pages = [await _timed(operations, f"new_tab_{i}", context.new_page()) for i in range(len(articles))]
+
+    # 并发加载所有标签页
+    await asyncio.gather(*[
+        _timed(operations, f"goto_article_{a}", page.goto(f"{BROWSER_PAGES_URL}/article_{a}.html", wait_until="load"))
+        for page, a in zip(pages, articles)
+    ])
+    for page in pages:
+        timings.append(await _navigation_timing(page))
+
+    # 依次切换标签页并滚动到底部
+    for i, page in enumerate(pages):
+        await _timed(operations, f"switch_tab_{i}", page.bring_to_front())
+        await _timed(operations, f"scroll_tab_{i}", page.evaluate("window.scrollTo(0, document.body.scrollHeight)"))
+
+    for i, page in enumerate(pages):
+        await _timed(operations, f"close_tab_{i}", page.close())
+
+
+async def _scenario_scroll(context, operations: List[dict], timings: List[dict]):
+    page = await context.new_page()
+    await _timed(operations, "goto_long", page.goto(f"{BROWSER_PAGES_URL}/long.html", wait_until="load"))
+    timings.append(await _navigation_timing(page))
+    for i in range(BROWSER_SCROLL_STEPS):
+        await _timed(operations, f"scroll_{i}", page.mouse.wheel(0, 2500))
+        # 等待下一帧渲染完成，使滚动耗时包含布局和绘制
+        await _timed(operations, f"frame_{i}", page.evaluate("new Promise(r => requestAnimationFrame(() => r()))"))
+    await _timed(operations, "scroll_to_bottom", page.evaluate("window.scrollTo(0, document.body.scrollHeight)"))
+    await page.close()
+
+
+async def _scenario_screenshot(context, operations: List[dict], timings: List[dict]) -> dict:
+    page = await context.new_page()
+    await _timed(operations, "goto_report", page.goto(f"{BROWSER_PAGES_URL}/report.html", wait_until="load"))
+    timings.append(await _navigation_timing(page))
+    viewport_png = await _timed(operations, "screenshot_viewport", page.screenshot())
+    full_png = await _timed(operations, "screenshot_full_page", page.screenshot(full_page=True))
+    await page.close()
+    return {"viewport_bytes": len(viewport_png), "full_page_bytes": len(full_png)}
+
+
+async def _scenario_pdf(context, operations: List[dict], timings: List[dict]) -> dict:
+    page = await context.new_page()
+    await _timed(operations, "goto_report", page.goto(f"{BROWSER_PAGES_URL}/report.html", wait_until="load"))
+    timings.append(await _navigation_timing(page))
+    pdf_bytes = await _timed(operations, "render_pdf", page.pdf(format="A4", print_background=True))
+    await page.close()
+    return {"pdf_bytes": len(pdf_bytes)}
+
+
+async def _scenario_spa(context, operations: List[dict], timings: List[dict]):
+    page = await context.new_page()
+    await _timed(operations, "goto_spa", page.goto(f"{BROWSER_PAGES_URL}/spa.html", wait_until="load"))
+    await _timed(operations, "wait_spa_ready", page.wait_for_function("window.__spaReady === true"))
+    timings.append(await _navigation_timing(page))
+    for route in ["stats", "grid", "list", "stats", "list"]:
+        await _timed(operations, f"route_{route}", page.click(f"#nav-{route}"))
+        await _timed(
+            operations, f"render_{route}",
+            page.wait_for_function(f"window.__spaRoute === '#/{route}'")
+        )
+    await _timed(operations, "type_filter", page.fill("#filter", "item-1"))
+    await page.close()
+
+
+BROWSER_SCENARIO_RUNNERS = {
+    "multi_tab": _scenario_multi_tab,
+    "scroll": _scenario_scroll,
+    "screenshot": _scenario_screenshot,
+    "pdf": _scenario_pdf,
+    "spa": _scenario_spa
+}
+
+
+@app.post("/browser")
+async def browser_workload(scenario: Optional[str] = None):
+    """
+    执行浏览器负载场景
+
+    Args:
+        scenario: 场景名称（multi_tab/scroll/screenshot/pdf/spa），默认随机选择
+
+    功能：
+    1. 启动 Chromium 浏览器（无头模式）
+    2. 访问本地页面集执行指定场景
+    3. 记录每个操作的耗时和 Navigation Timing 数据
+    4. 运行期间采样浏览器进程 RSS
+
+    Returns:
+        dict: 场景执行结果
+    """
+    if scenario is None:
+        scenario = random.choice(list(BROWSER_SCENARIOS.keys()))
+    if scenario not in BROWSER_SCENARIO_RUNNERS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"未知场景: {scenario}，可选: {', '.join(BROWSER_SCENARIOS.keys())}"
+        )
+
+    start_time = datetime.now()
+    operations: List[dict] = []
+    navigation_timings: List[dict] = []
+    sampler = BrowserRssSampler()
+
+    try:
+        async with async_playwright() as p:
+            print(f"[浏览器] 场景 {scenario}: 启动 Chromium 浏览器...")
+            await asyncio.to_thread(sampler.mark_baseline)
+            browser = await _timed(operations, "launch_browser", p.chromium.launch(
+                headless=True,
+                args=BROWSER_LAUNCH_ARGS
+            ))
+            sampler.start()
+
+            try:
+                context = await _timed(operations, "new_context", browser.new_context(
+                    viewport={"width": 1280, "height": 800}
+                ))
+                extra = await BROWSER_SCENARIO_RUNNERS[scenario](context, operations, navigation_timings)
+                await _timed(operations, "close_context", context.close())
+            except Exception as e:
+                print(f"[浏览器错误] 场景 {scenario}: {e}")
+                raise HTTPException(
+                    status_code=500,
+                    detail=f"浏览器场景执行失败: {str(e)}"
+                )
+            finally:
+                browser_rss = await sampler.stop()
+                await browser.close()
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"[错误] 浏览器启动失败: {e}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"浏览器启动失败: {str(e)}"
+        )
+
+    duration = (datetime.now() - start_time).total_seconds()
+    print(f"[浏览器] 场景 {scenario} 完成，耗时 {duration:.2f}s，RSS 峰值 {browser_rss['peak_mb']}MB")
+
+    return {
+        "status": "success",
+        "message": "浏览器场景执行完成",
+        "scenario": scenario,
+        "description": BROWSER_SCENARIOS[scenario],
+        "operations": operations,
+        "navigation_timing": [t for t in navigation_timings if t],
+        "browser_rss": browser_rss,
+        "artifacts": extra or {},
+        "duration_seconds": round(duration, 2),
+        "timestamp": datetime.now().isoformat()
+    }
+
+
+async def _run_dev_phase(name: str, command: List[str]) -> dict:
+    """执行开发者任务的一个阶段并记录耗时"""
+    phase_start = time.perf_counter()
+    process = await asyncio.create_subprocess_exec(
+        *command,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+        cwd=DEV_WORKSPACE
+    )
+    stdout, stderr = await process.communicate()
+    result = {
+        "name": name,
+        "command": " ".join(command),
+        "return_code": process.returncode,
+        "duration_ms": round((time.perf_counter() - phase_start) * 1000, 2),
+        "stdout_bytes": len(stdout)
+    }
+    if process.returncode != 0:
+        result["stderr"] = stderr.decode("utf-8", errors="replace").strip()[-500:]
+    return result
+
+
+async def _run_dev_task_instance(task: dict, instance: int) -> dict:
+    """在独立的临时目录中执行一次开发者任务的所有阶段"""
+    run_dir = os.path.join(DEV_RUNS_DIR, f"{task['name']}_{uuid.uuid4().hex[:12]}")
+    Path(run_dir).mkdir(parents=True, exist_ok=True)
+    values = {"fixture": DEV_FIXTURE_DIR, "run": run_dir, "jobs": DEV_MAKE_JOBS}
+
+    instance_start = time.perf_counter()
+    phases = []
+    try:
+        for phase_name, template in task["phases"]:
+            command = [part.format(**values) for part in template]
+            phase = await _run_dev_phase(phase_name, command)
+            phases.append(phase)
+            if phase["return_code"] != 0:
+                break
+    finally:
+        cleanup_start = time.perf_counter()
+        await asyncio.to_thread(shutil.rmtree, run_dir, True)
+        phases.append({
+            "name": "cleanup",
+            "return_code": 0,
+            "duration_ms": round((time.perf_counter() - cleanup_start) * 1000, 2)
+        })
+
+    return {
+        "instance": instance,
+        "success": all(p["return_code"] == 0 for p in phases),
+        "phases": phases,
+        "duration_ms": round((time.perf_counter() - instance_start) * 1000, 2)
+    }
+
+
+async def _execute_dev_task(task_name: Optional[str], concurrency: Optional[int]) -> Union[dict, JSONResponse]:
+    """按权重选择（或指定）开发者任务，并以指定并发执行；任一实例失败时返回 500"""
+    if task_name is None:
+        task = random.choices(DEV_TASKS, weights=[t["weight"] for t in DEV_TASKS])[0]
+    else:
+        matched = [t for t in DEV_TASKS if t["name"] == task_name]
+        if not matched:
+            raise HTTPException(
+                status_code=400,
+                detail=f"未知任务: {task_name}，可选: {', '.join(t['name'] for t in DEV_TASKS)}"
+            )
+        task = matched[0]
+
+    instances = concurrency if concurrency is not None else task["concurrency"]
+    if not 1 <= instances <= 32:
+        raise HTTPException(status_code=400, detail="concurrency 必须在 1-32 之间")
+
+    start_time = datetime.now()
+    try:
+        await asyncio.to_thread(build_dev_fixture)
+    except Exception as e:
+        print(f"[终端错误] 生成开发者任务素材失败: {e}")
+        raise HTTPException(status_code=500, detail=f"生成开发者任务素材失败: {str(e)}")
+
+    print(f"[终端] 执行开发者任务: {task['name']} x{instances}")
+    results = await asyncio.gather(*[_run_dev_task_instance(task, i) for i in range(instances)])
+
+    # 按阶段汇总所有实例的耗时
+    phase_summary: Dict[str, dict] = {}
+    for result in results:
+        for phase in result["phases"]:
+            summary = phase_summary.setdefault(phase["name"], {"count": 0, "total_ms": 0.0, "max_ms": 0.0})
+            summary["count"] += 1
+            summary["total_ms"] += phase["duration_ms"]
+            summary["max_ms"] = max(summary["max_ms"], phase["duration_ms"])
+    for summary in phase_summary.values():
+        summary["avg_ms"] = round(summary.pop("total_ms") / summary["count"], 2)
+
+    duration = (datetime.now() - start_time).total_seconds()
+    success = all(r["success"] for r in results)
+    print(f"[终端] 开发者任务 {task['name']} 完成，耗时 {duration:.2f}s，成功: {success}")
+
+    result = {
+        "status": "success" if success else "error",
+        "message": "开发者任务执行完成",
+        "profile": "dev",
+        "task": task["name"],
+        "description": task["description"],
+        "concurrency": instances,
+        "phase_summary": phase_summary,
+        "instances": results,
+        "duration_seconds": round(duration, 3),
+        "timestamp": datetime.now().isoformat()
+    }
+    if not success:
+        # 任务失败返回 500，负载客户端按状态码统计错误；响应体保留各阶段的返回码和耗时
+        return JSONResponse(status_code=500, content=result)
+    return result
+
+
 @app.post("/terminal")
-async def execute_terminal_command():
+async def execute_terminal_command(
+    profile: Optional[str] = None,
+    task: Optional[str] = None,
+    concurrency: Optional[int] = None
+):
     """
-    执行随机终端命令
+    执行终端负载
+
+    Args:
+        profile: 负载画像，basic（轻量命令）或 dev（开发者任务），默认取 TERMINAL_PROFILE（basic）
+        task: dev 画像下指定任务名称，默认按权重随机选择
+        concurrency: dev 画像下同时运行的实例数，默认取任务自身配置
 
     功能：
-    1. 从预定义命令列表中随机选择一个命令
-    2. 在子进程中执行该命令
-    3. 捕获命令输出（stdout 和 stderr）
-    4. 返回执行结果
+    - dev: 按权重选择 git clone / pip install / make -j / tar+gzip / grep -r 等任务，
+      返回每个阶段的耗时
+    - basic: 从预定义命令列表中随机选择一个命令执行
 
     Returns:
         dict: 命令执行结果
     """
+    profile = profile or TERMINAL_PROFILE
+    if profile == "dev":
+        return await _execute_dev_task(task, concurrency)
+    if profile != "basic":
+        raise HTTPException(status_code=400, detail="profile 必须为 dev 或 basic")
+
     # 随机选择一个命令
     command_info = random.choice(TERMINAL_COMMANDS)
     command = command_info["cmd"]
@@ -493,7 +1321,7 @@ async def execute_terminal_command():
             *command,
             stdout=asyncio.subprocess.PIPE,
             stderr=asyncio.subprocess.PIPE,
-            cwd="/home/ubuntu"
+            cwd=FILE_DIR
         )
 
         # 等待命令完成并获取输出
@@ -701,22 +1529,789 @@ async def network_concurrent_test(num_requests: int = 5):
     }
 
 
+def parse_blob_size(text: str) -> int:
+    """解析 Blob 大小，支持 1024、64K、16M、1G 等写法"""
+    text = text.strip().upper().rstrip("B")
+    unit = text[-1] if text and text[-1] in BLOB_SIZE_UNITS else ""
+    number = text[:-1] if unit else text
+    size = int(float(number) * BLOB_SIZE_UNITS[unit])
+    if not 0 <= size <= BLOB_MAX_SIZE:
+        raise ValueError(f"size 必须在 0-{BLOB_MAX_SIZE} 字节之间")
+    return size
+
+
+def ensure_blob_source_file() -> str:
+    """生成下载使用的随机数据源文件（随机数据避免被链路压缩）"""
+    if os.path.exists(BLOB_SOURCE_FILE) and os.path.getsize(BLOB_SOURCE_FILE) == BLOB_SOURCE_SIZE:
+        return BLOB_SOURCE_FILE
+    tmp_path = f"{BLOB_SOURCE_FILE}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        for _ in range(BLOB_SOURCE_SIZE // BLOB_IO_CHUNK):
+            f.write(os.urandom(BLOB_IO_CHUNK))
+    os.replace(tmp_path, BLOB_SOURCE_FILE)
+    return BLOB_SOURCE_FILE
+
+
+def _blob_response_head(status: str, headers: Dict[str, str]) -> bytes:
+    lines = [f"HTTP/1.1 {status}"] + [f"{k}: {v}" for k, v in headers.items()]
+    return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+
+
+async def _blob_write_json(writer: asyncio.StreamWriter, status: str, payload: dict, keep_alive: bool):
+    body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+    writer.write(_blob_response_head(status, {
+        "Content-Type": "application/json; charset=utf-8",
+        "Content-Length": str(len(body)),
+        "Connection": "keep-alive" if keep_alive else "close"
+    }) + body)
+    await writer.drain()
+
+
+class BlobRequestError(Exception):
+    """请求头不合法：返回对应状态码并关闭连接"""
+
+    def __init__(self, status: str, detail: str):
+        super().__init__(detail)
+        self.status = status
+        self.detail = detail
+
+
+async def _blob_readline(reader: asyncio.StreamReader) -> bytes:
+    """读取一行请求行 / 请求头 / chunk 大小行，超过 BLOB_MAX_LINE 或 BLOB_READ_TIMEOUT 时报错"""
+    try:
+        async with asyncio.timeout(BLOB_READ_TIMEOUT):
+            line = await reader.readline()
+    except ValueError:
+        # 超过 StreamReader 的缓冲上限
+        line = b"x" * (BLOB_MAX_LINE + 1)
+    if len(line) > BLOB_MAX_LINE:
+        raise BlobRequestError("431 Request Header Fields Too Large", f"单行超过 {BLOB_MAX_LINE} 字节")
+    return line
+
+
+async def _blob_read(reader: asyncio.StreamReader, size: int) -> bytes:
+    async with asyncio.timeout(BLOB_READ_TIMEOUT):
+        data = await reader.read(size)
+    if not data:
+        raise ConnectionError("请求体提前结束")
+    return data
+
+
+async def _blob_read_head(reader: asyncio.StreamReader) -> Optional[Tuple[str, str, str, Dict[str, str]]]:
+    """读取请求行和请求头，连接已关闭时返回 None"""
+    request_line = await _blob_readline(reader)
+    if not request_line:
+        return None
+    try:
+        method, target, version = request_line.decode("latin-1").split()
+    except ValueError:
+        raise BlobRequestError("400 Bad Request", "无效的请求行")
+
+    headers: Dict[str, str] = {}
+    while True:
+        line = await _blob_readline(reader)
+        if line in (b"\r\n", b"\n", b""):
+            break
+        if len(headers) >= BLOB_MAX_HEADERS:
+            raise BlobRequestError("431 Request Header Fields Too Large", f"请求头超过 {BLOB_MAX_HEADERS} 个")
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    return method, target, version, headers
+
+
+async def _blob_iter_body(reader: asyncio.StreamReader, headers: Dict[str, str]):
+    """按 Content-Length 或 chunked 编码逐块读取请求体"""
+    if headers.get("transfer-encoding", "").lower() == "chunked":
+        while True:
+            size_line = await _blob_readline(reader)
+            chunk_size = int(size_line.split(b";")[0].strip() or b"0", 16)
+            if chunk_size == 0:
+                # 跳过 trailer 直到空行
+                while (await _blob_readline(reader)) not in (b"\r\n", b"\n", b""):
+                    pass
+                return
+            remaining = chunk_size
+            while remaining:
+                data = await _blob_read(reader, min(remaining, BLOB_IO_CHUNK))
+                remaining -= len(data)
+                yield data
+            await _blob_readline(reader)
+    else:
+        remaining = int(headers.get("content-length", "0"))
+        while remaining:
+            data = await _blob_read(reader, min(remaining, BLOB_IO_CHUNK))
+            remaining -= len(data)
+            yield data
+
+
+# 事件循环是否支持 loop.sendfile（uvloop 不支持，首次失败后改为分块发送）
+blob_sendfile_supported = True
+
+
+async def _blob_send_file(writer: asyncio.StreamWriter, f, count: int):
+    """发送源文件的前 count 字节：优先零拷贝 sendfile，事件循环不支持（uvloop）时按块读写"""
+    global blob_sendfile_supported
+    if blob_sendfile_supported:
+        try:
+            await asyncio.get_running_loop().sendfile(writer.transport, f, 0, count)
+            return
+        except NotImplementedError:
+            blob_sendfile_supported = False
+            print("[Blob] 事件循环不支持 sendfile，下载改为分块发送")
+    offset = 0
+    while offset < count:
+        data = await asyncio.to_thread(os.pread, f.fileno(), min(count - offset, BLOB_IO_CHUNK), offset)
+        writer.write(data)
+        await writer.drain()
+        offset += len(data)
+
+
+async def _blob_handle_get(writer: asyncio.StreamWriter, size_text: str, keep_alive: bool):
+    try:
+        size = parse_blob_size(size_text)
+    except ValueError as e:
+        await _blob_write_json(writer, "400 Bad Request", {"detail": f"无效的 size: {e}"}, keep_alive)
+        return
+
+    writer.write(_blob_response_head("200 OK", {
+        "Content-Type": "application/octet-stream",
+        "Content-Length": str(size),
+        "Connection": "keep-alive" if keep_alive else "close"
+    }))
+    await writer.drain()
+
+    remaining = size
+    with open(BLOB_SOURCE_FILE, "rb") as f:
+        while remaining:
+            count = min(remaining, BLOB_SOURCE_SIZE)
+            await _blob_send_file(writer, f, count)
+            remaining -= count
+
+
+async def _blob_handle_put(reader: asyncio.StreamReader, writer: asyncio.StreamWriter,
+                           headers: Dict[str, str], query: Dict[str, List[str]], keep_alive: bool):
+    sink = query.get("sink", ["discard"])[0]
+    if sink not in ("discard", "disk"):
+        await _blob_write_json(writer, "400 Bad Request", {"detail": "sink 必须为 discard 或 disk"}, keep_alive)
+        return
+    if "content-length" not in headers and headers.get("transfer-encoding", "").lower() != "chunked":
+        await _blob_write_json(writer, "411 Length Required", {"detail": "需要 Content-Length 或 chunked 编码"}, False)
+        return
+    if headers.get("expect", "").lower() == "100-continue":
+        writer.write(b"HTTP/1.1 100 Continue\r\n\r\n")
+        await writer.drain()
+
+    start = time.perf_counter()
+    received = 0
+    upload_path = None
+    fd = None
+    try:
+        if sink == "disk":
+            Path(BLOB_UPLOAD_DIR).mkdir(parents=True, exist_ok=True)
+            upload_path = os.path.join(BLOB_UPLOAD_DIR, f"upload_{uuid.uuid4().hex}.bin")
+            fd = os.open(upload_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+        async for data in _blob_iter_body(reader, headers):
+            received += len(data)
+            if fd is not None:
+                await asyncio.to_thread(os.write, fd, data)
+        if fd is not None:
+            await asyncio.to_thread(os.fsync, fd)
+    finally:
+        if fd is not None:
+            os.close(fd)
+        if upload_path:
+            os.remove(upload_path)
+
+    duration = time.perf_counter() - start
+    await _blob_write_json(writer, "200 OK", {
+        "status": "success",
+        "sink": sink,
+        "bytes": received,
+        "duration_seconds": round(duration, 4),
+        "throughput_mbps": round(received * 8 / 1e6 / duration, 2) if duration > 0 else 0
+    }, keep_alive)
+
+
+async def handle_blob_connection(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    """Blob 服务连接处理：支持 keep-alive 的精简 HTTP/1.1 实现"""
+    try:
+        while True:
+            try:
+                head = await _blob_read_head(reader)
+            except BlobRequestError as e:
+                await _blob_write_json(writer, e.status, {"detail": e.detail}, False)
+                break
+            if head is None:
+                break
+            method, target, version, headers = head
+
+            keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+            url = urlsplit(target)
+            query = parse_qs(url.query)
+
+            if method == "GET" and url.path.startswith("/blob/"):
+                await _blob_handle_get(writer, url.path[len("/blob/"):], keep_alive)
+            elif method == "PUT" and url.path == "/blob":
+                await _blob_handle_put(reader, writer, headers, query, keep_alive)
+            elif method == "GET" and url.path == "/health":
+                await _blob_write_json(writer, "200 OK", {"status": "ok"}, keep_alive)
+            else:
+                await _blob_write_json(writer, "404 Not Found", {"detail": f"未知路径: {method} {url.path}"}, keep_alive)
+
+            if not keep_alive:
+                break
+    except (ConnectionError, asyncio.IncompleteReadError, TimeoutError, BlobRequestError):
+        # 对端断开、读取超时（含 keep-alive 空闲）或请求体中的 chunk 行过长，直接关闭连接
+        pass
+    except Exception as e:
+        print(f"[Blob] 连接处理失败: {e}")
+    finally:
+        writer.close()
+
+
+async def start_blob_server() -> asyncio.AbstractServer:
+    """生成数据源文件并启动 Blob 服务"""
+    await asyncio.to_thread(ensure_blob_source_file)
+    return await asyncio.start_server(handle_blob_connection, "0.0.0.0", BLOB_PORT, backlog=4096)
+
+
+# 当前打开的 WebSocket 连接数
+websocket_connections = 0
+
+
+@app.websocket("/ws/echo")
+async def websocket_echo(websocket: WebSocket, timestamp: bool = False):
+    """
+    WebSocket 回显接口
+
+    Args:
+        timestamp: 为 true 时，JSON 对象文本消息会附加 server_ts 字段（Unix 秒）
+
+    功能：
+    - 二进制消息原样回显（客户端可在负载中携带序号和发送时间计算往返延迟）
+    - 文本消息原样回显；timestamp=true 且消息为 JSON 对象时附加服务端时间戳
+    """
+    global websocket_connections
+    await websocket.accept()
+    websocket_connections += 1
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            if message.get("bytes") is not None:
+                await websocket.send_bytes(message["bytes"])
+                continue
+            text = message.get("text") or ""
+            if timestamp:
+                try:
+                    payload = json.loads(text)
+                    if isinstance(payload, dict):
+                        payload["server_ts"] = time.time()
+                        text = json.dumps(payload)
+                except ValueError:
+                    pass
+            await websocket.send_text(text)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        websocket_connections -= 1
+
+# 当前保持的空闲 SSE 连接数
+sse_connections = 0
+
+
+def read_meminfo_mb() -> Dict[str, float]:
+    """读取 /proc/meminfo 中的总内存和已用内存（MB）"""
+    values: Dict[str, int] = {}
+    with open("/proc/meminfo", "r") as f:
+        for line in f:
+            name, _, rest = line.partition(":")
+            if name in ("MemTotal", "MemAvailable"):
+                values[name] = int(rest.split()[0])
+    total = values.get("MemTotal", 0)
+    return {
+        "total_mb": round(total / 1024, 1),
+        "used_mb": round((total - values.get("MemAvailable", 0)) / 1024, 1)
+    }
+
+
+def raise_nofile_limit() -> int:
+    """把打开文件数软限制提升到硬限制，返回生效的软限制"""
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < hard:
+        try:
+            resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+            soft = hard
+        except (ValueError, OSError) as e:
+            print(f"提升文件描述符限制失败: {e}")
+    return soft
+
+
+@app.get("/idle/sse")
+async def idle_sse(heartbeat: float = 15.0):
+    """
+    保持空闲的 SSE 长连接
+
+    Args:
+        heartbeat: 心跳注释的发送间隔（秒，1-300），避免中间代理因空闲断开连接
+
+    连接在客户端断开前一直保持，除心跳外不发送数据。
+    """
+    if not 1 <= heartbeat <= 300:
+        raise HTTPException(status_code=400, detail="heartbeat 必须在 1-300 秒之间")
+
+    async def event_stream():
+        global sse_connections
+        sse_connections += 1
+        try:
+            yield ": connected\n\n"
+            while True:
+                await asyncio.sleep(heartbeat)
+                yield ": heartbeat\n\n"
+        finally:
+            sse_connections -= 1
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@app.get("/idle/stats")
+async def idle_stats():
+    """
+    返回长连接数量和内存占用，供空闲连接扩展测试计算每连接内存开销
+
+    Returns:
+        dict: 连接数、文件描述符数、进程 RSS 和沙箱内存
+    """
+    return {
+        "sse_connections": sse_connections,
+        "websocket_connections": websocket_connections,
+        "open_fds": len(os.listdir("/proc/self/fd")),
+        "nofile_limit": resource.getrlimit(resource.RLIMIT_NOFILE)[0],
+        "process_rss_mb": round(read_rss_kb(os.getpid()) / 1024, 1),
+        "system_memory": read_meminfo_mb(),
+        "timestamp": datetime.now().isoformat()
+    }
+
+# 按请求资源统计：每个 HTTP 响应附带 X-Res-* 头，并按接口保留最近的记录计算滚动平均
+RESOURCE_ACCOUNTING = os.environ.get("RESOURCE_ACCOUNTING", "1") == "1"
+RESOURCE_STATS_WINDOW = 200
+RESOURCE_FIELDS = [
+    # (统计字段, 响应头)
+    ("wall_ms", "X-Res-Wall-Ms"),
+    ("cpu_thread_ms", "X-Res-Cpu-Thread-Ms"),
+    ("cpu_process_ms", "X-Res-Cpu-Process-Ms"),
+    ("cpu_children_ms", "X-Res-Cpu-Children-Ms"),
+    ("read_bytes", "X-Res-Read-Bytes"),
+    ("write_bytes", "X-Res-Write-Bytes"),
+    ("rchar", "X-Res-Rchar"),
+    ("wchar", "X-Res-Wchar"),
+    ("rss_peak_extra_kb", "X-Res-Rss-Peak-Kb"),
+    ("concurrency", "X-Res-Concurrency")
+]
+endpoint_resource_stats: Dict[str, deque] = {}
+
+
+def _read_proc_self_io() -> Dict[str, int]:
+    """读取 /proc/self/io（包含已回收子进程的 I/O）"""
+    values: Dict[str, int] = {}
+    try:
+        with open("/proc/self/io", "r") as f:
+            for line in f:
+                name, _, value = line.partition(":")
+                values[name] = int(value)
+    except OSError:
+        pass
+    return values
+
+
+def _read_rss_and_hwm_kb() -> tuple:
+    rss = hwm = 0
+    with open("/proc/self/status", "r") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                rss = int(line.split()[1])
+            elif line.startswith("VmHWM:"):
+                hwm = int(line.split()[1])
+    return rss, hwm
+
+
+def _reset_peak_rss() -> bool:
+    """重置 VmHWM（写入 /proc/self/clear_refs 5），成功返回 True"""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def _cpu_snapshot() -> dict:
+    """时间与 CPU 计数，必须在事件循环线程调用（thread_time 按线程计）"""
+    self_usage = resource.getrusage(resource.RUSAGE_SELF)
+    children_usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return {
+        "wall": time.perf_counter(),
+        "thread_cpu": time.thread_time(),
+        "process_cpu": self_usage.ru_utime + self_usage.ru_stime,
+        "children_cpu": children_usage.ru_utime + children_usage.ru_stime
+    }
+
+
+def _proc_snapshot(reset_peak: bool = False) -> dict:
+    """
+    /proc 计数（I/O、RSS、峰值 RSS），在线程池中调用，避免文件读写阻塞事件循环
+
+    Args:
+        reset_peak: 读取前先重置 VmHWM，结果中的 peak_reset 表示是否重置成功
+    """
+    peak_reset = reset_peak and _reset_peak_rss()
+    io = _read_proc_self_io()
+    rss, hwm = _read_rss_and_hwm_kb()
+    return {
+        "peak_reset": peak_reset,
+        "read_bytes": io.get("read_bytes", 0),
+        "write_bytes": io.get("write_bytes", 0),
+        "rchar": io.get("rchar", 0),
+        "wchar": io.get("wchar", 0),
+        "rss_kb": rss,
+        "hwm_kb": hwm
+    }
+
+
+class ResourceAccountingMiddleware:
+    """
+    按请求统计资源消耗（纯 ASGI 中间件）
+
+    从请求开始到响应头发出之间的增量：
+    - cpu_thread_ms: 事件循环线程 CPU 时间
+    - cpu_process_ms / cpu_children_ms: 进程（含线程池）和已回收子进程的 rusage
+    - read_bytes / write_bytes / rchar / wchar: /proc/self/io 增量
+    - rss_peak_extra_kb: 峰值 RSS 相对请求开始时的增量
+
+    这些都是进程级计数，多个请求并发时会相互计入；concurrency 记录窗口内的
+    最大并发请求数，只有 concurrency 为 1 时数值才完全归属于该请求。
+    请求开始和响应头发出时各在线程池中读取一次 /proc，事件循环线程只取 CPU 计数。
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.active: List[dict] = []
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not RESOURCE_ACCOUNTING:
+            await self.app(scope, receive, send)
+            return
+
+        # 先登记再等待 /proc 读取，并发数统计不受线程池调度影响
+        state = {"concurrency": len(self.active) + 1, "exclusive": not self.active}
+        self.active.append(state)
+        for other in self.active:
+            other["concurrency"] = max(other["concurrency"], len(self.active))
+        try:
+            start = await asyncio.to_thread(_proc_snapshot, state["exclusive"])
+        except BaseException:
+            self.active.remove(state)
+            raise
+        state["exclusive"] = start["peak_reset"]
+        # CPU 计数在 /proc 读取之后取，线程池往返本身不计入请求
+        state["start"] = {**start, **_cpu_snapshot()}
+
+        async def send_with_headers(message):
+            if message["type"] == "http.response.start" and state in self.active:
+                self.active.remove(state)
+                end = _cpu_snapshot()
+                end.update(await asyncio.to_thread(_proc_snapshot))
+                record = self._finish(scope, state, end)
+                headers = list(message.get("headers", []))
+                for field, header in RESOURCE_FIELDS:
+                    headers.append((header.lower().encode(), str(record[field]).encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_headers)
+        finally:
+            if state in self.active:
+                self.active.remove(state)
+
+    @staticmethod
+    def _finish(scope, state: dict, end: dict) -> dict:
+        start = state["start"]
+        if state["exclusive"] and state["concurrency"] == 1:
+            peak_extra = end["hwm_kb"] - start["rss_kb"]
+        else:
+            peak_extra = end["rss_kb"] - start["rss_kb"]
+        record = {
+            "wall_ms": round((end["wall"] - start["wall"]) * 1000, 3),
+            "cpu_thread_ms": round((end["thread_cpu"] - start["thread_cpu"]) * 1000, 3),
+            "cpu_process_ms": round((end["process_cpu"] - start["process_cpu"]) * 1000, 3),
+            "cpu_children_ms": round((end["children_cpu"] - start["children_cpu"]) * 1000, 3),
+            "read_bytes": end["read_bytes"] - start["read_bytes"],
+            "write_bytes": end["write_bytes"] - start["write_bytes"],
+            "rchar": end["rchar"] - start["rchar"],
+            "wchar": end["wchar"] - start["wchar"],
+            "rss_peak_extra_kb": max(0, peak_extra),
+            "concurrency": state["concurrency"]
+        }
+        # 未匹配路由（404 等）统一计入一个键，避免按原始路径无限增长
+        route = scope.get("route")
+        key = f"{scope['method']} {route.path if route is not None else '<unmatched>'}"
+        endpoint_resource_stats.setdefault(key, deque(maxlen=RESOURCE_STATS_WINDOW)).append(record)
+        return record
+
+
+app.add_middleware(ResourceAccountingMiddleware)
+
+
+@app.get("/stats/resources")
+async def get_resource_stats():
+    """
+    返回每个接口最近若干次请求的资源消耗平均值
+
+    Returns:
+        dict: {接口: {样本数, 各字段平均值, 独占样本（concurrency=1）的 CPU 平均值}}
+    """
+    endpoints = {}
+    for key, records in list(endpoint_resource_stats.items()):
+        if not records:
+            continue
+        count = len(records)
+        averages = {field: round(sum(r[field] for r in records) / count, 3) for field, _ in RESOURCE_FIELDS}
+        exclusive = [r for r in records if r["concurrency"] == 1]
+        averages["samples"] = count
+        averages["exclusive_samples"] = len(exclusive)
+        if exclusive:
+            averages["exclusive_cpu_process_ms"] = round(
+                sum(r["cpu_process_ms"] + r["cpu_children_ms"] for r in exclusive) / len(exclusive), 3)
+        endpoints[key] = averages
+    return {
+        "enabled": RESOURCE_ACCOUNTING,
+        "window": RESOURCE_STATS_WINDOW,
+        "endpoints": endpoints,
+        "timestamp": datetime.now().isoformat()
+    }
+
+
+# 按需采样分析：默认关闭；开启后空闲时没有任何额外线程或开销，只在请求期间采样
+DEBUG_PROFILING = os.environ.get("DEBUG_PROFILING", "0") == "1"
+PROFILE_MAX_SECONDS = 120
+PROFILE_MAX_DEPTH = 64
+profile_lock = asyncio.Lock()
+# 叶子帧为这些函数时视为线程空闲等待（事件循环 select、线程池等待任务、锁等待）
+# uvloop 的 run_forever / run_until_complete 由 C 实现，在 epoll 中等待时最内层的 Python 帧是
+# asyncio.Runner.run（asyncio.run 与 uvicorn 都经由它启动事件循环）
+PROFILE_IDLE_FRAMES = {
+    ("selectors.py", "select"),
+    ("runners.py", "run"),
+    ("thread.py", "_worker"),
+    ("threading.py", "wait"),
+    ("queue.py", "get")
+}
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    name = getattr(code, "co_qualname", code.co_name)
+    return f"{name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})".replace(";", ":")
+
+
+def _is_idle_frame(frame) -> bool:
+    code = frame.f_code
+    return (os.path.basename(code.co_filename), code.co_name) in PROFILE_IDLE_FRAMES
+
+
+def _sample_stacks(seconds: float, interval: float, include_idle: bool) -> dict:
+    """
+    在当前（线程池）线程中采样所有其他线程的调用栈
+
+    Returns:
+        dict: {"stacks": Counter(折叠栈 -> 次数), "samples": 采样轮数}
+    """
+    own_ident = threading.get_ident()
+    stacks: Counter = Counter()
+    samples = 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        names = {t.ident: t.name for t in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == own_ident or (not include_idle and _is_idle_frame(frame)):
+                continue
+            labels = []
+            while frame is not None and len(labels) < PROFILE_MAX_DEPTH:
+                labels.append(_frame_label(frame))
+                frame = frame.f_back
+            labels.append(names.get(ident, f"thread-{ident}").replace(";", ":"))
+            stacks[";".join(reversed(labels))] += 1
+        samples += 1
+        time.sleep(interval)
+    return {"stacks": stacks, "samples": samples}
+
+
+@app.get("/debug/profile")
+async def debug_profile(
+    seconds: float = 10.0,
+    interval_ms: float = 10.0,
+    tracemalloc_diff: bool = False,
+    idle: bool = False,
+    format: str = "json",
+    top: int = 30
+):
+    """
+    对服务进程采样分析 seconds 秒（所有线程），返回可直接生成火焰图的折叠栈
+
+    Args:
+        seconds: 采样时长（秒）
+        interval_ms: 采样间隔（毫秒）
+        tracemalloc_diff: 同时在采样窗口前后各取一次 tracemalloc 快照并返回差异
+        idle: 是否保留空闲等待的调用栈（事件循环 select、线程池等待等），默认丢弃
+        format: json（折叠栈 + 热点统计）或 collapsed（纯文本，直接交给 flamegraph.pl）
+        top: 返回的热点函数 / 内存差异条目数
+
+    Returns:
+        dict | str: 采样结果
+    """
+    if not DEBUG_PROFILING:
+        raise HTTPException(status_code=404, detail="采样分析未启用，请设置环境变量 DEBUG_PROFILING=1")
+    if not 0 < seconds <= PROFILE_MAX_SECONDS:
+        raise HTTPException(status_code=400, detail=f"seconds 必须在 0-{PROFILE_MAX_SECONDS} 之间")
+    if not 1 <= interval_ms <= 1000:
+        raise HTTPException(status_code=400, detail="interval_ms 必须在 1-1000 之间")
+    if format not in ("json", "collapsed"):
+        raise HTTPException(status_code=400, detail="format 必须为 json 或 collapsed")
+    if profile_lock.locked():
+        raise HTTPException(status_code=409, detail="已有采样分析正在运行")
+
+    async with profile_lock:
+        print(f"[分析] 开始采样 {seconds}s，间隔 {interval_ms}ms，tracemalloc: {tracemalloc_diff}")
+        started_tracemalloc = False
+        snapshot_before = None
+        if tracemalloc_diff:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(10)
+                started_tracemalloc = True
+            snapshot_before = tracemalloc.take_snapshot()
+
+        try:
+            result = await asyncio.to_thread(_sample_stacks, seconds, interval_ms / 1000, idle)
+            memory_diff = None
+            if snapshot_before is not None:
+                snapshot_after = tracemalloc.take_snapshot()
+                memory_diff = [
+                    {
+                        "location": str(stat.traceback[0]) if stat.traceback else "?",
+                        "size_diff_kb": round(stat.size_diff / 1024, 2),
+                        "count_diff": stat.count_diff,
+                        "size_kb": round(stat.size / 1024, 2)
+                    }
+                    for stat in snapshot_after.compare_to(snapshot_before, "lineno")[:top]
+                ]
+        finally:
+            if started_tracemalloc:
+                tracemalloc.stop()
+
+    stacks: Counter = result["stacks"]
+    collapsed = "\n".join(f"{stack} {count}" for stack, count in stacks.most_common())
+    print(f"[分析] 采样完成: {result['samples']} 轮, {len(stacks)} 个不同调用栈")
+    if format == "collapsed":
+        return PlainTextResponse(collapsed + "\n")
+
+    # 按叶子函数统计热点（自身耗时）
+    leaf_counts: Counter = Counter()
+    for stack, count in stacks.items():
+        leaf_counts[stack.rsplit(";", 1)[-1]] += count
+    total = sum(stacks.values()) or 1
+
+    return {
+        "seconds": seconds,
+        "interval_ms": interval_ms,
+        "samples": result["samples"],
+        "top_functions": [
+            {"function": name, "samples": count, "percent": round(count * 100 / total, 2)}
+            for name, count in leaf_counts.most_common(top)
+        ],
+        "collapsed": collapsed,
+        "tracemalloc_diff": memory_diff,
+        "timestamp": datetime.now().isoformat()
+    }
+
+# ==================== 负载控制 ====================
+# load_controller.py 的控制 socket 接收 JSON Lines 命令并立即生效；socket 不可用时退回写配置文件
+LOAD_CONTROL_SOCKET = "/tmp/load_controller.sock"
+LOAD_CONFIG_FILE = "/tmp/load_controller_config.json"
+LOAD_STATUS_FILE = "/tmp/load_controller_status.json"
+LOAD_COMMAND_TIMEOUT = 2.0
+LOAD_PERCENT_TARGETS = ("target_cpu", "target_memory", "target_disk",
+                        "target_psi_cpu", "target_psi_memory", "target_psi_io")
+LOAD_RATE_TARGETS = ("target_disk_iops", "target_disk_mbps", "target_net_rx_mbps", "target_net_tx_mbps")
+LOAD_CONTROL_COMMANDS = ("set", "pause", "resume", "weights", "status")
+
+
+async def send_load_command(command: dict) -> dict:
+    """
+    通过控制 socket 向负载控制服务发送一条命令
+
+    Raises:
+        OSError / asyncio.TimeoutError: socket 不存在或负载控制服务未响应
+    """
+    async def _exchange() -> dict:
+        reader, writer = await asyncio.open_unix_connection(LOAD_CONTROL_SOCKET)
+        try:
+            writer.write(json.dumps(command, ensure_ascii=False).encode() + b"\n")
+            await writer.drain()
+            line = await reader.readline()
+        finally:
+            writer.close()
+        if not line:
+            raise ConnectionError("负载控制服务关闭了连接")
+        return json.loads(line)
+
+    return await asyncio.wait_for(_exchange(), timeout=LOAD_COMMAND_TIMEOUT)
+
+
+async def merge_load_config(fields: dict):
+    """把字段合并进配置文件（保留已有字段），负载控制服务在文件变化后的下一个控制周期应用"""
+    config = {}
+    if os.path.exists(LOAD_CONFIG_FILE):
+        async with aiofiles.open(LOAD_CONFIG_FILE, 'r') as f:
+            try:
+                config = json.loads(await f.read())
+            except ValueError:
+                config = {}
+    config.update(fields)
+    config["updated_at"] = datetime.now().isoformat()
+
+    tmp_path = f"{LOAD_CONFIG_FILE}.{os.getpid()}.tmp"
+    async with aiofiles.open(tmp_path, 'w') as f:
+        await f.write(json.dumps(config, indent=2))
+    os.replace(tmp_path, LOAD_CONFIG_FILE)
+
+
 @app.get("/load/status")
 async def get_load_status():
     """
     获取负载测试服务状态
 
-    通过读取负载控制服务的状态文件获取信息
+    优先通过控制 socket 获取实时状态，socket 不可用时读取负载控制服务的状态文件
 
     Returns:
         dict: 负载测试服务状态
     """
+    try:
+        reply = await send_load_command({"command": "status"})
+        if reply.get("ok"):
+            return reply["status"]
+    except (OSError, asyncio.TimeoutError, ValueError):
+        pass
+
     try:
         # 尝试读取状态文件
-        status_file = "/tmp/load_controller_status.json"
-        if os.path.exists(status_file):
-            async with aiofiles.open(status_file, 'r') as f:
-                import json
+        if os.path.exists(LOAD_STATUS_FILE):
+            async with aiofiles.open(LOAD_STATUS_FILE, 'r') as f:
                 content = await f.read()
                 return json.loads(content)
         else:
@@ -732,49 +2327,116 @@ async def get_load_status():
 
 
 @app.post("/load/target")
-async def set_load_target(target_cpu: float):
+async def set_load_target(request: Request, target_cpu: Optional[float] = None):
     """
-    设置目标 CPU 使用率
+    设置负载目标
 
-    Args:
-        target_cpu: 目标 CPU 使用率 (0-100)
+    目标可以通过查询参数 target_cpu（兼容旧用法）或 JSON 请求体传入，请求体支持：
+    - target_cpu / target_memory / target_disk: 使用率（0-100）
+    - target_psi_cpu / target_psi_memory / target_psi_io: PSI 停顿时间占比（0-100），0 表示关闭
+    - target_disk_iops / target_disk_mbps / target_net_rx_mbps / target_net_tx_mbps: 非负数，0 表示关闭
 
     Returns:
-        dict: 设置结果
+        dict: 设置结果，applied_via 为 socket（立即生效）或 file（下一个控制周期生效）
     """
-    if not 0 <= target_cpu <= 100:
+    body = {}
+    if await request.body():
+        try:
+            body = await request.json()
+        except ValueError:
+            raise HTTPException(status_code=400, detail="请求体必须是 JSON 对象")
+        if not isinstance(body, dict):
+            raise HTTPException(status_code=400, detail="请求体必须是 JSON 对象")
+    if target_cpu is not None:
+        body.setdefault("target_cpu", target_cpu)
+
+    unknown = [key for key in body if key not in LOAD_PERCENT_TARGETS + LOAD_RATE_TARGETS]
+    if unknown:
         raise HTTPException(
             status_code=400,
-            detail="target_cpu 必须在 0-100 之间"
+            detail=f"未知的目标字段: {', '.join(unknown)}，可选: {', '.join(LOAD_PERCENT_TARGETS + LOAD_RATE_TARGETS)}"
         )
+    if not body:
+        raise HTTPException(status_code=400, detail="至少需要设置一个目标")
 
-    try:
-        # 写入配置文件
-        config_file = "/tmp/load_controller_config.json"
-        config = {
-            "target_cpu": target_cpu,
-            "updated_at": datetime.now().isoformat()
-        }
-
-        async with aiofiles.open(config_file, 'w') as f:
-            import json
-            await f.write(json.dumps(config, indent=2))
+    targets = {}
+    for key, value in body.items():
+        try:
+            value = float(value)
+        except (TypeError, ValueError):
+            raise HTTPException(status_code=400, detail=f"{key} 必须是数字")
+        if key in LOAD_PERCENT_TARGETS and not 0 <= value <= 100:
+            raise HTTPException(status_code=400, detail=f"{key} 必须在 0-100 之间")
+        if value < 0:
+            raise HTTPException(status_code=400, detail=f"{key} 不能为负数")
+        targets[key] = value
 
-        print(f"[负载控制] 目标 CPU 使用率已更新: {target_cpu}%")
+    try:
+        reply = await send_load_command({"command": "set", **targets})
+        applied_via = "socket"
+    except (OSError, asyncio.TimeoutError):
+        reply = None
+        applied_via = "file"
 
-        return {
-            "status": "success",
-            "message": f"目标 CPU 使用率已设置为 {target_cpu}%",
-            "target_cpu": target_cpu,
-            "note": "负载控制服务将在下一个调整周期（~5秒）应用新配置"
-        }
+    if reply is not None and not reply.get("ok"):
+        raise HTTPException(status_code=400, detail=f"负载控制服务拒绝了设置: {reply.get('error')}")
 
+    try:
+        if reply is None:
+            # 控制 socket 不可用（服务未启动或旧版本），写入配置文件
+            await merge_load_config(targets)
     except Exception as e:
         raise HTTPException(
             status_code=500,
             detail=f"设置失败: {str(e)}"
         )
 
+    print(f"[负载控制] 目标已更新（{applied_via}）: {targets}")
+
+    return {
+        "status": "success",
+        "message": "负载目标已更新",
+        "targets": targets,
+        "applied_via": applied_via,
+        "note": "已立即生效" if applied_via == "socket" else "负载控制服务将在下一个控制周期应用新配置"
+    }
+
+
+@app.post("/load/control")
+async def load_control(request: Request):
+    """
+    向负载控制服务发送控制命令（需要控制 socket 可用）
+
+    请求体示例:
+    - {"command": "pause"} / {"command": "resume"}: 暂停 / 恢复请求 worker
+    - {"command": "weights", "weights": {"search": 0, "sum": 2.0}}: 修改接口权重
+    - {"command": "set", "control_interval": 0.5, "cpu_pid": {"kp": 1.0}}: 设置任意配置字段
+    - {"command": "status"}: 获取实时状态
+
+    Returns:
+        dict: 负载控制服务的执行结果
+    """
+    try:
+        command = await request.json()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="请求体必须是 JSON 对象")
+    if not isinstance(command, dict) or command.get("command") not in LOAD_CONTROL_COMMANDS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"command 必须是以下之一: {', '.join(LOAD_CONTROL_COMMANDS)}"
+        )
+
+    try:
+        reply = await send_load_command(command)
+    except (OSError, asyncio.TimeoutError) as e:
+        raise HTTPException(
+            status_code=503,
+            detail=f"负载控制服务的控制 socket 不可用: {e or type(e).__name__}"
+        )
+    if not reply.get("ok"):
+        raise HTTPException(status_code=400, detail=reply.get("error", "命令执行失败"))
+    return reply
+
 
 @app.get("/")
 async def root():
@@ -792,17 +2454,31 @@ async def root():
             "/sum": "获取文件数量 (GET)",
             "/action": "创建文件并写入新闻 (POST)",
             "/search": "浏览器搜索 (POST)",
-            "/terminal": "执行终端命令 (POST)",
+            "/browser": "浏览器负载场景 (POST, ?scenario=multi_tab|scroll|screenshot|pdf|spa)",
+            "/pages": "浏览器场景本地页面集 (GET)",
+            "/terminal": "执行终端负载 (POST, ?profile=dev|basic&task=&concurrency=)",
             "/network": "网络 I/O 测试 (POST)",
             "/network/concurrent": "并发网络测试 (POST)",
+            f":{BLOB_PORT}/blob/{{size}}": "Blob 下载 (GET, 独立端口，优先 sendfile 零拷贝)",
+            f":{BLOB_PORT}/blob": "Blob 流式上传 (PUT, 独立端口, ?sink=discard|disk)",
+            "/ws/echo": "WebSocket 回显 (WS, ?timestamp=true 附加服务端时间戳)",
+            "/idle/sse": "保持空闲 SSE 长连接 (GET, ?heartbeat=秒)",
+            "/idle/stats": "长连接数量和内存统计 (GET)",
+            "/stats/resources": "每个接口的资源消耗滚动平均 (GET)",
+            "/debug/profile": "按需采样分析，返回折叠栈（GET，需 DEBUG_PROFILING=1）",
             "/load/status": "获取负载测试状态 (GET)",
-            "/load/target": "设置目标负载 (POST)",
+            "/load/target": "设置负载目标，立即生效 (POST, JSON: target_cpu/target_memory/target_disk/...)",
+            "/load/control": "负载控制命令 (POST, JSON: pause|resume|weights|set|status)",
             "/docs": "API文档 (GET)"
         },
         "description": "基于FastAPI的异步文件管理服务，支持并发安全操作、浏览器自动化、终端命令执行、网络 I/O 测试和动态负载控制"
     }
 
 
+# 浏览器场景本地页面集（目录在启动时生成）
+app.mount("/pages", StaticFiles(directory=BROWSER_PAGES_DIR, check_dir=False), name="pages")
+
+
 # 启动时的初始化
 @app.on_event("startup")
 async def startup_event():
@@ -822,6 +2498,24 @@ async def startup_event():
     except Exception as e:
         print(f"创建工作目录失败: {e}")
 
+    # 提升文件描述符限制，以便保持数万个空闲长连接
+    print(f"文件描述符限制: {raise_nofile_limit()}")
+
+    # 生成浏览器场景页面集
+    try:
+        page_count = await asyncio.to_thread(build_browser_pages)
+        print(f"浏览器场景页面已生成: {page_count} 个 ({BROWSER_PAGES_DIR})")
+    except Exception as e:
+        print(f"生成浏览器场景页面失败: {e}")
+
+    # 启动 Blob 服务
+    try:
+        app.state.blob_server = await start_blob_server()
+        print(f"Blob 服务已启动: 端口 {BLOB_PORT}")
+    except Exception as e:
+        app.state.blob_server = None
+        print(f"Blob 服务启动失败: {e}")
+
     # 显示当前文件数量
     files = await get_files_sorted_by_mtime()
     print(f"当前文件数量: {len(files)}")
@@ -835,6 +2529,10 @@ async def shutdown_event():
     """
     print("=" * 50)
     print("文件管理服务正在关闭...")
+    blob_server = getattr(app.state, "blob_server", None)
+    if blob_server is not None:
+        blob_server.close()
+        await blob_server.wait_closed()
     print("=" * 50)
 
 
@@ -846,5 +2544,6 @@ if __name__ == "__main__":
         app,
         host="0.0.0.0",
         port=8080,
+        backlog=16384,
         log_level="info"
     )
@@ -0,0 +1,507 @@
+#!/usr/bin/env python3
+"""
+模板服务（app.py）本地基准测试
+
+不需要构建模板、启动沙箱，直接在本机驱动 FastAPI 应用：
+1. inprocess: 通过 httpx.ASGITransport 在进程内调用（只测处理函数本身）
+2. loopback: 在子进程中用 uvicorn 监听 127.0.0.1，通过回环网络调用（包含 HTTP 解析和 socket 开销）
+
+每个接口以固定并发执行固定数量的请求，记录:
+- 吞吐（requests/s）、延迟 P50/P99
+- 服务端每请求 CPU（来自 X-Res-Cpu-* 响应头）
+- inprocess 模式下额外用 tracemalloc 统计每请求的内存分配（运行期间峰值、净保留的块数和字节数）
+
+依赖外网的接口（/network、/network/concurrent、/search）指向本地的替身服务，
+文件写入到临时目录（通过 FILE_DIR 环境变量），结果保存为 JSON，可用 --baseline 与上次结果对比。
+
+使用方法:
+  python3 benchmark_app.py
+  python3 benchmark_app.py --mode inprocess --concurrency 16 --requests 500 --endpoints health,sum,action
+  python3 benchmark_app.py --baseline outputs/benchmark_app.json --max-regression 20
+"""
+
+import os
+import sys
+import gc
+import json
+import time
+import socket
+import shutil
+import asyncio
+import argparse
+import tempfile
+import threading
+import statistics
+import subprocess
+import tracemalloc
+import contextlib
+from datetime import datetime
+from typing import List, Dict, Optional
+
+import httpx
+from aiohttp import web
+
+# 需要测试的接口；scale 为相对 --requests 的请求数比例（重负载接口少跑一些）
+BENCHMARK_ENDPOINTS = [
+    {"name": "health", "method": "GET", "path": "/health"},
+    {"name": "sum", "method": "GET", "path": "/sum"},
+    {"name": "action", "method": "POST", "path": "/action"},
+    {"name": "terminal_basic", "method": "POST", "path": "/terminal", "params": {"profile": "basic"}, "scale": 0.5},
+    {"name": "terminal_dev", "method": "POST", "path": "/terminal", "params": {"profile": "dev", "concurrency": 1},
+     "scale": 0.05},
+    {"name": "network", "method": "POST", "path": "/network", "scale": 0.25},
+    {"name": "network_concurrent", "method": "POST", "path": "/network/concurrent", "params": {"num_requests": 5},
+     "scale": 0.1},
+    {"name": "idle_stats", "method": "GET", "path": "/idle/stats"},
+    {"name": "stats_resources", "method": "GET", "path": "/stats/resources"},
+    {"name": "load_status", "method": "GET", "path": "/load/status"},
+    {"name": "static_page", "method": "GET", "path": "/pages/spa.html"},
+    {"name": "search", "method": "POST", "path": "/search", "browser": True, "scale": 0.02},
+    {"name": "browser", "method": "POST", "path": "/browser", "params": {"scenario": "spa"}, "browser": True,
+     "scale": 0.02}
+]
+
+# 替身服务把 /delay/{n} 的等待时间按此比例缩短，避免基准被固定等待主导
+STAND_IN_DELAY_SCALE = 0.05
+STAND_IN_CHUNK = os.urandom(64 * 1024)
+SERVER_READY_TIMEOUT = 60.0
+
+
+def free_port() -> int:
+    """获取一个空闲的本地端口"""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class StandInServer:
+    """
+    外网服务的本地替身（aiohttp，运行在独立线程的事件循环中）
+
+    路由:
+    - GET /bytes/{size}: 返回 size 字节数据
+    - GET /delay/{seconds}: 等待 seconds * STAND_IN_DELAY_SCALE 秒后返回 JSON
+    - GET /json/{size}: 返回约 size 字节的 JSON 列表
+    - GET /html/{size}: 返回约 size 字节、带搜索框的 HTML 页面（供 /search 使用）
+    """
+
+    def __init__(self):
+        self.port = free_port()
+        self.loop = asyncio.new_event_loop()
+        self.runner: Optional[web.AppRunner] = None
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    async def _bytes(self, request: web.Request) -> web.StreamResponse:
+        size = int(request.match_info["size"])
+        response = web.StreamResponse(headers={"Content-Type": "application/octet-stream"})
+        response.content_length = size
+        await response.prepare(request)
+        remaining = size
+        while remaining:
+            chunk = STAND_IN_CHUNK[:min(remaining, len(STAND_IN_CHUNK))]
+            await response.write(chunk)
+            remaining -= len(chunk)
+        await response.write_eof()
+        return response
+
+    async def _delay(self, request: web.Request) -> web.Response:
+        seconds = float(request.match_info["seconds"])
+        await asyncio.sleep(seconds * STAND_IN_DELAY_SCALE)
+        return web.json_response({"delay": seconds, "scaled": seconds * STAND_IN_DELAY_SCALE})
+
+    async def _json(self, request: web.Request) -> web.Response:
+        size = int(request.match_info["size"])
+        items = [{"id": i, "title": f"item {i}", "body": "x" * 64} for i in range(max(1, size // 100))]
+        return web.json_response(items)
+
+    async def _html(self, request: web.Request) -> web.Response:
+        size = int(request.match_info["size"])
+        paragraph = "<p>" + "stand-in content " * 5 + "</p>\n"
+        body = paragraph * max(1, size // len(paragraph))
+        html = ("<!DOCTYPE html><html><head><title>stand-in</title></head><body>"
+                "<form action=\"/html/1024\"><textarea name=\"q\"></textarea></form>"
+                f"{body}</body></html>")
+        return web.Response(text=html, content_type="text/html")
+
+    def start(self):
+        async def _start():
+            stand_in = web.Application()
+            stand_in.router.add_get("/bytes/{size}", self._bytes)
+            stand_in.router.add_get("/delay/{seconds}", self._delay)
+            stand_in.router.add_get("/json/{size}", self._json)
+            stand_in.router.add_get("/html/{size}", self._html)
+            self.runner = web.AppRunner(stand_in, access_log=None)
+            await self.runner.setup()
+            await web.TCPSite(self.runner, "127.0.0.1", self.port).start()
+
+        self.thread.start()
+        asyncio.run_coroutine_threadsafe(_start(), self.loop).result()
+
+    def stop(self):
+        if self.runner is not None:
+            asyncio.run_coroutine_threadsafe(self.runner.cleanup(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(timeout=5)
+
+
+def stand_in_network_urls(network_test_urls: List[dict], base_url: str) -> List[dict]:
+    """把 NETWORK_TEST_URLS 中的外网地址映射为替身服务上同类型、同大小的地址"""
+    urls = []
+    for config in network_test_urls:
+        size = max(1, int(config["size_mb"] * 1024 * 1024))
+        if config["type"] == "download":
+            path = f"/bytes/{size}"
+        elif config["type"] == "latency":
+            path = f"/delay/{config['url'].rstrip('/').rsplit('/', 1)[-1]}"
+        elif config["type"] == "api":
+            path = f"/json/{size}"
+        else:
+            path = f"/html/{size}"
+        urls.append({**config, "url": base_url + path, "description": f"[替身] {config['description']}"})
+    return urls
+
+
+def configure_environment(workdir: str, stand_in_url: str):
+    """导入 app 之前设置环境变量：文件目录指向临时目录，Blob 服务使用随机端口"""
+    os.environ["FILE_DIR"] = workdir.rstrip("/") + "/"
+    os.environ["SEARCH_URL"] = f"{stand_in_url}/html/65536"
+    os.environ["BLOB_PORT"] = "0"
+    os.environ.setdefault("TERMINAL_PROFILE", "dev")
+
+
+def import_app(stand_in_url: str):
+    """导入 app 模块并把网络测试地址替换为替身服务"""
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    import app as app_module
+    app_module.NETWORK_TEST_URLS = stand_in_network_urls(app_module.NETWORK_TEST_URLS, stand_in_url)
+    return app_module
+
+
+def summarize_latencies(values_ms: List[float]) -> Dict:
+    """延迟统计（毫秒）"""
+    if not values_ms:
+        return {"count": 0}
+    values = sorted(values_ms)
+
+    def pick(p: float) -> float:
+        return values[min(len(values) - 1, int(p / 100 * len(values)))]
+
+    return {
+        "count": len(values),
+        "mean": round(statistics.mean(values), 3),
+        "p50": round(pick(50), 3),
+        "p99": round(pick(99), 3),
+        "max": round(values[-1], 3)
+    }
+
+
+async def run_endpoint(client: httpx.AsyncClient, spec: dict, concurrency: int, requests: int) -> Dict:
+    """以固定并发对一个接口发送 requests 个请求"""
+    latencies: List[float] = []
+    server_cpu: List[float] = []
+    errors = {"count": 0, "last": None}
+    remaining = [requests]
+
+    async def worker():
+        while remaining[0] > 0:
+            remaining[0] -= 1
+            start = time.perf_counter()
+            try:
+                response = await client.request(spec["method"], spec["path"], params=spec.get("params"))
+                elapsed = (time.perf_counter() - start) * 1000
+                if response.status_code >= 400:
+                    errors["count"] += 1
+                    errors["last"] = f"HTTP {response.status_code}: {response.text[:200]}"
+                    continue
+                latencies.append(elapsed)
+                if "x-res-cpu-process-ms" in response.headers:
+                    server_cpu.append(float(response.headers["x-res-cpu-process-ms"]) +
+                                      float(response.headers.get("x-res-cpu-children-ms", 0)))
+            except Exception as e:
+                errors["count"] += 1
+                errors["last"] = f"{type(e).__name__}: {e}"
+
+    start = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(min(concurrency, requests))])
+    elapsed = time.perf_counter() - start
+
+    return {
+        "endpoint": spec["name"],
+        "method": spec["method"],
+        "path": spec["path"],
+        "concurrency": concurrency,
+        "requests": requests,
+        "errors": errors["count"],
+        "last_error": errors["last"],
+        "elapsed_seconds": round(elapsed, 3),
+        "requests_per_second": round(len(latencies) / elapsed, 2) if elapsed > 0 else 0,
+        "latency_ms": summarize_latencies(latencies),
+        "server_cpu_ms_per_request": round(statistics.mean(server_cpu), 3) if server_cpu else None
+    }
+
+
+def traced_blocks() -> int:
+    """当前被 tracemalloc 跟踪的内存块数量"""
+    return sum(stat.count for stat in tracemalloc.take_snapshot().statistics("filename"))
+
+
+async def measure_allocations(client: httpx.AsyncClient, spec: dict, concurrency: int, requests: int) -> Dict:
+    """
+    在 tracemalloc 下重新运行一次，统计每请求的内存分配
+
+    tracemalloc 只能观察到当前存活的内存，因此给出两个指标：
+    - peak_kb_per_request: 运行期间已跟踪内存的峰值增量 / 并发数（每个在途请求的峰值占用）
+    - net_blocks_per_request / net_bytes_per_request: 运行结束后净保留的块数和字节数（泄漏或缓存增长）
+    """
+    gc.collect()
+    tracemalloc.start()
+    try:
+        blocks_before = traced_blocks()
+        current_before, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        await run_endpoint(client, spec, concurrency, requests)
+        _, peak = tracemalloc.get_traced_memory()
+        gc.collect()
+        current_after, _ = tracemalloc.get_traced_memory()
+        blocks_after = traced_blocks()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "requests": requests,
+        "peak_kb_per_request": round((peak - current_before) / 1024 / min(concurrency, requests), 2),
+        "net_blocks_per_request": round((blocks_after - blocks_before) / requests, 2),
+        "net_bytes_per_request": round((current_after - current_before) / requests, 1)
+    }
+
+
+def endpoint_requests(spec: dict, requests: int) -> int:
+    return max(1, int(requests * spec.get("scale", 1.0)))
+
+
+async def benchmark_inprocess(app_module, endpoints: List[dict], concurrency: int, requests: int,
+                              alloc_requests: int, log_file) -> List[Dict]:
+    """通过 ASGITransport 在进程内调用"""
+    results = []
+    transport = httpx.ASGITransport(app=app_module.app)
+    limits = httpx.Limits(max_connections=None)
+    with contextlib.redirect_stdout(log_file):
+        await app_module.app.router.startup()
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark",
+                                     timeout=120.0, limits=limits) as client:
+            for spec in endpoints:
+                count = endpoint_requests(spec, requests)
+                with contextlib.redirect_stdout(log_file):
+                    # 预热（生成开发者任务素材、建立连接池等）
+                    await run_endpoint(client, spec, 1, 1)
+                    result = await run_endpoint(client, spec, concurrency, count)
+                    if alloc_requests > 0:
+                        result["allocations"] = await measure_allocations(
+                            client, spec, concurrency, endpoint_requests(spec, alloc_requests))
+                results.append(result)
+                print_result("inprocess", result)
+    finally:
+        with contextlib.redirect_stdout(log_file):
+            await app_module.app.router.shutdown()
+    return results
+
+
+async def wait_for_server(base_url: str, process: subprocess.Popen):
+    deadline = time.monotonic() + SERVER_READY_TIMEOUT
+    async with httpx.AsyncClient(timeout=2.0) as client:
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                raise RuntimeError(f"uvicorn 子进程已退出，返回码 {process.returncode}")
+            try:
+                if (await client.get(f"{base_url}/health")).status_code == 200:
+                    return
+            except httpx.RequestError:
+                pass
+            await asyncio.sleep(0.2)
+    raise TimeoutError("等待 uvicorn 启动超时")
+
+
+async def benchmark_loopback(endpoints: List[dict], concurrency: int, requests: int, workdir: str,
+                             stand_in_url: str, log_file) -> List[Dict]:
+    """在子进程中运行 uvicorn，通过 127.0.0.1 回环网络调用"""
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    process = subprocess.Popen(
+        [sys.executable, os.path.abspath(__file__), "--serve", "--port", str(port),
+         "--workdir", workdir, "--stand-in-url", stand_in_url],
+        stdout=log_file, stderr=subprocess.STDOUT
+    )
+    results = []
+    try:
+        await wait_for_server(base_url, process)
+        limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+        async with httpx.AsyncClient(base_url=base_url, timeout=120.0, limits=limits) as client:
+            for spec in endpoints:
+                await run_endpoint(client, spec, 1, 1)
+                result = await run_endpoint(client, spec, concurrency, endpoint_requests(spec, requests))
+                results.append(result)
+                print_result("loopback", result)
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+    return results
+
+
+def serve(port: int, workdir: str, stand_in_url: str):
+    """loopback 模式的子进程入口：配置环境后以 uvicorn 运行 app"""
+    configure_environment(workdir, stand_in_url)
+    app_module = import_app(stand_in_url)
+    import uvicorn
+    uvicorn.run(app_module.app, host="127.0.0.1", port=port, log_level="warning", access_log=False)
+
+
+def print_result(mode: str, result: Dict):
+    latency = result["latency_ms"]
+    line = (f"  [{mode:9s}] {result['endpoint']:20s} {result['requests_per_second']:9.2f} req/s  "
+            f"P50 {latency.get('p50', 0):8.2f} ms  P99 {latency.get('p99', 0):8.2f} ms")
+    if result.get("server_cpu_ms_per_request") is not None:
+        line += f"  CPU {result['server_cpu_ms_per_request']:.2f} ms"
+    if "allocations" in result:
+        line += (f"  峰值 {result['allocations']['peak_kb_per_request']:.1f} KB/请求"
+                 f"  净块 {result['allocations']['net_blocks_per_request']:.1f}")
+    if result["errors"]:
+        line += f"  失败 {result['errors']} ({result['last_error']})"
+    print(line)
+
+
+def compare_with_baseline(results: Dict[str, List[Dict]], baseline_path: str, max_regression: float) -> List[Dict]:
+    """与上次结果对比，吞吐下降或 P99 上升超过 max_regression% 的接口视为回归"""
+    with open(baseline_path, "r") as f:
+        baseline = json.load(f)["results"]
+
+    regressions = []
+    for mode, mode_results in results.items():
+        previous = {r["endpoint"]: r for r in baseline.get(mode, [])}
+        for result in mode_results:
+            old = previous.get(result["endpoint"])
+            if not old or not old["requests_per_second"] or result["errors"]:
+                continue
+            rps_change = (result["requests_per_second"] / old["requests_per_second"] - 1) * 100
+            old_p99 = old["latency_ms"].get("p99") or 0
+            p99_change = (result["latency_ms"].get("p99", 0) / old_p99 - 1) * 100 if old_p99 else 0
+            if rps_change < -max_regression or p99_change > max_regression:
+                regressions.append({
+                    "mode": mode,
+                    "endpoint": result["endpoint"],
+                    "rps_change_percent": round(rps_change, 1),
+                    "p99_change_percent": round(p99_change, 1)
+                })
+    return regressions
+
+
+async def run_benchmark(args) -> Dict:
+    stand_in = StandInServer()
+    stand_in.start()
+    workdir = tempfile.mkdtemp(prefix="app_benchmark_")
+    log_path = os.path.join(workdir, "app.log")
+    print(f"替身服务: {stand_in.base_url}")
+    print(f"临时目录: {workdir}（服务日志: {log_path}）")
+
+    selected = set(args.endpoints.split(",")) if args.endpoints else None
+    endpoints = [
+        spec for spec in BENCHMARK_ENDPOINTS
+        if (selected is None and (args.include_browser or not spec.get("browser")))
+        or (selected is not None and spec["name"] in selected)
+    ]
+
+    results: Dict[str, List[Dict]] = {}
+    try:
+        with open(log_path, "w") as log_file:
+            if args.mode in ("inprocess", "both"):
+                print("\n[inprocess] httpx.ASGITransport")
+                configure_environment(os.path.join(workdir, "inprocess"), stand_in.base_url)
+                app_module = import_app(stand_in.base_url)
+                results["inprocess"] = await benchmark_inprocess(
+                    app_module, endpoints, args.concurrency, args.requests, args.alloc_requests, log_file)
+            if args.mode in ("loopback", "both"):
+                print("\n[loopback] uvicorn @ 127.0.0.1")
+                results["loopback"] = await benchmark_loopback(
+                    endpoints, args.concurrency, args.requests, os.path.join(workdir, "loopback"),
+                    stand_in.base_url, log_file)
+    finally:
+        stand_in.stop()
+        if not args.keep_workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="模板服务 app.py 本地基准测试")
+    parser.add_argument("--mode", choices=["inprocess", "loopback", "both"], default="both", help="运行模式")
+    parser.add_argument("--concurrency", type=int, default=8, help="每个接口的并发数 (默认: 8)")
+    parser.add_argument("--requests", type=int, default=200, help="每个接口的基准请求数 (默认: 200)")
+    parser.add_argument("--alloc-requests", type=int, default=50,
+                        help="tracemalloc 统计使用的请求数，0 表示不统计 (默认: 50)")
+    parser.add_argument("--endpoints", type=str, help=f"逗号分隔的接口名称，可选: "
+                        f"{','.join(s['name'] for s in BENCHMARK_ENDPOINTS)}")
+    parser.add_argument("--include-browser", action="store_true", help="包含需要 Chromium 的 /search、/browser")
+    parser.add_argument("--baseline", type=str, help="与之前保存的结果对比")
+    parser.add_argument("--max-regression", type=float, default=20.0,
+                        help="允许的吞吐下降 / P99 上升百分比，超过则以非零状态退出 (默认: 20)")
+    parser.add_argument("--keep-workdir", action="store_true", help="保留临时目录和服务日志")
+    parser.add_argument("--output", type=str, default="outputs/benchmark_app.json",
+                        help="输出文件路径 (默认: outputs/benchmark_app.json)")
+    # loopback 模式子进程参数
+    parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--port", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--workdir", type=str, help=argparse.SUPPRESS)
+    parser.add_argument("--stand-in-url", type=str, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.port, args.workdir, args.stand_in_url)
+        return
+
+    print("=" * 60)
+    print("app.py 基准测试")
+    print("=" * 60)
+    print(f"模式: {args.mode}, 并发: {args.concurrency}, 请求数: {args.requests}")
+
+    results = asyncio.run(run_benchmark(args))
+
+    output = {
+        "test": "app_benchmark",
+        "config": vars(args),
+        "environment": {
+            "python": sys.version.split()[0],
+            "cpu_count": os.cpu_count()
+        },
+        "results": results,
+        "timestamp": datetime.now().isoformat()
+    }
+
+    regressions = []
+    if args.baseline:
+        regressions = compare_with_baseline(results, args.baseline, args.max_regression)
+        output["baseline"] = args.baseline
+        output["regressions"] = regressions
+        print(f"\n与基准 {args.baseline} 对比: {len(regressions)} 个回归")
+        for item in regressions:
+            print(f"  [{item['mode']}] {item['endpoint']}: 吞吐 {item['rps_change_percent']:+.1f}%, "
+                  f"P99 {item['p99_change_percent']:+.1f}%")
+
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(output, f, indent=2, ensure_ascii=False)
+    print(f"\n结果已保存到: {args.output}")
+
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
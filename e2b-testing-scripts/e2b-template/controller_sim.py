@@ -0,0 +1,329 @@
+#!/usr/bin/env python3
+"""
+负载控制器离线仿真
+
+用 load_controller.py 中的 PIDController 控制一个模拟的被控对象（一阶惯性 + 纯滞后 + 测量噪声，
+测量值为采样窗口内的平均值，与 ProcSampler 的滑动窗口一致），按设定值序列逐级阶跃，
+报告每一级的调节时间、超调量和稳态误差。无需沙箱或真实负载即可评估 PID 参数和自动整定结果。
+
+内存 / 磁盘的执行机构与控制服务一致：ballast 与 PID 输出相差超过死区才调整，内存每个控制周期最多
+增减 memory_step_mb，磁盘增长按 disk_write_mbps 限速（释放不限速）。PID 的积分项与控制服务一样
+限制在执行机构本周期可达的范围内（见 PIDController.update 的 reachable 参数）。
+
+使用方法:
+  python3 controller_sim.py
+  python3 controller_sim.py --resource cpu --gain 0.2 --tau 5 --dead-time 2 --noise 2 --autotune
+  python3 controller_sim.py --kp 1.0 --ki 0.2 --setpoints 30,60,90 --hold 90
+  python3 controller_sim.py --resource disk --total-mb 20480 --disk-write-mbps 100
+"""
+
+import os
+import sys
+import json
+import random
+import argparse
+from collections import deque
+from datetime import datetime
+from functools import partial
+from typing import List, Dict, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from load_controller import (
+    PIDController, DEFAULT_PID_GAINS, AUTOTUNE_SETTLE_SECONDS, AUTOTUNE_STEP_SECONDS,
+    DEFAULT_ENDPOINTS, DEFAULT_WORKERS_PER_ENDPOINT, BALLAST_DEADBAND_BYTES, DEFAULT_MEMORY_STEP_BYTES,
+    DEFAULT_DISK_WRITE_MBPS, fit_fopdt, simc_pi_gains, pid_output_range, request_rate_for_interval
+)
+
+# 各资源的默认被控对象参数
+# cpu: 输出为总请求速率（req/s），gain 为每 req/s 带来的 CPU 百分比
+# memory / disk: 输出为 ballast 占总量的比例，gain 为 100（%/比例），total_mb 为内存 / 磁盘总量
+DEFAULT_PLANTS = {
+    'cpu': {'gain': 0.15, 'tau': 3.0, 'dead_time': 1.0, 'noise': 1.0, 'window': 5.0, 'baseline': 3.0,
+            'setpoints': '20,50,80,30', 'total_mb': 0.0},
+    'memory': {'gain': 100.0, 'tau': 0.5, 'dead_time': 1.0, 'noise': 0.2, 'window': 1.0, 'baseline': 20.0,
+               'setpoints': '40,60,30', 'total_mb': 8192.0},
+    'disk': {'gain': 100.0, 'tau': 0.5, 'dead_time': 1.0, 'noise': 0.05, 'window': 1.0, 'baseline': 30.0,
+             'setpoints': '40,60,35', 'total_mb': 20480.0}
+}
+SIM_STEP = 0.05  # 被控对象积分步长（秒）
+
+
+class BallastActuator:
+    """
+    ballast 执行机构：与 LoadControllerService.adjust_memory / adjust_disk 一致
+
+    每个控制周期开始时，若 ballast 与 PID 输出相差超过死区，则向输出移动，增加 / 减少量分别不超过
+    up / down（占总量的比例，None 表示不限）；移动在本周期内匀速完成（对应线程中的分配或限速写入）。
+    """
+
+    def __init__(self, deadband: float, up: Optional[float], down: Optional[float]):
+        self.deadband = deadband
+        self.up = up
+        self.down = down
+        self.level = 0.0
+        self.start = 0.0
+        self.goal = 0.0
+
+    def command(self, output: float):
+        """控制周期开始：按输出确定本周期的移动目标"""
+        self.start = self.level
+        delta = output - self.level
+        if abs(delta) <= self.deadband:
+            delta = 0.0
+        elif delta > 0 and self.up is not None:
+            delta = min(delta, self.up)
+        elif delta < 0 and self.down is not None:
+            delta = max(delta, -self.down)
+        self.goal = self.level + delta
+
+    def reachable(self) -> tuple:
+        """本周期能达到的输出范围，与 LoadControllerService.get_reachable_output 一致"""
+        return (self.level - self.down if self.down is not None else float('-inf'),
+                self.level + self.up if self.up is not None else float('inf'))
+
+    def step(self, fraction: float) -> float:
+        """本周期已完成 fraction（0~1）时的 ballast 比例"""
+        self.level = self.start + (self.goal - self.start) * fraction
+        return self.level
+
+
+class SimulatedPlant:
+    """一阶惯性 + 纯滞后被控对象，测量值为窗口平均加高斯噪声；actuator 为 None 时输出直接作用"""
+
+    def __init__(self, gain: float, tau: float, dead_time: float, noise: float, window: float,
+                 baseline: float, rng: random.Random, actuator: Optional[BallastActuator] = None):
+        self.gain = gain
+        self.tau = max(tau, SIM_STEP)
+        self.noise = noise
+        self.baseline = baseline
+        self.rng = rng
+        self.actuator = actuator
+        self.value = baseline
+        self.time = 0.0
+        self.delay = deque([0.0] * max(1, int(round(dead_time / SIM_STEP))))
+        self.window = deque(maxlen=max(1, int(round(window / SIM_STEP))))
+
+    def advance(self, output: float, duration: float) -> float:
+        """以恒定输出推进 duration 秒（一个控制周期），返回本时刻的测量值"""
+        steps = max(1, int(round(duration / SIM_STEP)))
+        if self.actuator is not None:
+            self.actuator.command(output)
+        for i in range(steps):
+            applied = self.actuator.step((i + 1) / steps) if self.actuator is not None else output
+            self.delay.append(applied)
+            delayed = self.delay.popleft()
+            target = min(100.0, max(0.0, self.baseline + self.gain * delayed))
+            self.value += SIM_STEP / self.tau * (target - self.value)
+            self.window.append(self.value)
+            self.time += SIM_STEP
+        measured = sum(self.window) / len(self.window) + self.rng.gauss(0.0, self.noise)
+        return min(100.0, max(0.0, measured))
+
+
+def make_actuator(args) -> Optional[BallastActuator]:
+    """内存 / 磁盘 ballast 的死区和每周期变化上限（按总量换算成比例）"""
+    if args.resource == 'cpu':
+        return None
+    total_bytes = args.total_mb * 1024 * 1024
+    deadband = BALLAST_DEADBAND_BYTES / total_bytes
+    if args.resource == 'memory':
+        step = args.memory_step_mb * 1024 * 1024 / total_bytes
+        return BallastActuator(deadband, step, step)
+    # 磁盘增长按写入速率限速，0 表示不限；释放不限速
+    up = args.disk_write_mbps * 1024 * 1024 * args.control_interval / total_bytes if args.disk_write_mbps > 0 else None
+    return BallastActuator(deadband, up, None)
+
+
+def make_plant(args, rng: random.Random) -> SimulatedPlant:
+    return SimulatedPlant(args.gain, args.tau, args.dead_time, args.noise, args.window, args.baseline, rng,
+                          make_actuator(args))
+
+
+def make_pid(resource: str, gains: Dict[str, float]) -> PIDController:
+    """与 LoadControllerService 使用相同的输出范围（CPU 按默认接口权重换算）"""
+    interval_to_rate = partial(request_rate_for_interval, DEFAULT_ENDPOINTS, DEFAULT_WORKERS_PER_ENDPOINT)
+    output_min, output_max = pid_output_range(resource, interval_to_rate)
+    pid = PIDController(output_min=output_min, output_max=output_max, **gains)
+    pid.reset(output_min)
+    return pid
+
+
+def run_autotune(args, rng: random.Random, pid: PIDController) -> Dict:
+    """对模拟对象执行与 LoadControllerService.autotune 相同的阶跃测试"""
+    plant = make_plant(args, rng)
+    base_output = (pid.output_min + pid.output_max) / 4
+    step = max(base_output * 0.5, 10.0) if args.resource == 'cpu' else 0.05
+    # 先让对象在基准输出下稳定，阶跃测试从稳态开始
+    measured = plant.advance(base_output, 10 * args.tau + args.dead_time + args.window)
+
+    times, values = [], []
+    elapsed = 0.0
+    while elapsed <= AUTOTUNE_SETTLE_SECONDS + AUTOTUNE_STEP_SECONDS:
+        output = base_output + (step if elapsed >= AUTOTUNE_SETTLE_SECONDS else 0.0)
+        # 与控制器中一致：先读取测量值，再施加本周期的输出
+        times.append(elapsed)
+        values.append(measured)
+        measured = plant.advance(output, args.control_interval)
+        elapsed += args.control_interval
+
+    model = fit_fopdt(times, values, AUTOTUNE_SETTLE_SECONDS, step, args.control_interval)
+    gains = simc_pi_gains(model['gain'], model['tau'], model['dead_time'], sample_period=args.control_interval)
+    return {'model': model, 'gains': gains, 'base_output': base_output, 'step': step}
+
+
+def segment_metrics(times: List[float], values: List[float], start_value: float, setpoint: float,
+                    band: float) -> Dict:
+    """计算一级设定值的调节时间、超调量和稳态误差（基于被控对象真实值）"""
+    step = setpoint - start_value
+    settling_time: Optional[float] = 0.0
+    for t, v in zip(times, values):
+        if abs(v - setpoint) > band:
+            settling_time = t
+    if abs(values[-1] - setpoint) > band:
+        settling_time = None
+
+    if step > 0:
+        overshoot = max(0.0, max(values) - setpoint)
+    else:
+        overshoot = max(0.0, setpoint - min(values))
+    tail = values[-max(1, len(values) // 4):]
+
+    return {
+        'setpoint': setpoint,
+        'start_value': round(start_value, 3),
+        'settling_time_seconds': round(settling_time, 2) if settling_time is not None else None,
+        'overshoot_percent': round(overshoot / abs(step) * 100, 2) if step else 0.0,
+        'steady_state_error': round(sum(setpoint - v for v in tail) / len(tail), 3),
+        'final_value': round(values[-1], 3)
+    }
+
+
+def simulate(args, pid: PIDController, rng: random.Random) -> Dict:
+    """按设定值序列运行闭环仿真"""
+    plant = make_plant(args, rng)
+    setpoints = [float(x) for x in args.setpoints.split(',') if x.strip()]
+    segments = []
+    trace = []
+    elapsed = 0.0
+    measured = plant.advance(pid.output, args.control_interval)
+
+    for setpoint in setpoints:
+        times, values = [], []
+        start_value = plant.value
+        segment_time = 0.0
+        while segment_time < args.hold:
+            reachable = plant.actuator.reachable() if plant.actuator is not None else None
+            output = pid.update(setpoint, measured, args.control_interval, reachable)
+            measured = plant.advance(output, args.control_interval)
+            segment_time += args.control_interval
+            elapsed += args.control_interval
+            times.append(segment_time)
+            values.append(plant.value)
+            trace.append({'time': round(elapsed, 2), 'setpoint': setpoint, 'output': round(output, 4),
+                          'measured': round(measured, 3), 'actual': round(plant.value, 3)})
+        segments.append(segment_metrics(times, values, start_value, setpoint, args.band))
+
+    settled = [s['settling_time_seconds'] for s in segments if s['settling_time_seconds'] is not None]
+    return {
+        'segments': segments,
+        'summary': {
+            'settled_segments': len(settled),
+            'total_segments': len(segments),
+            'max_settling_time_seconds': max(settled) if settled else None,
+            'mean_settling_time_seconds': round(sum(settled) / len(settled), 2) if settled else None,
+            'max_overshoot_percent': max(s['overshoot_percent'] for s in segments),
+            'max_abs_steady_state_error': max(abs(s['steady_state_error']) for s in segments)
+        },
+        'trace': trace
+    }
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="负载控制器 PID 离线仿真")
+    parser.add_argument("--resource", choices=list(DEFAULT_PLANTS), default="cpu", help="被控资源 (默认: cpu)")
+    parser.add_argument("--gain", type=float, help="对象增益（%% / 输出单位）")
+    parser.add_argument("--tau", type=float, help="对象时间常数（秒）")
+    parser.add_argument("--dead-time", type=float, help="纯滞后（秒）")
+    parser.add_argument("--noise", type=float, help="测量噪声标准差（百分点）")
+    parser.add_argument("--window", type=float, help="测量滑动窗口（秒）")
+    parser.add_argument("--baseline", type=float, help="零输出时的基础使用率（%%）")
+    parser.add_argument("--total-mb", type=float, help="内存 / 磁盘总量（MB，换算 ballast 的变化上限和死区）")
+    parser.add_argument("--memory-step-mb", type=float, default=DEFAULT_MEMORY_STEP_BYTES / 1024 / 1024,
+                        help="每个控制周期内存 ballast 最多增减的量（MB，默认与控制服务一致）")
+    parser.add_argument("--disk-write-mbps", type=float, default=DEFAULT_DISK_WRITE_MBPS,
+                        help="磁盘 ballast 写入速率上限（MB/s，0 表示不限，默认与控制服务一致）")
+    parser.add_argument("--setpoints", type=str, help="逗号分隔的设定值序列（%%）")
+    parser.add_argument("--hold", type=float, default=120.0, help="每个设定值保持时间（秒，默认: 120）")
+    parser.add_argument("--control-interval", type=float, default=1.0, help="控制周期（秒，默认: 1）")
+    parser.add_argument("--band", type=float, default=2.0, help="调节时间的误差带（百分点，默认: 2）")
+    parser.add_argument("--kp", type=float, help="比例系数（默认取 DEFAULT_PID_GAINS）")
+    parser.add_argument("--ki", type=float, help="积分系数")
+    parser.add_argument("--kd", type=float, help="微分系数")
+    parser.add_argument("--autotune", action="store_true", help="先对模拟对象做阶跃测试，使用 SIMC 整定的参数")
+    parser.add_argument("--seed", type=int, default=1, help="随机种子 (默认: 1)")
+    parser.add_argument("--trace", action="store_true", help="在输出文件中包含逐周期轨迹")
+    parser.add_argument("--output", type=str, default="outputs/controller_sim.json",
+                        help="输出文件路径 (默认: outputs/controller_sim.json)")
+    args = parser.parse_args()
+
+    for key, value in DEFAULT_PLANTS[args.resource].items():
+        if getattr(args, key) is None:
+            setattr(args, key, value)
+
+    rng = random.Random(args.seed)
+    gains = dict(DEFAULT_PID_GAINS[args.resource])
+    autotune = None
+    if args.autotune:
+        autotune = run_autotune(args, rng, make_pid(args.resource, gains))
+        gains = autotune['gains']
+    for key in ('kp', 'ki', 'kd'):
+        if getattr(args, key) is not None:
+            gains[key] = getattr(args, key)
+
+    print("=" * 60)
+    print(f"PID 仿真: {args.resource}")
+    print("=" * 60)
+    print(f"对象: K={args.gain}, tau={args.tau}s, theta={args.dead_time}s, 噪声={args.noise}, "
+          f"窗口={args.window}s, 基础={args.baseline}%")
+    if args.resource == 'memory':
+        print(f"执行机构: 总量 {args.total_mb:g}MB, 每周期最多增减 {args.memory_step_mb:g}MB")
+    elif args.resource == 'disk':
+        print(f"执行机构: 总量 {args.total_mb:g}MB, 写入限速 {args.disk_write_mbps:g}MB/s" +
+              ("（不限速）" if args.disk_write_mbps <= 0 else ""))
+    if autotune:
+        model = autotune['model']
+        print(f"整定: K={model['gain']:.4g}, tau={model['tau']:.2f}s, theta={model['dead_time']:.2f}s")
+    print(f"参数: kp={gains['kp']:.4g}, ki={gains['ki']:.4g}, kd={gains['kd']:.4g}")
+
+    pid = make_pid(args.resource, gains)
+    result = simulate(args, pid, rng)
+
+    print(f"\n{'设定值':>8s} {'调节时间(s)':>12s} {'超调(%)':>10s} {'稳态误差':>10s}")
+    for segment in result['segments']:
+        settling = segment['settling_time_seconds']
+        print(f"{segment['setpoint']:8.1f} {settling if settling is not None else '未稳定':>12} "
+              f"{segment['overshoot_percent']:10.2f} {segment['steady_state_error']:10.3f}")
+    summary = result['summary']
+    print(f"\n已稳定 {summary['settled_segments']}/{summary['total_segments']}，"
+          f"最长调节时间 {summary['max_settling_time_seconds']}s，最大超调 {summary['max_overshoot_percent']}%")
+
+    output = {
+        "test": "controller_sim",
+        "config": vars(args),
+        "gains": gains,
+        "autotune": autotune,
+        "segments": result['segments'],
+        "summary": summary,
+        "timestamp": datetime.now().isoformat()
+    }
+    if args.trace:
+        output["trace"] = result['trace']
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(output, f, indent=2, ensure_ascii=False)
+    print(f"\n结果已保存到: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
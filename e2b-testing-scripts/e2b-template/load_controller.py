@@ -4,18 +4,1717 @@
 功能：
 1. 作为后台服务运行，持续生成负载
 2. 默认以 50% CPU 和 50% 内存使用率运行
-3. 通过配置文件接收目标调整指令
+3. 通过配置文件或控制 socket 接收目标调整指令
 4. 定期保存状态到文件供查询
+
+配置文件在修改时间变化时重新读取；控制 socket（/tmp/load_controller.sock）接收 JSON Lines 命令并立即生效，
+每行一个命令，返回一行 JSON 结果：
+- {"command": "set", "target_cpu": 70, ...}: 设置任意配置字段（与配置文件字段相同），并立即执行一次控制周期
+- {"command": "pause"} / {"command": "resume"}: 暂停 / 恢复请求 worker 和 open 模式调度器
+- {"command": "weights", "weights": {"sum": 2.0, "search": 0}}: 修改接口权重（0 表示停止调用该接口）
+- {"command": "status"}: 返回当前状态
+
+配置文件 /tmp/load_controller_config.json 支持的字段：
+- target_cpu / target_memory / target_disk: 目标使用率（%）
+- sampler: 指标采样后端，proc（默认，直接读取 /proc 和 cgroup v2）或 node_exporter
+- sample_window: 计算 CPU 使用率的滑动窗口（秒，默认 5）
+- sample_interval: 采样间隔（秒，默认 1）
+- control_interval: 控制周期（秒，默认 1）
+- cpu_pid / memory_pid / disk_pid: PID 参数，例如 {"kp": 2.0, "ki": 0.5, "kd": 0}
+- autotune / autotune_id / autotune_step: 对 cpu、memory 或 disk 执行一次阶跃测试自动整定，
+  autotune_id 变化时重新整定
+- load_mode: closed（默认，worker 等待响应后再发送）或 open（按目标速率发送，与响应无关）
+- arrival_process: open 模式的到达过程，constant 或 poisson（默认）
+- max_inflight: open 模式的在途请求上限（默认 256，超过则丢弃到达并计数）
+- memory_step_mb: 每个控制周期内存 ballast 最多增减的量（MB，默认 1024）
+- memory_huge_pages: 内存 ballast 是否使用透明大页（默认 false）
+- disk_ballast_mode: 磁盘 ballast 方式，fallocate（只分配空间，不产生写 IO）、
+  buffered（默认，分块写入后 fdatasync 并丢弃页缓存）或 odirect（O_DIRECT 对齐写入，绕过页缓存）
+- disk_write_mbps: buffered / odirect 的写入速率上限（MB/s，默认 200，0 表示不限速）
+- target_disk_iops / target_disk_mbps: 根文件系统所在块设备的 IO 强度目标（按 /proc/diskstats 读写合计），
+  0 表示关闭；两者都设置时以 IOPS 为准
+- disk_io_block_kb: IO 生成器的块大小（KB，默认 4，按 4KB 对齐）
+- disk_io_read_ratio: IO 生成器中读操作的比例（0~1，默认 0.7）
+- disk_io_threads / disk_io_file_mb: IO 生成器的线程数（默认 4）和测试文件大小（MB，默认 256），
+  在生成器下次启动时生效
+- target_net_rx_mbps / target_net_tx_mbps: 入向 / 出向网络带宽目标（Mbit/s，按网卡计数器测量），0 表示关闭
+- net_endpoint: 网络流量的对端，使用 app.py 的 Blob 协议（GET /blob/{size}、PUT /blob?sink=discard），
+  例如宿主机上的替身服务 http://<host>:8081；未配置时不生成网络流量
+- net_interface: 测量带宽的网卡（默认：对端为回环地址时用 lo，否则用默认路由的网卡）；
+  lo 的收发计数相同、无法区分方向，此时改用生成器自身的收发字节数
+- net_streams: 每个方向的并发流数（默认 4）
+- profile: 按时间播放的目标曲线，null 表示停止（目标保持在最后的值），内容变化时从头开始，例如
+  {"start_offset": 30, "time_scale": 1, "loop": true, "duration": 600, "tracks": {
+      "target_cpu": {"shape": "ramp", "points": [[0, 10], [120, 80], [300, 80], [360, 20]]},
+      "target_memory": {"shape": "sine", "mean": 40, "amplitude": 15, "period": 300},
+      "target_net_rx_mbps": {"shape": "square", "low": 0, "high": 400, "period": 60, "duty": 0.2},
+      "target_disk_iops": {"shape": "csv", "path": "/tmp/trace.csv", "column": "iops", "scale": 1.0}}}
+  - start_at: 绝对开始时间（epoch 秒或 ISO 8601，默认为收到 profile 的时间），start_offset: 在此基础上延后的秒数，
+    用于在多个沙箱间错开或对齐
+  - time_scale: 播放速度倍数；duration: 播放时长（秒，播放时间），loop 为 true 时按 duration 循环
+  - ramp: points 为 [时间, 值] 折线（或 from / to / duration）；sine: mean / amplitude / period / phase；
+    square: low / high / period / duty / phase；csv: 表头含 time_column（默认 time）和 column 列，
+    按时间线性插值，时间从第一行开始计，值按 scale / offset 变换
+  - 播放期间每个控制周期覆盖曲线中包含的目标，通过配置或 socket 单独设置这些目标会被下一个周期覆盖
+- processes: 请求生成子进程数（默认 0，在控制器进程内生成）。大于 0 时 worker 和 open 模式调度器
+  分布到 N 个子进程，每个子进程运行自己的事件循环，按总速率的 1/N 发送，每秒通过管道回报计数和延迟直方图；
+  控制器进程只做采样、PID 和 ballast
+- controller_cpu: 把控制器进程（所有线程）绑定到指定 CPU，null 表示不绑定（默认）；
+  绑定后子进程使用其余 CPU（只有一个 CPU 时与控制器共用）
+- endpoint_mix: 接口配比，fixed（默认，使用 endpoints 中的权重或 weights 命令设置的权重）或 cost
+  （按学习到的单次请求 CPU 成本选择配比：每个接口保留 cost_mix_floor 的份额以持续学习，其余份额给单次
+  CPU 成本最高的接口，用最低的请求速率达到 CPU 目标）。两种模式都从 app.py 响应的 X-Res-* 头学习每个接口的
+  CPU 和内存成本（EWMA），在状态的 endpoint_costs 中报告；cost 模式下通过 weights 命令修改权重会切回 fixed
+- cost_mix_floor: cost 模式下每个接口的最低份额（默认 0.05）
+- target_psi_cpu / target_psi_memory / target_psi_io: PSI 目标（停顿时间占比 %，0 表示关闭）。设置后对应的执行机构
+  改按 PSI 控制，同一资源的使用率目标暂停：cpu 调节请求速率，memory 调节内存 ballast，io 调节磁盘 IO 生成器。
+  PSI 读取 cgroup v2 的 *.pressure（服务运行在非根 cgroup 时）或 /proc/pressure/*，按采样窗口内 total 计数的增量计算
+- psi_kind: 控制使用的 PSI 类型，some（默认，至少一个任务停顿）或 full（所有非空闲任务同时停顿）
+- seed: 随机种子（整数，null 表示不固定），固定 open 模式的到达间隔和接口选择序列；子进程使用 seed + 序号 + 1
+- trace_record: 请求记录文件路径，null 表示停止记录。记录每个请求的计划发送时间（相对记录开始）、接口和参数，
+  路径变化时重新开始记录；python3 load_controller.py --dump-trace 路径 以 CSV 输出
+- replay: 按记录文件重放请求，null 表示停止，内容变化时从头开始，例如
+  {"path": "/tmp/trace.bin", "time_scale": 1.0, "loop": false}。重放期间请求按记录的计划时间发送
+  （time_scale 为播放速度倍数），不等待响应，CPU 回路和 worker / 调度器暂停；受 max_inflight 限制，超出时丢弃并计数
+- journal: 是否记录采样日志（默认 true）。日志 /tmp/load_controller_journal.bin 是预分配的环形二进制文件，
+  每条定长记录包含时间戳、各项目标、实际值、请求速率和延迟分位数，写满后覆盖最旧的记录；
+  journal_interval: 记录间隔（秒，默认 1，最小 0.1）；journal_capacity: 记录条数（默认 86400，修改后重新创建文件）。
+  读取: python3 load_controller.py --dump-journal [路径] 输出 CSV，或在分析脚本中用 load_journal(路径) 读成 NumPy 数组
 """
 
 import asyncio
 import aiohttp
+import argparse
+import bisect
+import csv
+from abc import ABC, abstractmethod
 from datetime import datetime
-from typing import Dict, Optional, List
+from typing import Callable, Dict, Optional, List, Tuple
 import signal
 import sys
 import os
 import json
+import time
+import math
+import mmap
+import errno
+import struct
+import random
+import threading
+import multiprocessing
+from urllib.parse import urlparse
+from collections import deque
+
+
+# 计算速率所需的最短时间跨度（秒），更短时计数增量主要是噪声
+MIN_RATE_WINDOW = 0.2
+
+# /proc/diskstats 的扇区固定为 512 字节
+DISKSTATS_SECTOR_SIZE = 512
+
+# PSI 资源和类型
+PSI_RESOURCES = ('cpu', 'memory', 'io')
+PSI_KINDS = ('some', 'full')
+
+# 累计计数 -> 快照中的速率字段（磁盘为 MB/s，网络为 Mbit/s，PSI 为停顿时间占比 %，原始计数为微秒）
+RATE_FIELDS = (
+    ('disk_reads', 'disk_read_iops', 1.0),
+    ('disk_writes', 'disk_write_iops', 1.0),
+    ('disk_read_bytes', 'disk_read_mbps', 1.0 / 1024 / 1024),
+    ('disk_write_bytes', 'disk_write_mbps', 1.0 / 1024 / 1024),
+    ('net_rx_bytes', 'net_rx_mbps', 8.0 / 1e6),
+    ('net_tx_bytes', 'net_tx_mbps', 8.0 / 1e6)
+) + tuple(
+    (f'psi_{resource}_{kind}_us', f'psi_{resource}_{kind}', 100.0 / 1e6)
+    for resource in PSI_RESOURCES for kind in PSI_KINDS
+)
+
+
+def combine_endpoint_costs(tables: List[Dict[str, Dict]]) -> Dict[str, Dict]:
+    """按样本数加权合并多个进程学习到的接口成本表"""
+    combined = {}
+    for table in tables:
+        for name, cost in table.items():
+            merged = combined.setdefault(name, {'samples': 0, 'cpu_ms': 0.0, 'rss_kb': 0.0, 'wall_ms': 0.0})
+            samples = merged['samples'] + cost['samples']
+            if samples:
+                for key in ('cpu_ms', 'rss_kb', 'wall_ms'):
+                    merged[key] = (merged[key] * merged['samples'] + cost[key] * cost['samples']) / samples
+            merged['samples'] = samples
+    return combined
+
+
+def find_block_device(path: str = '/') -> Optional[str]:
+    """
+    返回 path 所在文件系统的块设备名（/proc/diskstats 中的名字）
+
+    overlay 等没有块设备的文件系统退而选择累计 IO 最多的物理磁盘（忽略 loop / ram / zram）。
+    """
+    dev = os.stat(path).st_dev
+    sys_path = f'/sys/dev/block/{os.major(dev)}:{os.minor(dev)}'
+    if os.path.exists(sys_path):
+        return os.path.basename(os.path.realpath(sys_path))
+
+    best, best_sectors = None, -1
+    try:
+        with open('/proc/diskstats', 'r') as f:
+            for line in f:
+                fields = line.split()
+                name = fields[2]
+                if name.startswith(('loop', 'ram', 'zram')) or not os.path.exists(f'/sys/block/{name}'):
+                    continue
+                sectors = int(fields[5]) + int(fields[9])
+                if sectors > best_sectors:
+                    best, best_sectors = name, sectors
+    except OSError:
+        return None
+    return best
+
+
+def find_net_interface() -> Optional[str]:
+    """返回默认路由所在的网卡（/proc/net/route 中目的地址为 0 的一行）"""
+    try:
+        with open('/proc/net/route', 'r') as f:
+            next(f)
+            for line in f:
+                fields = line.split()
+                if len(fields) > 1 and fields[1] == '00000000':
+                    return fields[0]
+    except (OSError, StopIteration):
+        pass
+    return None
+
+
+class MetricsSampler(ABC):
+    """
+    系统指标采样器基类
+
+    子类实现 read_raw() 返回一组原始计数（累计 CPU 时间为单调递增计数，其余为瞬时值）。
+    sample() 把原始计数放入滑动窗口，用窗口首尾两次读数的差值计算 CPU 使用率，
+    而不是自开机以来的累计平均；结果保存在 snapshot 中供控制器读取。
+    """
+
+    name = 'base'
+
+    def __init__(self, window: float = 5.0):
+        self.window = window
+        self.net_interface = find_net_interface()  # 测量带宽的网卡，由控制器按配置更新
+        self.history: deque = deque()  # (monotonic 时间, 原始计数)
+        self.snapshot = self._empty_snapshot()
+
+    @staticmethod
+    def _empty_snapshot() -> Dict[str, float]:
+        return {
+            'cpu_percent': 0.0,
+            'mem_total': 0.0,
+            'mem_available': 0.0,
+            'fs_size': 0.0,
+            'fs_avail': 0.0,
+            'disk_read_iops': 0.0,
+            'disk_write_iops': 0.0,
+            'disk_read_mbps': 0.0,
+            'disk_write_mbps': 0.0,
+            'net_rx_mbps': 0.0,
+            'net_tx_mbps': 0.0,
+            **{f'psi_{resource}_{kind}': 0.0 for resource in PSI_RESOURCES for kind in PSI_KINDS},
+            'window_seconds': 0.0,
+            'timestamp': 0.0
+        }
+
+    @abstractmethod
+    async def read_raw(self) -> Optional[Dict[str, float]]:
+        """读取一次原始计数；暂时无法读取时返回 None"""
+
+    def derive(self, oldest: Dict[str, float], newest: Dict[str, float], elapsed: float) -> Dict[str, float]:
+        """由窗口首尾读数计算快照"""
+        snapshot = self._empty_snapshot()
+        for key in ('mem_total', 'mem_available', 'fs_size', 'fs_avail'):
+            snapshot[key] = newest.get(key, 0.0)
+
+        cpu_total = newest['cpu_total'] - oldest['cpu_total']
+        cpu_idle = newest['cpu_idle'] - oldest['cpu_idle']
+        if cpu_total <= 0 or elapsed < MIN_RATE_WINDOW:
+            # 窗口内只有一次读数（或两次读数间隔太短）时退化为累计平均
+            cpu_total, cpu_idle = newest['cpu_total'], newest['cpu_idle']
+        if cpu_total > 0:
+            snapshot['cpu_percent'] = max(0.0, min(100.0, (cpu_total - cpu_idle) / cpu_total * 100))
+
+        if elapsed >= MIN_RATE_WINDOW:
+            for counter, field, scale in RATE_FIELDS:
+                if counter in newest and counter in oldest:
+                    snapshot[field] = max(0.0, newest[counter] - oldest[counter]) / elapsed * scale
+        snapshot['window_seconds'] = round(elapsed, 3)
+        return snapshot
+
+    async def sample(self) -> Dict[str, float]:
+        """读取一次原始计数并更新快照；失败时保留上一次的快照"""
+        try:
+            raw = await self.read_raw()
+        except Exception as e:
+            print(f"[监控] {self.name} 采样失败: {e}")
+            return self.snapshot
+        if raw is None:
+            return self.snapshot
+
+        now = time.monotonic()
+        self.history.append((now, raw))
+        # 保留窗口内的读数，以及窗口起点之前的最后一次读数作为基准
+        while len(self.history) > 2 and self.history[1][0] <= now - self.window:
+            self.history.popleft()
+
+        oldest_time, oldest = self.history[0]
+        snapshot = self.derive(oldest, raw, now - oldest_time)
+        snapshot['timestamp'] = time.time()
+        self.snapshot = snapshot
+        return snapshot
+
+    async def close(self):
+        pass
+
+
+class NodeExporterSampler(MetricsSampler):
+    """
+    Node Exporter 指标采样器
+
+    通过常驻的 aiohttp 会话抓取 /metrics，单遍扫描只解析需要的指标族。
+    """
+
+    name = 'node_exporter'
+
+    # 需要解析的指标族（按行首前缀匹配）
+    METRIC_PREFIXES = (
+        'node_cpu_seconds_total',
+        'node_memory_MemTotal_bytes',
+        'node_memory_MemAvailable_bytes',
+        'node_filesystem_size_bytes',
+        'node_filesystem_avail_bytes',
+        'node_disk_',
+        'node_network_',
+        'node_pressure_'
+    )
+
+    # node_disk_* 指标 -> 原始计数字段
+    DISK_METRICS = {
+        'node_disk_reads_completed_total': 'disk_reads',
+        'node_disk_writes_completed_total': 'disk_writes',
+        'node_disk_read_bytes_total': 'disk_read_bytes',
+        'node_disk_written_bytes_total': 'disk_write_bytes'
+    }
+    NET_METRICS = {
+        'node_network_receive_bytes_total': 'net_rx_bytes',
+        'node_network_transmit_bytes_total': 'net_tx_bytes'
+    }
+    # node_pressure_*（秒）-> PSI 原始计数字段（微秒），waiting 对应 some，stalled 对应 full
+    PRESSURE_METRICS = {
+        'node_pressure_cpu_waiting_seconds_total': 'psi_cpu_some_us',
+        'node_pressure_cpu_stalled_seconds_total': 'psi_cpu_full_us',
+        'node_pressure_memory_waiting_seconds_total': 'psi_memory_some_us',
+        'node_pressure_memory_stalled_seconds_total': 'psi_memory_full_us',
+        'node_pressure_io_waiting_seconds_total': 'psi_io_some_us',
+        'node_pressure_io_stalled_seconds_total': 'psi_io_full_us'
+    }
+
+    def __init__(self, window: float = 5.0, url: str = 'http://localhost:9100/metrics', timeout: float = 5.0):
+        super().__init__(window)
+        self.url = url
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.session: Optional[aiohttp.ClientSession] = None
+        self.disk_label = f'device="{find_block_device()}"'
+
+    def parse(self, text: str) -> Dict[str, float]:
+        """单遍解析 /metrics 文本，只处理 METRIC_PREFIXES 中的指标"""
+        raw = {'cpu_total': 0.0, 'cpu_idle': 0.0, 'mem_total': 0.0, 'mem_available': 0.0,
+               'fs_size': 0.0, 'fs_avail': 0.0}
+        prefixes = self.METRIC_PREFIXES
+        net_label = f'device="{self.net_interface}"'
+        for line in text.splitlines():
+            if not line.startswith(prefixes):
+                continue
+            name_labels, _, value_text = line.rpartition(' ')
+            try:
+                value = float(value_text)
+            except ValueError:
+                continue
+            if name_labels.startswith('node_cpu_seconds_total'):
+                raw['cpu_total'] += value
+                if 'mode="idle"' in name_labels or 'mode="iowait"' in name_labels:
+                    raw['cpu_idle'] += value
+            elif name_labels.startswith('node_memory_MemTotal_bytes'):
+                raw['mem_total'] = value
+            elif name_labels.startswith('node_memory_MemAvailable_bytes'):
+                raw['mem_available'] = value
+            elif name_labels.startswith('node_disk_'):
+                if self.disk_label in name_labels:
+                    field = self.DISK_METRICS.get(name_labels.partition('{')[0])
+                    if field:
+                        raw[field] = value
+            elif name_labels.startswith('node_network_'):
+                if net_label in name_labels:
+                    field = self.NET_METRICS.get(name_labels.partition('{')[0])
+                    if field:
+                        raw[field] = value
+            elif name_labels.startswith('node_pressure_'):
+                field = self.PRESSURE_METRICS.get(name_labels.partition('{')[0])
+                if field:
+                    raw[field] = value * 1e6
+            elif 'mountpoint="/"' in name_labels:
+                # 只关注根文件系统
+                if name_labels.startswith('node_filesystem_size_bytes'):
+                    raw['fs_size'] = value
+                else:
+                    raw['fs_avail'] = value
+        return raw
+
+    async def read_raw(self) -> Optional[Dict[str, float]]:
+        if self.session is None or self.session.closed:
+            self.session = aiohttp.ClientSession(timeout=self.timeout)
+        async with self.session.get(self.url) as response:
+            if response.status != 200:
+                print(f"[监控] Node Exporter 返回状态码 {response.status}")
+                return None
+            text = await response.text()
+        return self.parse(text)
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+
+class ProcSampler(MetricsSampler):
+    """
+    直接读取内核接口的采样器（不依赖 Node Exporter）
+
+    - CPU: /proc/stat 的 cpu 行（idle + iowait 视为空闲）
+    - 内存: /proc/meminfo 的 MemTotal / MemAvailable
+    - 磁盘: statvfs("/")，IO 计数取 /proc/diskstats 中对应块设备的一行
+    - 网络: /proc/net/dev 中 net_interface 的收发字节数
+    - PSI: /proc/pressure/{cpu,memory,io} 的 some / full total 计数（内核未开启 PSI 时为 0）
+    - 如果服务运行在非根的 cgroup v2 中，CPU 改用 cpu.stat 的 usage_usec（按 cpu.max 配额归一化），
+      内存改用 memory.current / memory.max，PSI 改用该 cgroup 的 *.pressure
+    """
+
+    name = 'proc'
+
+    def __init__(self, window: float = 5.0, disk_path: str = '/'):
+        super().__init__(window)
+        self.disk_path = disk_path
+        self.disk_device = find_block_device(disk_path)
+        self.cgroup_dir = self._find_cgroup_dir()
+        if self.cgroup_dir:
+            print(f"[监控] 使用 cgroup v2 指标: {self.cgroup_dir}")
+        self.pressure_files = self._find_pressure_files()
+
+    @staticmethod
+    def _find_cgroup_dir() -> Optional[str]:
+        """返回当前进程所在的非根 cgroup v2 目录"""
+        try:
+            with open('/proc/self/cgroup', 'r') as f:
+                for line in f:
+                    if line.startswith('0::'):
+                        path = line[3:].strip()
+                        break
+                else:
+                    return None
+        except OSError:
+            return None
+        if path in ('', '/'):
+            return None
+        for root in ('/sys/fs/cgroup', '/sys/fs/cgroup/unified'):
+            candidate = os.path.join(root, path.lstrip('/'))
+            if os.path.exists(os.path.join(candidate, 'cpu.stat')):
+                return candidate
+        return None
+
+    def _find_pressure_files(self) -> Dict[str, str]:
+        """PSI 文件：优先使用所在 cgroup 的 *.pressure，否则使用 /proc/pressure"""
+        files = {}
+        for resource in PSI_RESOURCES:
+            candidates = [f'/proc/pressure/{resource}']
+            if self.cgroup_dir:
+                candidates.insert(0, os.path.join(self.cgroup_dir, f'{resource}.pressure'))
+            for path in candidates:
+                if os.path.exists(path):
+                    files[resource] = path
+                    break
+        return files
+
+    @staticmethod
+    def _read_file(path: str) -> str:
+        with open(path, 'r') as f:
+            return f.read()
+
+    def _read_pressure(self, raw: Dict[str, float]):
+        # some avg10=0.00 avg60=0.00 avg300=0.00 total=123456
+        for resource, path in self.pressure_files.items():
+            try:
+                text = self._read_file(path)
+            except OSError:
+                # 内核以 psi=0 启动时文件存在但读取返回 EOPNOTSUPP
+                continue
+            for line in text.splitlines():
+                kind, _, rest = line.partition(' ')
+                total = rest.rpartition('total=')[2]
+                if kind in PSI_KINDS and total:
+                    raw[f'psi_{resource}_{kind}_us'] = float(total)
+
+    def _read_cgroup(self, raw: Dict[str, float]):
+        for line in self._read_file(os.path.join(self.cgroup_dir, 'cpu.stat')).splitlines():
+            if line.startswith('usage_usec'):
+                raw['cgroup_usage_usec'] = float(line.split()[1])
+                break
+
+        cpus = float(os.cpu_count() or 1)
+        cpu_max_path = os.path.join(self.cgroup_dir, 'cpu.max')
+        if os.path.exists(cpu_max_path):
+            quota, _, period = self._read_file(cpu_max_path).strip().partition(' ')
+            if quota != 'max' and period:
+                cpus = min(cpus, float(quota) / float(period))
+        raw['cgroup_cpus'] = cpus
+
+        memory_current_path = os.path.join(self.cgroup_dir, 'memory.current')
+        if os.path.exists(memory_current_path):
+            current = float(self._read_file(memory_current_path))
+            limit_text = self._read_file(os.path.join(self.cgroup_dir, 'memory.max')).strip()
+            if limit_text != 'max':
+                raw['mem_total'] = min(raw['mem_total'], float(limit_text))
+            raw['mem_available'] = max(0.0, raw['mem_total'] - current)
+
+    async def read_raw(self) -> Optional[Dict[str, float]]:
+        raw: Dict[str, float] = {}
+
+        # cpu  user nice system idle iowait irq softirq steal guest guest_nice
+        # guest / guest_nice 已计入 user / nice，只累加前 8 项
+        with open('/proc/stat', 'r') as f:
+            fields = [float(x) for x in f.readline().split()[1:9]]
+        raw['cpu_total'] = sum(fields)
+        raw['cpu_idle'] = fields[3] + fields[4]
+
+        meminfo = {}
+        with open('/proc/meminfo', 'r') as f:
+            for line in f:
+                key, _, value = line.partition(':')
+                if key in ('MemTotal', 'MemAvailable'):
+                    meminfo[key] = float(value.split()[0]) * 1024
+        raw['mem_total'] = meminfo.get('MemTotal', 0.0)
+        raw['mem_available'] = meminfo.get('MemAvailable', 0.0)
+
+        stat = os.statvfs(self.disk_path)
+        raw['fs_size'] = float(stat.f_blocks * stat.f_frsize)
+        raw['fs_avail'] = float(stat.f_bavail * stat.f_frsize)
+
+        # major minor name reads merged sectors_read ms writes merged sectors_written ...
+        if self.disk_device:
+            with open('/proc/diskstats', 'r') as f:
+                for line in f:
+                    fields = line.split()
+                    if fields[2] == self.disk_device:
+                        raw['disk_reads'] = float(fields[3])
+                        raw['disk_read_bytes'] = float(fields[5]) * DISKSTATS_SECTOR_SIZE
+                        raw['disk_writes'] = float(fields[7])
+                        raw['disk_write_bytes'] = float(fields[9]) * DISKSTATS_SECTOR_SIZE
+                        break
+
+        # "  eth0: rx_bytes packets errs drop fifo frame compressed multicast tx_bytes ..."
+        if self.net_interface:
+            with open('/proc/net/dev', 'r') as f:
+                for line in f:
+                    name, sep, counters = line.partition(':')
+                    if sep and name.strip() == self.net_interface:
+                        fields = counters.split()
+                        raw['net_rx_bytes'] = float(fields[0])
+                        raw['net_tx_bytes'] = float(fields[8])
+                        break
+
+        self._read_pressure(raw)
+
+        if self.cgroup_dir:
+            self._read_cgroup(raw)
+        return raw
+
+    def derive(self, oldest: Dict[str, float], newest: Dict[str, float], elapsed: float) -> Dict[str, float]:
+        snapshot = super().derive(oldest, newest, elapsed)
+        if 'cgroup_usage_usec' in newest and elapsed >= MIN_RATE_WINDOW:
+            used_seconds = (newest['cgroup_usage_usec'] - oldest['cgroup_usage_usec']) / 1e6
+            snapshot['cpu_percent'] = max(0.0, min(100.0, used_seconds / (elapsed * newest['cgroup_cpus']) * 100))
+        return snapshot
+
+
+# 可选的采样后端
+SAMPLERS = {
+    'proc': ProcSampler,
+    'node_exporter': NodeExporterSampler
+}
+
+
+class LatencyHistogram:
+    """
+    对数分桶延迟直方图（内存固定，可合并）
+
+    桶边界按 growth 倍数递增（默认 2%，即分位数相对误差约 1%），覆盖 min_ms 到 max_ms，
+    超出范围的值计入首尾桶，min / max / 平均值单独精确记录。
+    """
+
+    def __init__(self, min_ms: float = 0.01, max_ms: float = 600000.0, growth: float = 1.02):
+        self.min_ms = min_ms
+        self.growth = growth
+        self.log_growth = math.log(growth)
+        self.counts = [0] * (int(math.log(max_ms / min_ms) / self.log_growth) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.min_value = math.inf
+        self.max_value = 0.0
+
+    def record(self, value_ms: float):
+        index = int(math.log(value_ms / self.min_ms) / self.log_growth) if value_ms > self.min_ms else 0
+        self.counts[min(index, len(self.counts) - 1)] += 1
+        self.count += 1
+        self.total += value_ms
+        self.min_value = min(self.min_value, value_ms)
+        self.max_value = max(self.max_value, value_ms)
+
+    def merge(self, other: 'LatencyHistogram'):
+        """合并另一个相同分桶参数的直方图"""
+        for index, count in enumerate(other.counts):
+            if count:
+                self.counts[index] += count
+        self.count += other.count
+        self.total += other.total
+        self.min_value = min(self.min_value, other.min_value)
+        self.max_value = max(self.max_value, other.max_value)
+
+    def percentile(self, p: float) -> float:
+        """返回第 p 百分位（取所在桶的几何中点，并限制在 min / max 之间）"""
+        if self.count == 0:
+            return 0.0
+        rank = max(1, math.ceil(p / 100 * self.count))
+        cumulative = 0
+        for index, count in enumerate(self.counts):
+            cumulative += count
+            if cumulative >= rank:
+                value = self.min_ms * self.growth ** (index + 0.5)
+                return max(self.min_value, min(self.max_value, value))
+        return self.max_value
+
+    def get_state(self) -> Dict:
+        """可跨进程传递的状态（只包含非零桶）"""
+        return {
+            'counts': {index: count for index, count in enumerate(self.counts) if count},
+            'count': self.count,
+            'total': self.total,
+            'min': self.min_value,
+            'max': self.max_value
+        }
+
+    def merge_state(self, state: Dict):
+        """合并 get_state 返回的状态（分桶参数相同）"""
+        for index, count in state['counts'].items():
+            self.counts[index] += count
+        self.count += state['count']
+        self.total += state['total']
+        self.min_value = min(self.min_value, state['min'])
+        self.max_value = max(self.max_value, state['max'])
+
+    def delta(self, previous: Optional['LatencyHistogram']) -> 'LatencyHistogram':
+        """相对同一直方图较早的副本新增的记录（min / max 不可知，分位数取桶中点）"""
+        result = LatencyHistogram.__new__(LatencyHistogram)
+        result.min_ms, result.growth, result.log_growth = self.min_ms, self.growth, self.log_growth
+        if previous is None:
+            result.counts, result.count, result.total = list(self.counts), self.count, self.total
+        else:
+            result.counts = [a - b for a, b in zip(self.counts, previous.counts)]
+            result.count, result.total = self.count - previous.count, self.total - previous.total
+        result.min_value, result.max_value = 0.0, math.inf
+        return result
+
+    def to_dict(self) -> Dict[str, float]:
+        if self.count == 0:
+            return {'count': 0}
+        return {
+            'count': self.count,
+            'min': round(self.min_value, 3),
+            'mean': round(self.total / self.count, 3),
+            'p50': round(self.percentile(50), 3),
+            'p90': round(self.percentile(90), 3),
+            'p99': round(self.percentile(99), 3),
+            'p999': round(self.percentile(99.9), 3),
+            'max': round(self.max_value, 3)
+        }
+
+
+# Linux 5.14+ 的 MADV_POPULATE_WRITE（Python mmap 模块未导出）
+MADV_POPULATE_WRITE = 23
+MEMORY_BALLAST_CHUNK = 64 * 1024 * 1024   # 每个匿名映射的大小
+MEMORY_TOUCH_BLOCK = bytes(1024 * 1024)    # 不支持 MADV_POPULATE_WRITE 时用于写入页面的零块
+
+
+class MemoryBallast:
+    """
+    基于匿名 mmap 的内存 ballast
+
+    - 按 MEMORY_BALLAST_CHUNK 分块映射；整块使用时用 MAP_POPULATE 在一次系统调用内分配全部页面，
+      部分使用时用 MADV_POPULATE_WRITE 填充（内核不支持时按 1MB 块写入，仍是 memset 速度）
+    - 释放整块时直接 munmap，部分释放时对尾部 madvise(MADV_DONTNEED)，内存立即归还内核
+    - huge_pages 为 True 时对新映射 madvise(MADV_HUGEPAGE)，使用透明大页
+    - grow / shrink 是阻塞调用，调用方应放到线程中执行
+    """
+
+    def __init__(self, huge_pages: bool = False):
+        self.huge_pages = huge_pages
+        self.chunks: List[list] = []  # [mmap, 常驻字节数]
+
+    @property
+    def size(self) -> int:
+        """当前常驻的 ballast 字节数"""
+        return sum(resident for _, resident in self.chunks)
+
+    def __len__(self) -> int:
+        return len(self.chunks)
+
+    @staticmethod
+    def _page_align(nbytes: int) -> int:
+        return (nbytes + mmap.PAGESIZE - 1) // mmap.PAGESIZE * mmap.PAGESIZE
+
+    @staticmethod
+    def _populate(mapping: mmap.mmap, start: int, length: int):
+        try:
+            mapping.madvise(MADV_POPULATE_WRITE, start, length)
+        except OSError:
+            block = len(MEMORY_TOUCH_BLOCK)
+            for offset in range(start, start + length, block):
+                end = min(offset + block, start + length)
+                mapping[offset:end] = MEMORY_TOUCH_BLOCK[:end - offset]
+
+    def _new_chunk(self, populate_all: bool) -> mmap.mmap:
+        flags = mmap.MAP_PRIVATE | mmap.MAP_ANONYMOUS
+        if populate_all and not self.huge_pages:
+            flags |= mmap.MAP_POPULATE
+        mapping = mmap.mmap(-1, MEMORY_BALLAST_CHUNK, flags=flags)
+        if self.huge_pages:
+            try:
+                mapping.madvise(mmap.MADV_HUGEPAGE)
+            except OSError:
+                pass
+            if populate_all:
+                self._populate(mapping, 0, MEMORY_BALLAST_CHUNK)
+        return mapping
+
+    def grow(self, nbytes: int) -> int:
+        """增加 nbytes（按页对齐），返回实际增加的字节数"""
+        remaining = self._page_align(nbytes)
+        added = 0
+        # 先补满最后一块中被释放的部分
+        if self.chunks and self.chunks[-1][1] < MEMORY_BALLAST_CHUNK:
+            mapping, resident = self.chunks[-1]
+            length = min(remaining, MEMORY_BALLAST_CHUNK - resident)
+            self._populate(mapping, resident, length)
+            self.chunks[-1][1] += length
+            remaining -= length
+            added += length
+        while remaining > 0:
+            length = min(remaining, MEMORY_BALLAST_CHUNK)
+            mapping = self._new_chunk(populate_all=length == MEMORY_BALLAST_CHUNK)
+            if length < MEMORY_BALLAST_CHUNK:
+                self._populate(mapping, 0, length)
+            self.chunks.append([mapping, length])
+            remaining -= length
+            added += length
+        return added
+
+    def shrink(self, nbytes: int) -> int:
+        """释放 nbytes（按页对齐），返回实际释放的字节数"""
+        remaining = self._page_align(nbytes)
+        released = 0
+        while remaining > 0 and self.chunks:
+            mapping, resident = self.chunks[-1]
+            if resident <= remaining:
+                mapping.close()
+                self.chunks.pop()
+                remaining -= resident
+                released += resident
+            else:
+                mapping.madvise(mmap.MADV_DONTNEED, resident - remaining, remaining)
+                self.chunks[-1][1] -= remaining
+                released += remaining
+                remaining = 0
+        return released
+
+    def clear(self):
+        """释放全部 ballast"""
+        for mapping, _ in self.chunks:
+            mapping.close()
+        self.chunks.clear()
+
+
+DISK_BALLAST_MODES = ('fallocate', 'buffered', 'odirect')
+DISK_WRITE_CHUNK = 4 * 1024 * 1024      # 每次 pwrite 的大小，缓冲区复用
+DISK_SYNC_BYTES = 64 * 1024 * 1024      # buffered 模式每写入这么多数据 fdatasync 一次并丢弃页缓存
+DISK_ALIGNMENT = 4096                   # O_DIRECT 的偏移和长度对齐
+DISK_UNLIMITED_STEP = 1024 * 1024 * 1024  # 不限速时单次写入任务的上限
+DEFAULT_DISK_WRITE_MBPS = 200.0         # buffered / odirect 的默认写入速率上限（MB/s）
+
+
+class DiskBallast:
+    """
+    磁盘 ballast 文件
+
+    - fallocate: posix_fallocate 直接分配空间，不产生写 IO
+    - buffered: 复用同一块 DISK_WRITE_CHUNK 缓冲区 pwrite，定期 fdatasync 后用
+      POSIX_FADV_DONTNEED 丢弃已落盘的页缓存
+    - odirect: O_DIRECT 对齐写入（缓冲区为匿名 mmap，天然页对齐），文件系统不支持时退回 buffered
+    - 写入按 write_mbps 限速；grow / shrink 是阻塞调用，调用方应放到线程中执行
+    """
+
+    def __init__(self, path: str, mode: str = 'buffered', write_mbps: float = DEFAULT_DISK_WRITE_MBPS):
+        self.path = path
+        self.mode = mode
+        self.write_mbps = write_mbps
+        self.stopping = False
+        self.odirect_supported = True
+        self.last_write_mbps = 0.0
+        # 随机内容，避免底层存储压缩或去重
+        self.buffer = mmap.mmap(-1, DISK_WRITE_CHUNK)
+        self.buffer.write(os.urandom(DISK_WRITE_CHUNK))
+
+    @property
+    def size(self) -> int:
+        """当前 ballast 文件大小"""
+        try:
+            return os.path.getsize(self.path)
+        except FileNotFoundError:
+            return 0
+
+    def _write(self, fd: int, offset: int, nbytes: int, direct: bool) -> int:
+        """从 offset 开始限速写入 nbytes，返回写入的字节数"""
+        rate = self.write_mbps * 1024 * 1024
+        buffer = memoryview(self.buffer)
+        start = time.perf_counter()
+        written = 0
+        synced = 0
+        try:
+            while written < nbytes and not self.stopping:
+                length = min(nbytes - written, DISK_WRITE_CHUNK)
+                if direct:
+                    length = (length + DISK_ALIGNMENT - 1) // DISK_ALIGNMENT * DISK_ALIGNMENT
+                written += os.pwrite(fd, buffer[:length], offset + written)
+
+                if not direct and written - synced >= DISK_SYNC_BYTES:
+                    os.fdatasync(fd)
+                    os.posix_fadvise(fd, offset + synced, written - synced, os.POSIX_FADV_DONTNEED)
+                    synced = written
+
+                if rate > 0:
+                    delay = written / rate - (time.perf_counter() - start)
+                    if delay > 0:
+                        time.sleep(delay)
+
+            if not direct and written > synced:
+                os.fdatasync(fd)
+                os.posix_fadvise(fd, offset + synced, written - synced, os.POSIX_FADV_DONTNEED)
+        finally:
+            buffer.release()
+            elapsed = time.perf_counter() - start
+            self.last_write_mbps = written / 1024 / 1024 / elapsed if elapsed > 0 else 0.0
+        return written
+
+    def _grow_direct(self, nbytes: int) -> Optional[int]:
+        """O_DIRECT 写入；文件系统不支持时返回 None"""
+        try:
+            fd = os.open(self.path, os.O_WRONLY | os.O_CREAT | os.O_DIRECT, 0o644)
+        except OSError as e:
+            if e.errno != errno.EINVAL:
+                raise
+            return None
+        try:
+            # O_DIRECT 要求偏移对齐，截掉之前其他模式留下的不对齐尾部
+            offset = os.fstat(fd).st_size // DISK_ALIGNMENT * DISK_ALIGNMENT
+            os.ftruncate(fd, offset)
+            return self._write(fd, offset, nbytes, direct=True)
+        except OSError as e:
+            if e.errno != errno.EINVAL:
+                raise
+            return None
+        finally:
+            os.close(fd)
+
+    def grow(self, nbytes: int) -> int:
+        """按当前模式增加 nbytes，返回实际增加的字节数"""
+        if self.mode == 'odirect' and self.odirect_supported:
+            written = self._grow_direct(nbytes)
+            if written is not None:
+                return written
+            self.odirect_supported = False
+            print(f"[磁盘] {os.path.dirname(self.path)} 不支持 O_DIRECT，改用 buffered 写入")
+
+        fd = os.open(self.path, os.O_WRONLY | os.O_CREAT, 0o644)
+        try:
+            offset = os.fstat(fd).st_size
+            if self.mode == 'fallocate':
+                os.posix_fallocate(fd, offset, nbytes)
+                return nbytes
+            return self._write(fd, offset, nbytes, direct=False)
+        finally:
+            os.close(fd)
+
+    def shrink(self, nbytes: int) -> int:
+        """截断文件释放 nbytes，返回实际释放的字节数"""
+        current = self.size
+        new_size = max(0, current - nbytes)
+        if new_size == 0:
+            self.clear()
+        else:
+            os.truncate(self.path, new_size)
+        return current - new_size
+
+    def clear(self):
+        """删除 ballast 文件"""
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+DISK_IO_FILE_PATH = "/tmp/load_controller_io.bin"
+DISK_IO_MAX_OPS = 50000.0   # IO 生成器的最大操作速率（次/秒）
+
+
+class DiskIOGenerator:
+    """
+    后台磁盘 IO 生成器
+
+    - threads 个线程在固定大小的测试文件上做随机偏移的读写，优先使用 O_DIRECT 绕过页缓存
+      （文件系统不支持时退回 O_DSYNC 写入，读操作可能命中页缓存）
+    - 共享令牌桶按 rate（次/秒）发放操作，read_ratio 决定读操作的比例
+    - 启动时先完整写一遍测试文件，保证读操作落在真实的数据块上而不是未写入的空洞
+    - start / stop 是阻塞调用，调用方应放到线程中执行
+    """
+
+    def __init__(self, path: str, file_size: int = 256 * 1024 * 1024, block_size: int = 4096,
+                 read_ratio: float = 0.7, threads: int = 4):
+        self.path = path
+        self.file_size = file_size
+        self.block_size = block_size
+        self.read_ratio = read_ratio
+        self.threads = threads
+        self.rate = 0.0
+        self.running = False
+        self.direct = True
+        self.ops = {'read': 0, 'write': 0}
+        self.errors = 0
+        self.lock = threading.Lock()
+        self.tokens = 0.0
+        self.last_refill = time.monotonic()
+        self.workers: List[threading.Thread] = []
+
+    def _open(self) -> int:
+        if self.direct:
+            try:
+                return os.open(self.path, os.O_RDWR | os.O_CREAT | os.O_DIRECT, 0o644)
+            except OSError as e:
+                if e.errno != errno.EINVAL:
+                    raise
+                self.direct = False
+                print(f"[磁盘IO] {os.path.dirname(self.path)} 不支持 O_DIRECT，改用 O_DSYNC")
+        return os.open(self.path, os.O_RDWR | os.O_CREAT | os.O_DSYNC, 0o644)
+
+    def _prepare(self):
+        """测试文件不足 file_size 时用随机数据补齐"""
+        fd = self._open()
+        try:
+            offset = os.fstat(fd).st_size // DISK_ALIGNMENT * DISK_ALIGNMENT
+            if offset >= self.file_size:
+                return
+            buffer = mmap.mmap(-1, DISK_WRITE_CHUNK)
+            buffer.write(os.urandom(DISK_WRITE_CHUNK))
+            with memoryview(buffer) as view:
+                while offset < self.file_size:
+                    offset += os.pwrite(fd, view[:min(DISK_WRITE_CHUNK, self.file_size - offset)], offset)
+            buffer.close()
+        finally:
+            os.close(fd)
+
+    def _acquire(self) -> bool:
+        """从令牌桶取一个操作配额；没有配额时短暂休眠并返回 False"""
+        with self.lock:
+            now = time.monotonic()
+            rate = self.rate
+            # 突发上限为 0.1 秒的配额，避免速率降低后积攒的令牌一次性释放
+            self.tokens = min(self.tokens + rate * (now - self.last_refill), max(1.0, rate * 0.1))
+            self.last_refill = now
+            if self.tokens >= 1.0:
+                self.tokens -= 1.0
+                return True
+            wait = (1.0 - self.tokens) / rate if rate > 0 else 0.1
+        time.sleep(min(wait, 0.1))
+        return False
+
+    def _worker(self, seed: int):
+        rng = random.Random(seed)
+        fd = self._open()
+        block_size = 0
+        buffer = None
+        try:
+            while self.running:
+                if not self._acquire():
+                    continue
+                if block_size != self.block_size:
+                    # 匿名 mmap 天然页对齐，满足 O_DIRECT 的缓冲区对齐要求
+                    if buffer is not None:
+                        buffer.close()
+                    block_size = self.block_size
+                    buffer = mmap.mmap(-1, block_size)
+                    buffer.write(os.urandom(block_size))
+                offset = rng.randrange(max(1, self.file_size // block_size)) * block_size
+                try:
+                    if rng.random() < self.read_ratio:
+                        os.preadv(fd, [buffer], offset)
+                        self.ops['read'] += 1
+                    else:
+                        os.pwrite(fd, buffer, offset)
+                        self.ops['write'] += 1
+                except OSError as e:
+                    self.errors += 1
+                    if self.errors <= 3:
+                        print(f"[磁盘IO] IO 失败: {e}")
+        finally:
+            os.close(fd)
+            if buffer is not None:
+                buffer.close()
+
+    def start(self):
+        """准备测试文件并启动工作线程"""
+        if self.running:
+            return
+        self._prepare()
+        self.running = True
+        self.tokens = 0.0
+        self.last_refill = time.monotonic()
+        self.workers = [
+            threading.Thread(target=self._worker, args=(i,), name=f'disk-io-{i}', daemon=True)
+            for i in range(self.threads)
+        ]
+        for worker in self.workers:
+            worker.start()
+
+    def stop(self):
+        """停止工作线程（测试文件保留，下次启动无需重新写入）"""
+        self.running = False
+        for worker in self.workers:
+            worker.join(timeout=5)
+        self.workers = []
+
+    def to_dict(self) -> Dict:
+        return {
+            'running': self.running,
+            'rate': round(self.rate, 1),
+            'block_kb': self.block_size // 1024,
+            'read_ratio': self.read_ratio,
+            'threads': self.threads,
+            'file_mb': self.file_size // 1024 // 1024,
+            'direct': self.direct,
+            'ops_read': self.ops['read'],
+            'ops_write': self.ops['write'],
+            'errors': self.errors
+        }
+
+
+NET_DIRECTIONS = {'net_rx': 'rx', 'net_tx': 'tx'}
+NET_MAX_MBPS = 10000.0                     # 网络流量生成器的最大速率（Mbit/s）
+NET_CHUNK = 64 * 1024                      # 令牌桶的计量单位，也是上传时每次发送的块
+NET_STREAM_REQUEST_SIZE = 1024 * 1024 * 1024  # 每个流单次请求的大小，结束后立即发起下一次
+
+
+class NetStreamer:
+    """
+    令牌桶限速的网络流量生成器（单个方向）
+
+    - rx: 循环 GET {endpoint}/blob/{size}，按令牌读取响应体，对端发送速率受 TCP 背压限制
+    - tx: 循环 PUT {endpoint}/blob?sink=discard，请求体由按令牌产出数据的生成器提供
+    - streams 个并发流共享同一个令牌桶，rate_mbps 为 0 时暂停
+    使用 app.py 的 Blob 协议，对端可以是宿主机上的替身服务或另一个沙箱的 Blob 端口。
+    """
+
+    def __init__(self, direction: str, streams: int = 4):
+        self.direction = direction
+        self.endpoint: Optional[str] = None
+        self.streams = streams
+        self.rate_mbps = 0.0
+        self.running = False
+        self.tokens = 0.0
+        self.last_refill = time.monotonic()
+        self.bytes = 0
+        self.requests = 0
+        self.errors = 0
+        self.achieved_mbps = 0.0
+        self.last_sample = (time.monotonic(), 0)
+        self.payload = os.urandom(NET_CHUNK)
+        self.session: Optional[aiohttp.ClientSession] = None
+        self.tasks: List[asyncio.Task] = []
+
+    async def _take(self, nbytes: int):
+        """等待令牌桶中积攒够 nbytes 字节的配额"""
+        while True:
+            now = time.monotonic()
+            rate = self.rate_mbps * 1e6 / 8
+            # 突发上限为 0.1 秒的配额（至少一个块）
+            self.tokens = min(self.tokens + rate * (now - self.last_refill), max(NET_CHUNK, rate * 0.1))
+            self.last_refill = now
+            if rate <= 0:
+                await asyncio.sleep(0.1)
+            elif self.tokens >= nbytes:
+                self.tokens -= nbytes
+                return
+            else:
+                await asyncio.sleep((nbytes - self.tokens) / rate)
+
+    async def _upload_body(self):
+        remaining = NET_STREAM_REQUEST_SIZE
+        while remaining > 0 and self.running:
+            chunk = self.payload[:min(remaining, NET_CHUNK)]
+            await self._take(len(chunk))
+            remaining -= len(chunk)
+            self.bytes += len(chunk)
+            yield chunk
+
+    async def _stream(self):
+        base_url = self.endpoint.rstrip('/')
+        while self.running:
+            try:
+                if self.rate_mbps <= 0:
+                    await asyncio.sleep(0.1)
+                    continue
+                if self.direction == 'rx':
+                    async with self.session.get(f"{base_url}/blob/{NET_STREAM_REQUEST_SIZE}") as response:
+                        response.raise_for_status()
+                        while self.running:
+                            await self._take(NET_CHUNK)
+                            data = await response.content.read(NET_CHUNK)
+                            if not data:
+                                break
+                            self.bytes += len(data)
+                else:
+                    async with self.session.put(
+                        f"{base_url}/blob", params={'sink': 'discard'}, data=self._upload_body(),
+                        headers={'Content-Length': str(NET_STREAM_REQUEST_SIZE)}
+                    ) as response:
+                        await response.read()
+                self.requests += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.errors += 1
+                if self.errors <= 3:
+                    print(f"[网络] {self.direction} 流失败: {e}")
+                await asyncio.sleep(1.0)
+
+    def sample_rate(self) -> float:
+        """生成器自身自上次调用以来的收发速率（Mbit/s）"""
+        now = time.monotonic()
+        last_time, last_bytes = self.last_sample
+        if now - last_time >= MIN_RATE_WINDOW:
+            self.achieved_mbps = (self.bytes - last_bytes) * 8 / 1e6 / (now - last_time)
+            self.last_sample = (now, self.bytes)
+        return self.achieved_mbps
+
+    def start(self):
+        """按当前 endpoint 启动 streams 个并发流"""
+        if self.running or not self.endpoint:
+            return
+        self.running = True
+        self.tokens = 0.0
+        self.last_refill = time.monotonic()
+        self.session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=self.streams),
+            timeout=aiohttp.ClientTimeout(total=None, sock_connect=10, sock_read=30)
+        )
+        self.tasks = [asyncio.create_task(self._stream()) for _ in range(self.streams)]
+
+    async def stop(self):
+        """取消所有流并关闭会话"""
+        self.running = False
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.tasks = []
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    def to_dict(self) -> Dict:
+        return {
+            'running': self.running,
+            'endpoint': self.endpoint,
+            'streams': self.streams,
+            'rate_mbps': round(self.rate_mbps, 1),
+            'achieved_mbps': round(self.achieved_mbps, 1),
+            'total_mb': round(self.bytes / 1024 / 1024, 1),
+            'requests': self.requests,
+            'errors': self.errors
+        }
+
+
+PROFILE_PERCENT_TARGETS = ('target_cpu', 'target_memory', 'target_disk',
+                           'target_psi_cpu', 'target_psi_memory', 'target_psi_io')
+PROFILE_RATE_TARGETS = ('target_disk_iops', 'target_disk_mbps', 'target_net_rx_mbps', 'target_net_tx_mbps')
+PROFILE_SHAPES = ('ramp', 'sine', 'square', 'csv')
+
+
+def interpolate(times: List[float], values: List[float], t: float) -> float:
+    """折线插值，超出范围时取首尾值"""
+    if t <= times[0]:
+        return values[0]
+    if t >= times[-1]:
+        return values[-1]
+    index = bisect.bisect_right(times, t)
+    t0, t1 = times[index - 1], times[index]
+    v0, v1 = values[index - 1], values[index]
+    return v0 + (v1 - v0) * (t - t0) / (t1 - t0) if t1 > t0 else v1
+
+
+def load_csv_track(track: Dict) -> tuple:
+    """读取 CSV 轨迹，返回 (时间列表, 值列表)，时间从第一行开始计"""
+    time_column = track.get('time_column', 'time')
+    column = track['column']
+    scale = float(track.get('scale', 1.0))
+    offset = float(track.get('offset', 0.0))
+    times: List[float] = []
+    values: List[float] = []
+    with open(track['path'], 'r', newline='') as f:
+        for row in csv.DictReader(f):
+            if not row.get(time_column) or not row.get(column):
+                continue
+            times.append(float(row[time_column]))
+            values.append(float(row[column]) * scale + offset)
+    if not times:
+        raise ValueError(f"{track['path']} 中没有 {time_column} / {column} 数据")
+    order = sorted(range(len(times)), key=times.__getitem__)
+    start = times[order[0]]
+    return [times[i] - start for i in order], [values[i] for i in order]
+
+
+class ProfileScheduler:
+    """
+    按时间播放的目标曲线
+
+    tracks 中每个目标对应一个形状，value_at(t) 给出播放时间 t（秒）时的目标值；
+    targets_at(now) 把墙钟时间换算为播放时间：(now - 开始时间) * time_scale，开始前返回 None。
+    """
+
+    def __init__(self, profile: Dict, received_at: float):
+        self.profile = profile
+        self.time_scale = float(profile.get('time_scale', 1.0))
+        self.duration = float(profile['duration']) if profile.get('duration') is not None else None
+        self.loop = bool(profile.get('loop', False))
+        if self.time_scale <= 0:
+            raise ValueError("time_scale 必须大于 0")
+        if self.loop and not self.duration:
+            raise ValueError("loop 需要同时设置 duration")
+
+        start_at = profile.get('start_at')
+        if start_at is None:
+            start = received_at
+        elif isinstance(start_at, (int, float)):
+            start = float(start_at)
+        else:
+            start = datetime.fromisoformat(str(start_at)).timestamp()
+        self.start_time = start + float(profile.get('start_offset', 0.0))
+
+        tracks = profile.get('tracks') or {}
+        if not tracks:
+            raise ValueError("profile 至少需要一条 tracks")
+        self.tracks = {}
+        for target, track in tracks.items():
+            if target not in PROFILE_PERCENT_TARGETS + PROFILE_RATE_TARGETS:
+                raise ValueError(f"未知目标: {target}，可选: {', '.join(PROFILE_PERCENT_TARGETS + PROFILE_RATE_TARGETS)}")
+            self.tracks[target] = self._build_track(track)
+
+    @staticmethod
+    def _build_track(track: Dict):
+        shape = track.get('shape')
+        if shape in ('sine', 'square') and float(track.get('period', 0)) <= 0:
+            raise ValueError(f"{shape} 的 period 必须大于 0")
+        if shape == 'ramp':
+            points = track.get('points') or [[0.0, track['from']], [track['duration'], track['to']]]
+            times = [float(point[0]) for point in points]
+            values = [float(point[1]) for point in points]
+            if times != sorted(times):
+                raise ValueError("ramp 的 points 必须按时间递增")
+            return lambda t: interpolate(times, values, t)
+        if shape == 'sine':
+            mean, amplitude = float(track['mean']), float(track['amplitude'])
+            period, phase = float(track['period']), float(track.get('phase', 0.0))
+            return lambda t: mean + amplitude * math.sin(2 * math.pi * (t + phase) / period)
+        if shape == 'square':
+            low, high = float(track['low']), float(track['high'])
+            period, phase = float(track['period']), float(track.get('phase', 0.0))
+            duty = float(track.get('duty', 0.5))
+            return lambda t: high if (t + phase) % period < duty * period else low
+        if shape == 'csv':
+            times, values = load_csv_track(track)
+            return lambda t: interpolate(times, values, t)
+        raise ValueError(f"未知形状: {shape}，可选: {', '.join(PROFILE_SHAPES)}")
+
+    def play_time(self, now: float) -> Optional[float]:
+        """墙钟时间 -> 播放时间；开始前返回 None"""
+        if now < self.start_time:
+            return None
+        t = (now - self.start_time) * self.time_scale
+        if self.loop:
+            return t % self.duration
+        return min(t, self.duration) if self.duration is not None else t
+
+    def finished(self, now: float) -> bool:
+        return (not self.loop and self.duration is not None and
+                (now - self.start_time) * self.time_scale >= self.duration)
+
+    def targets_at(self, now: float) -> Optional[Dict[str, float]]:
+        """当前时刻各目标的值（按目标类型限制范围）"""
+        t = self.play_time(now)
+        if t is None:
+            return None
+        targets = {}
+        for target, track in self.tracks.items():
+            value = max(0.0, track(t))
+            if target in PROFILE_PERCENT_TARGETS:
+                value = min(100.0, value)
+            targets[target] = round(value, 3)
+        return targets
+
+
+JOURNAL_FILE_PATH = "/tmp/load_controller_journal.bin"
+JOURNAL_MAGIC = b'LCJ1'
+JOURNAL_VERSION = 1
+JOURNAL_HEADER_SIZE = 4096
+# 文件头: magic, 版本, 记录长度, 容量（条）, 已写入总条数, 创建时间（epoch 秒），随后是 4 字节长度 + JSON 字段表
+JOURNAL_HEADER = struct.Struct('<4sHHIQd')
+JOURNAL_COUNT_OFFSET = 12
+# 每条记录: epoch 时间戳（float64）+ 以下字段（float32）；速率和延迟为距上一条记录的区间值，延迟取直方图桶中点
+JOURNAL_FIELDS = (
+    'target_cpu', 'current_cpu', 'target_memory', 'current_memory', 'target_disk', 'current_disk',
+    'target_disk_io', 'current_disk_io', 'target_net_rx_mbps', 'net_rx_mbps', 'target_net_tx_mbps', 'net_tx_mbps',
+    'target_psi_cpu', 'psi_cpu', 'target_psi_memory', 'psi_memory', 'target_psi_io', 'psi_io',
+    'request_rate', 'achieved_rate', 'error_rate', 'inflight',
+    'latency_p50_ms', 'latency_p90_ms', 'latency_p99_ms', 'latency_max_ms'
+)
+JOURNAL_RECORD = struct.Struct('<d' + 'f' * len(JOURNAL_FIELDS))
+
+
+class SampleJournal:
+    """
+    预分配的环形二进制采样日志
+
+    文件大小固定为 JOURNAL_HEADER_SIZE + capacity * 记录长度，第 n 条记录写在 n % capacity 号槽位，
+    文件头中的已写入总条数在每条记录之后更新，读取时据此恢复时间顺序。
+    重新启动时如果已有文件的字段表和容量相同则继续追加，否则重新创建。
+    """
+
+    def __init__(self, path: str, capacity: int = 86400):
+        self.path = path
+        self.capacity = capacity
+        self.fd: Optional[int] = None
+        self.count = 0
+
+    @property
+    def file_size(self) -> int:
+        return JOURNAL_HEADER_SIZE + self.capacity * JOURNAL_RECORD.size
+
+    def _header_matches(self) -> bool:
+        try:
+            header = read_journal_header(self.path)
+        except (OSError, ValueError):
+            return False
+        return (header['fields'] == list(JOURNAL_FIELDS) and header['capacity'] == self.capacity
+                and os.path.getsize(self.path) == self.file_size)
+
+    def open(self):
+        if self.fd is not None:
+            return
+        if self._header_matches():
+            self.fd = os.open(self.path, os.O_RDWR)
+            self.count = read_journal_header(self.path)['count']
+            return
+        self.fd = os.open(self.path, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o644)
+        try:
+            os.posix_fallocate(self.fd, 0, self.file_size)
+        except OSError:
+            os.ftruncate(self.fd, self.file_size)
+        self.count = 0
+        schema = json.dumps({'fields': list(JOURNAL_FIELDS), 'record_format': JOURNAL_RECORD.format}).encode()
+        header = JOURNAL_HEADER.pack(JOURNAL_MAGIC, JOURNAL_VERSION, JOURNAL_RECORD.size, self.capacity,
+                                     0, time.time())
+        os.pwrite(self.fd, header + struct.pack('<I', len(schema)) + schema, 0)
+
+    def append(self, timestamp: float, values: List[float]):
+        slot = self.count % self.capacity
+        os.pwrite(self.fd, JOURNAL_RECORD.pack(timestamp, *values), JOURNAL_HEADER_SIZE + slot * JOURNAL_RECORD.size)
+        self.count += 1
+        os.pwrite(self.fd, struct.pack('<Q', self.count), JOURNAL_COUNT_OFFSET)
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+    def to_dict(self) -> Dict:
+        return {
+            'path': self.path,
+            'capacity': self.capacity,
+            'records': min(self.count, self.capacity),
+            'total_written': self.count,
+            'file_mb': round(self.file_size / 1024 / 1024, 2)
+        }
+
+
+def read_journal_header(path: str) -> Dict:
+    """读取采样日志的文件头和字段表"""
+    with open(path, 'rb') as f:
+        data = f.read(JOURNAL_HEADER_SIZE)
+    if len(data) < JOURNAL_HEADER.size + 4:
+        raise ValueError(f"不是采样日志文件: {path}")
+    magic, version, record_size, capacity, count, created = JOURNAL_HEADER.unpack_from(data)
+    if magic != JOURNAL_MAGIC:
+        raise ValueError(f"不是采样日志文件: {path}")
+    (schema_size,) = struct.unpack_from('<I', data, JOURNAL_HEADER.size)
+    schema = json.loads(data[JOURNAL_HEADER.size + 4:JOURNAL_HEADER.size + 4 + schema_size])
+    return {'version': version, 'record_size': record_size, 'capacity': capacity, 'count': count,
+            'created': created, 'fields': schema['fields'], 'record_format': schema['record_format']}
+
+
+def iter_journal(path: str):
+    """按时间顺序逐条读取采样日志，返回 (时间戳, {字段: 值})，不依赖 NumPy"""
+    header = read_journal_header(path)
+    record = struct.Struct(header['record_format'])
+    records = min(header['count'], header['capacity'])
+    first = header['count'] % header['capacity'] if header['count'] > header['capacity'] else 0
+    with open(path, 'rb') as f:
+        for i in range(records):
+            f.seek(JOURNAL_HEADER_SIZE + (first + i) % header['capacity'] * header['record_size'])
+            timestamp, *values = record.unpack(f.read(record.size))
+            yield timestamp, dict(zip(header['fields'], values))
+
+
+def load_journal(path: str = JOURNAL_FILE_PATH) -> Dict:
+    """
+    把采样日志读成 NumPy 数组（按时间顺序），返回 {'timestamp': float64 数组, 字段名: float32 数组}
+
+    供事后分析使用，NumPy 只在调用时导入，沙箱内的控制服务不依赖它。
+    """
+    import numpy as np
+
+    header = read_journal_header(path)
+    dtype = np.dtype([('timestamp', '<f8')] + [(name, '<f4') for name in header['fields']])
+    if dtype.itemsize != header['record_size']:
+        raise ValueError(f"记录长度不符: 文件 {header['record_size']}，字段表 {dtype.itemsize}")
+    records = min(header['count'], header['capacity'])
+    data = np.fromfile(path, dtype=dtype, count=records, offset=JOURNAL_HEADER_SIZE)
+    if header['count'] > header['capacity']:
+        data = np.roll(data, -(header['count'] % header['capacity']))
+    return {name: data[name] for name in dtype.names}
+
+
+def dump_journal(path: str):
+    """以 CSV 输出采样日志（--dump-journal）"""
+    header = read_journal_header(path)
+    writer = csv.writer(sys.stdout)
+    writer.writerow(['timestamp', 'time'] + header['fields'])
+    for timestamp, values in iter_journal(path):
+        writer.writerow([f"{timestamp:.3f}", datetime.fromtimestamp(timestamp).isoformat(timespec='milliseconds')] +
+                        [f"{values[name]:.6g}" for name in header['fields']])
+
+
+TRACE_MAGIC = b'LCT1'
+# 每条请求记录: 相对记录开始的计划发送时间（秒）, 接口序号, 参数 JSON 长度，随后是参数 JSON（没有参数时长度为 0）
+TRACE_RECORD = struct.Struct('<dBH')
+
+
+class TraceRecorder:
+    """
+    请求记录文件
+
+    文件头为 magic + 4 字节长度 + JSON（接口列表、开始时间、种子和负载模式），随后是逐条请求记录。
+    多个子进程的记录由控制器统一写入，写入顺序不保证按时间，读取时排序。
+    """
+
+    def __init__(self, path: str, endpoints: List[str], start_time: float, meta: Dict):
+        self.path = path
+        self.endpoint_index = {name: index for index, name in enumerate(endpoints)}
+        self.start_time = start_time
+        self.records = 0
+        self.file = open(path, 'wb')
+        header = json.dumps({'endpoints': endpoints, 'started_at': time.time(), **meta}, ensure_ascii=False).encode()
+        self.file.write(TRACE_MAGIC + struct.pack('<I', len(header)) + header)
+
+    def record(self, intended_time: float, endpoint_name: str, params: Optional[Dict] = None):
+        payload = json.dumps(params, separators=(',', ':')).encode() if params else b''
+        self.file.write(TRACE_RECORD.pack(intended_time - self.start_time, self.endpoint_index[endpoint_name],
+                                          len(payload)) + payload)
+        self.records += 1
+
+    def close(self):
+        self.file.close()
+
+    def to_dict(self) -> Dict:
+        return {'path': self.path, 'records': self.records}
+
+
+def read_trace(path: str) -> tuple:
+    """读取请求记录文件，返回 (文件头, 按时间排序的 [(时间, 接口名, 参数)])"""
+    with open(path, 'rb') as f:
+        data = f.read()
+    if data[:4] != TRACE_MAGIC:
+        raise ValueError(f"不是请求记录文件: {path}")
+    (header_size,) = struct.unpack_from('<I', data, 4)
+    header = json.loads(data[8:8 + header_size])
+    endpoints = header['endpoints']
+    records = []
+    position = 8 + header_size
+    while position + TRACE_RECORD.size <= len(data):
+        offset, index, params_size = TRACE_RECORD.unpack_from(data, position)
+        position += TRACE_RECORD.size
+        params = json.loads(data[position:position + params_size]) if params_size else None
+        position += params_size
+        records.append((offset, endpoints[index], params))
+    records.sort(key=lambda record: record[0])
+    return header, records
+
+
+def dump_trace(path: str):
+    """以 CSV 输出请求记录（--dump-trace）"""
+    header, records = read_trace(path)
+    writer = csv.writer(sys.stdout)
+    writer.writerow(['offset_seconds', 'endpoint', 'params'])
+    for offset, endpoint, params in records:
+        writer.writerow([f"{offset:.6f}", endpoint, json.dumps(params) if params else ''])
+
+
+CONFIG_FILE_PATH = "/tmp/load_controller_config.json"
+STATUS_FILE_PATH = "/tmp/load_controller_status.json"
+CONTROL_SOCKET_PATH = "/tmp/load_controller.sock"
+CONTROL_COMMANDS = ('set', 'pause', 'resume', 'weights', 'status')
+
+
+# 所有测试接口及其权重（权重从大到小），权重越大，调用越频繁；每个接口 DEFAULT_WORKERS_PER_ENDPOINT 个 worker
+DEFAULT_ENDPOINTS = {
+    'health': {'weight': 5.0, 'path': '/health', 'method': 'GET'},        # 健康检查，权重最大
+    'network': {'weight': 4.0, 'path': '/network', 'method': 'POST'},     # 网络 I/O（公网）
+    'action': {'weight': 3.0, 'path': '/action', 'method': 'POST'},       # 文件 I/O
+    'terminal': {'weight': 2.0, 'path': '/terminal', 'method': 'POST'},   # 终端命令
+    'sum': {'weight': 1.0, 'path': '/sum', 'method': 'GET'},              # 文件统计
+    'search': {'weight': 0.5, 'path': '/search', 'method': 'POST'}        # 浏览器，权重最小（最重）
+}
+DEFAULT_WORKERS_PER_ENDPOINT = 2
+
+# CPU / PSI CPU 回路的输出范围：每个 worker 的请求间隔在 MAX ~ MIN 之间，换算成总请求速率随权重之和变化
+MAX_REQUEST_INTERVAL = 10.0
+MIN_REQUEST_INTERVAL = 0.05
+
+
+def request_rate_for_interval(endpoints: Dict[str, Dict], workers_per_endpoint: int, interval: float) -> float:
+    """
+    请求间隔 -> 总请求速率（req/s）
+
+    每个 worker 两次请求之间休眠 interval / weight，每个接口 workers_per_endpoint 个 worker，
+    忽略请求本身耗时时总速率约为 workers_per_endpoint * sum(weight) / interval。
+    """
+    total_weight = sum(e['weight'] for e in endpoints.values())
+    return workers_per_endpoint * total_weight / interval
+
+
+def pid_output_range(loop: str, interval_to_rate: Callable[[float], float]) -> Tuple[float, float]:
+    """各 PID 回路的输出范围（PSI 回路与其执行机构相同）；CPU 的范围由请求间隔上下限换算成总请求速率"""
+    actuator = PSI_LOOPS.get(loop, loop)
+    if actuator == 'cpu':
+        return interval_to_rate(MAX_REQUEST_INTERVAL), interval_to_rate(MIN_REQUEST_INTERVAL)
+    if actuator in ('memory', 'disk'):
+        return 0.0, 0.9
+    if actuator == 'disk_io':
+        return 0.0, DISK_IO_MAX_OPS
+    return 0.0, NET_MAX_MBPS
+
+# 默认 PID 参数：CPU 输出为总请求速率（req/s），内存 / 磁盘输出为 ballast 占总量的比例
+DEFAULT_PID_GAINS = {
+    'cpu': {'kp': 2.0, 'ki': 0.5, 'kd': 0.0},
+    'memory': {'kp': 0.002, 'ki': 0.002, 'kd': 0.0},
+    'disk': {'kp': 0.002, 'ki': 0.002, 'kd': 0.0},
+    # 输出为 IO 生成器的操作速率，测量为（等效）IOPS，增益约为 1
+    'disk_io': {'kp': 0.5, 'ki': 0.4, 'kd': 0.0},
+    # 输出为流量生成器的限速，测量为网卡计数器，单位都是 Mbit/s
+    'net_rx': {'kp': 0.5, 'ki': 0.4, 'kd': 0.0},
+    'net_tx': {'kp': 0.5, 'ki': 0.4, 'kd': 0.0},
+    # PSI 回路：测量为停顿时间占比（%），接近饱和时变化很陡，增益比使用率回路保守
+    'psi_cpu': {'kp': 1.0, 'ki': 0.3, 'kd': 0.0},
+    'psi_memory': {'kp': 0.001, 'ki': 0.001, 'kd': 0.0},
+    'psi_io': {'kp': 30.0, 'ki': 30.0, 'kd': 0.0}
+}
+
+# PSI 回路 -> 驱动的执行机构（与同一资源的使用率回路共用，PSI 目标大于 0 时使用率回路暂停）
+PSI_LOOPS = {'psi_cpu': 'cpu', 'psi_memory': 'memory', 'psi_io': 'disk_io'}
+
+# 自动整定阶跃测试参数
+AUTOTUNE_SETTLE_SECONDS = 10.0   # 阶跃前记录基线的时间
+AUTOTUNE_STEP_SECONDS = 40.0     # 阶跃后记录响应的时间
+
+# 负载生成模式和 open 模式的到达过程
+LOAD_MODES = ('closed', 'open')
+ARRIVAL_PROCESSES = ('constant', 'poisson')
+# open 模式下实际调度晚于计划时间超过该值（秒）记为延迟到达
+OPEN_LOOP_LATE_THRESHOLD = 0.01
+
+# ballast 与目标相差超过该值才调整
+BALLAST_DEADBAND_BYTES = 16 * 1024 * 1024
+DEFAULT_MEMORY_STEP_BYTES = 1024 * 1024 * 1024   # 每个控制周期内存 ballast 默认最多增减的量
+
+# 接口配比和成本学习
+ENDPOINT_MIX_MODES = ('fixed', 'cost')
+COST_EWMA_ALPHA = 0.05        # 成本 EWMA 的平滑系数（前 1/alpha 个样本按算术平均快速收敛）
+COST_MIN_SAMPLES = 20         # 接口至少有这么多样本才参与配比优化
+COST_MIX_MIN_CHANGE = 0.05    # 新配比的份额变化超过该值才切换，避免来回抖动
+
+# 请求生成子进程
+GENERATOR_REPORT_INTERVAL = 1.0   # 子进程回报计数和直方图的间隔（秒）
+GENERATOR_STOP_TIMEOUT = 5.0      # 等待子进程最终回报和退出的时间（秒）
+# 子进程回报的累计计数（max_dispatch_lag_ms 合并时取最大值，其余求和）
+GENERATOR_COUNTERS = ('total_requests', 'successful_requests', 'failed_requests',
+                      'dropped_arrivals', 'delayed_arrivals', 'max_dispatch_lag_ms')
+
+
+class PIDController:
+    """
+    位置式 PID 控制器
+
+    - 微分作用于测量值（设定值阶跃时不产生微分冲击），并做一阶低通滤波
+    - 抗积分饱和：输出饱和且误差继续推向饱和方向时停止积分，积分项本身也限制在输出范围内
+    - 执行机构限速时（ballast 每周期只能增减一定量）积分项限制在本周期可达范围内，
+      执行机构追赶期间积分不会继续累积
+    - reset(output) 把积分项设为给定输出，实现无扰切换
+    """
+
+    def __init__(self, kp: float, ki: float, kd: float, output_min: float, output_max: float,
+                 derivative_filter: float = 0.5):
+        self.kp = kp
+        self.ki = ki
+        self.kd = kd
+        self.output_min = output_min
+        self.output_max = output_max
+        self.derivative_filter = derivative_filter
+        self.integral = 0.0
+        self.derivative = 0.0
+        self.last_measurement: Optional[float] = None
+        self.output = output_min
+
+    def reset(self, output: Optional[float] = None):
+        """重置内部状态；给定 output 时从该输出无扰启动"""
+        self.output = self._clamp(self.output if output is None else output)
+        self.integral = self.output
+        self.derivative = 0.0
+        self.last_measurement = None
+
+    def set_gains(self, kp: float, ki: float, kd: float):
+        self.kp, self.ki, self.kd = kp, ki, kd
+
+    def _clamp(self, value: float) -> float:
+        return max(self.output_min, min(self.output_max, value))
+
+    def update(self, setpoint: float, measurement: float, dt: float,
+               reachable: Optional[Tuple[float, float]] = None) -> float:
+        """
+        根据设定值和测量值计算新的输出
+
+        Args:
+            reachable: 执行机构本周期能达到的输出范围（可选），积分项不超出该范围
+        """
+        error = setpoint - measurement
+        low, high = self.output_min, self.output_max
+        if reachable is not None:
+            low = min(max(low, reachable[0]), high)
+            high = max(min(high, reachable[1]), low)
+
+        if self.last_measurement is not None and dt > 0:
+            raw_derivative = -self.kd * (measurement - self.last_measurement) / dt
+            self.derivative = (self.derivative_filter * self.derivative +
+                               (1 - self.derivative_filter) * raw_derivative)
+        self.last_measurement = measurement
+
+        proportional = self.kp * error
+        candidate = self.integral + self.ki * error * dt
+        unclamped = proportional + candidate + self.derivative
+        saturating = ((unclamped > self.output_max and error > 0) or
+                      (unclamped < self.output_min and error < 0))
+        if not saturating:
+            self.integral = max(low, min(high, candidate))
+
+        self.output = self._clamp(proportional + self.integral + self.derivative)
+        return self.output
+
+    def to_dict(self) -> Dict[str, float]:
+        return {
+            'kp': round(self.kp, 6),
+            'ki': round(self.ki, 6),
+            'kd': round(self.kd, 6),
+            'output': round(self.output, 6),
+            'integral': round(self.integral, 6)
+        }
+
+
+def fit_fopdt(times: List[float], values: List[float], step_time: float, step_size: float,
+              sample_period: float = 0.0) -> Dict[str, float]:
+    """
+    由阶跃响应拟合一阶加纯滞后（FOPDT）模型（两点法：28.3% / 63.2% 响应时间）
+
+    Args:
+        times: 采样时间（秒）
+        values: 测量值
+        step_time: 施加阶跃的时间
+        step_size: 输出阶跃幅度
+        sample_period: 控制周期（秒），零阶保持器相当于额外 sample_period / 2 的滞后
+
+    Returns:
+        dict: gain（测量值 / 输出单位）、tau（时间常数，秒）、dead_time（纯滞后，秒）
+    """
+    before = [v for t, v in zip(times, values) if t < step_time]
+    after = [(t, v) for t, v in zip(times, values) if t >= step_time]
+    if not before or len(after) < 5 or step_size == 0:
+        raise ValueError("阶跃响应数据不足")
+
+    baseline = sum(before) / len(before)
+    tail = [v for _, v in after[-max(3, len(after) // 5):]]
+    final = sum(tail) / len(tail)
+    change = final - baseline
+    if abs(change) < 1e-6:
+        raise ValueError("阶跃响应变化太小，无法拟合")
+
+    # 以阶跃时刻的基线为起点，三点滑动平均抑制噪声，线性插值求 28.3% 与 63.2% 响应时间
+    points = [(step_time, 0.0)]
+    for i, (t, _) in enumerate(after):
+        window = [v for _, v in after[max(0, i - 1):i + 2]]
+        points.append((t, (sum(window) / len(window) - baseline) / change))
+
+    def crossing(fraction: float) -> float:
+        for (t0, r0), (t1, r1) in zip(points, points[1:]):
+            if r1 >= fraction:
+                if r1 == r0:
+                    return t1 - step_time
+                return t0 + (fraction - r0) / (r1 - r0) * (t1 - t0) - step_time
+        return points[-1][0] - step_time
+
+    t28 = crossing(0.283)
+    t63 = crossing(0.632)
+    tau = max(1.5 * (t63 - t28), 1e-3)
+    dead_time = max(0.0, t63 - tau) + sample_period / 2
+    return {'gain': change / step_size, 'tau': tau, 'dead_time': dead_time}
+
+
+def simc_pi_gains(gain: float, tau: float, dead_time: float, tau_c: Optional[float] = None,
+                  sample_period: float = 0.0) -> Dict[str, float]:
+    """
+    SIMC 整定规则计算 PI 参数
+
+    kc = tau / (K * (tau_c + theta))，ti = min(tau, 4 * (tau_c + theta))，
+    默认 tau_c = max(1.5 * theta, tau / 4, sample_period)（比 tau_c = theta 更保守，超调更小）
+    """
+    if tau_c is None:
+        tau_c = max(1.5 * dead_time, tau / 4, sample_period)
+    kc = tau / (gain * (tau_c + dead_time))
+    ti = min(tau, 4 * (tau_c + dead_time))
+    return {'kp': kc, 'ki': kc / ti, 'kd': 0.0}
 
 
 class LoadControllerService:
@@ -39,295 +1738,680 @@ class LoadControllerService:
             'total_requests': 0,
             'successful_requests': 0,
             'failed_requests': 0,
+            'dropped_arrivals': 0,
+            'delayed_arrivals': 0,
+            'max_dispatch_lag_ms': 0.0,
             'start_time': None
         }
 
+        # 负载生成模式：closed（每个 worker 等待响应后再发送）或 open（按到达过程发送，与响应无关）
+        self.load_mode = 'closed'
+        self.arrival_process = 'poisson'   # open 模式的到达过程：constant 或 poisson
+        self.max_inflight = 256            # open 模式的在途请求上限，也是共享连接池大小
+        self.inflight = 0
+        self.rng = random.Random()
+        self.session: Optional[aiohttp.ClientSession] = None
+
         # 内存占用控制
-        self.memory_ballast: List[bytearray] = []  # 用于占用内存的数据
+        self.memory_ballast = MemoryBallast()  # 用于占用内存的匿名映射
+        self.memory_step_bytes = DEFAULT_MEMORY_STEP_BYTES  # 每个控制周期最多增减的内存
         self.target_memory_bytes = 0
 
         # 磁盘占用控制
         self.disk_file_path = "/tmp/load_controller_disk_ballast.bin"
+        self.disk_ballast = DiskBallast(self.disk_file_path)
+        self.disk_write_task: Optional[asyncio.Task] = None  # 进行中的限速写入
         self.target_disk_bytes = 0
 
-        # 所有测试接口及其权重（权重从大到小）
-        # 权重越大，调用越频繁
-        self.endpoints = {
-            'health': {'weight': 5.0, 'path': '/health'},      # 健康检查，权重最大
-            'network': {'weight': 4.0, 'path': '/network'},    # 网络 I/O（公网）
-            'action': {'weight': 3.0, 'path': '/action'},      # 文件 I/O
-            'terminal': {'weight': 2.0, 'path': '/terminal'},  # 终端命令
-            'sum': {'weight': 1.0, 'path': '/sum'},            # 文件统计
-            'search': {'weight': 0.5, 'path': '/search'}       # 浏览器，权重最小（最重）
-        }
-
-    async def get_current_cpu(self) -> float:
-        """从 Node Exporter 获取当前 CPU 使用率"""
-        try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get('http://localhost:9100/metrics', timeout=5) as response:
-                    if response.status != 200:
-                        return 0.0
-
-                    text = await response.text()
-
-                    # 简单解析 CPU 使用率
-                    cpu_idle = 0
-                    cpu_total = 0
-                    for line in text.split('\n'):
-                        if line.startswith('node_cpu_seconds_total'):
-                            parts = line.split()
-                            if len(parts) >= 2:
-                                value = float(parts[1])
-                                cpu_total += value
-                                if 'mode="idle"' in parts[0]:
-                                    cpu_idle += value
-
-                    if cpu_total > 0:
-                        return ((cpu_total - cpu_idle) / cpu_total) * 100
-                    return 0.0
+        # 磁盘 IO 强度控制（0 表示关闭）
+        self.target_disk_iops = 0.0
+        self.target_disk_mbps = 0.0
+        self.disk_io = DiskIOGenerator(DISK_IO_FILE_PATH)
+        self.disk_io_task: Optional[asyncio.Task] = None  # 进行中的启动 / 停止
+
+        # 网络带宽控制（Mbit/s，0 表示关闭）
+        self.target_net_rx_mbps = 0.0
+        self.target_net_tx_mbps = 0.0
+        self.net_interface: Optional[str] = None  # 配置的网卡，None 表示自动选择
+        self.net_streamers = {resource: NetStreamer(direction) for resource, direction in NET_DIRECTIONS.items()}
+
+        # PSI 目标（停顿时间占比 %，0 表示关闭）
+        self.target_psi_cpu = 0.0
+        self.target_psi_memory = 0.0
+        self.target_psi_io = 0.0
+        self.psi_kind = 'some'
+        self.psi_active: set = set()  # 当前按 PSI 控制的回路
+
+        # 控制通道：配置文件按修改时间重新读取，socket 命令立即生效并唤醒控制循环
+        self.config_mtime: Optional[int] = None
+        self.control_event = asyncio.Event()
+        self.control_server: Optional[asyncio.AbstractServer] = None
+        self.paused = False
+        self.config_errors: List[str] = []  # 最近一次 apply_config 中无效的配置项
+
+        # 请求记录和重放：seed 固定随机序列，trace_recorder 记录每个请求，replay 为进行中的重放
+        self.seed: Optional[int] = None
+        self.trace_recorder: Optional[TraceRecorder] = None
+        self.trace_buffer: Optional[List[tuple]] = None  # 子进程中暂存记录，随回报发给控制器
+        self.replay: Optional[Dict] = None
+        self.replay_config: Optional[Dict] = None
+
+        # 采样日志：按 journal_interval 记录目标、实际值、速率和本区间的延迟分位数
+        self.journal = SampleJournal(JOURNAL_FILE_PATH)
+        self.journal_enabled = True
+        self.journal_interval = 1.0
+        self.journal_last: Optional[tuple] = None  # (monotonic 时间, 合并计数, 合并直方图)
+
+        # 目标曲线
+        self.profile: Optional[ProfileScheduler] = None
+        self.profile_targets: Dict[str, float] = {}
+
+        # 系统指标采样：独立的采样循环按 sample_interval 读取，控制周期只读快照
+        self.sampler_name = 'proc'
+        self.sample_window = 5.0      # 计算 CPU 使用率的滑动窗口（秒）
+        self.sample_interval = 1.0    # 采样间隔（秒）
+        self.sampler: MetricsSampler = ProcSampler(self.sample_window)
+
+        # 所有测试接口及其权重（运行中可修改，复制默认表）
+        self.endpoints = {name: dict(endpoint) for name, endpoint in DEFAULT_ENDPOINTS.items()}
+        self.workers_per_endpoint = DEFAULT_WORKERS_PER_ENDPOINT
+
+        # 每个接口的单次请求成本（EWMA）：cpu_ms 为进程和子进程 CPU 时间，rss_kb 为峰值 RSS 增量，
+        # 均按响应头中的并发数均摊；endpoint_mix 为 cost 时据此选择配比
+        self.endpoint_costs = {name: {'samples': 0, 'cpu_ms': 0.0, 'rss_kb': 0.0, 'wall_ms': 0.0}
+                               for name in self.endpoints}
+        self.endpoint_mix = 'fixed'
+        self.cost_mix_floor = 0.05
+
+        # 每个接口的延迟直方图（仅成功请求）和失败次数
+        self.latency_histograms = {name: LatencyHistogram() for name in self.endpoints}
+        self.endpoint_errors = {name: 0 for name in self.endpoints}
+
+        # PID 控制：CPU 输出总请求速率，内存 / 磁盘输出 ballast 占总量的比例，磁盘 IO 输出操作速率
+        self.control_interval = 1.0   # 控制周期（秒）
+        self.pids: Dict[str, PIDController] = {}
+        for loop, gains in DEFAULT_PID_GAINS.items():
+            output_min, output_max = pid_output_range(loop, self.interval_to_rate)
+            self.pids[loop] = PIDController(output_min=output_min, output_max=output_max, **gains)
+        self.pids['cpu'].reset(self.interval_to_rate(self.current_request_interval))
+        self.pids['memory'].reset(0.0)
+        self.pids['disk'].reset(0.0)
+        self.pids['disk_io'].reset(0.0)
+        self.pids['net_rx'].reset(0.0)
+        self.pids['net_tx'].reset(0.0)
+        self.pids['psi_cpu'].reset(self.pids['cpu'].output)
+        self.pids['psi_memory'].reset(0.0)
+        self.pids['psi_io'].reset(0.0)
+        self.autotuning: Optional[str] = None
+        self.autotune_request = None
+        self.autotune_results: Dict[str, Dict] = {}
+
+        # 多进程请求生成：子进程各自运行 worker 和调度器，控制器按周期下发速率份额并汇总回报
+        self.processes = 0
+        self.generators: List[Dict] = []   # 每个子进程: process / conn / index / report
+        self.generator_index: Optional[int] = None  # 在子进程中为自己的序号
+
+        # CPU 绑定：controller_cpu 为 None 时恢复启动时的 CPU 集合
+        self.controller_cpu: Optional[int] = None
+        self.initial_affinity = sorted(os.sched_getaffinity(0))
+
+    def get_current_cpu(self) -> float:
+        """当前 CPU 使用率（采样窗口内的平均值）"""
+        return self.sampler.snapshot['cpu_percent']
+
+    def get_current_memory(self) -> float:
+        """当前内存使用率（读取最新采样快照）"""
+        snapshot = self.sampler.snapshot
+        if snapshot['mem_total'] > 0:
+            used = snapshot['mem_total'] - snapshot['mem_available']
+            return (used / snapshot['mem_total']) * 100
+        return 0.0
+
+    def get_current_disk(self) -> float:
+        """当前根文件系统使用率（读取最新采样快照）"""
+        snapshot = self.sampler.snapshot
+        if snapshot['fs_size'] > 0:
+            used = snapshot['fs_size'] - snapshot['fs_avail']
+            return (used / snapshot['fs_size']) * 100
+        return 0.0
+
+    def get_disk_io_setpoint(self) -> float:
+        """磁盘 IO 目标（IOPS；只设置了 target_disk_mbps 时按块大小换算为等效 IOPS），0 表示关闭"""
+        if self.target_disk_iops > 0:
+            return float(self.target_disk_iops)
+        if self.target_disk_mbps > 0:
+            return self.target_disk_mbps * 1024 * 1024 / self.disk_io.block_size
+        return 0.0
+
+    def get_current_disk_io(self) -> float:
+        """当前磁盘 IO 强度，单位与 get_disk_io_setpoint 一致"""
+        snapshot = self.sampler.snapshot
+        if self.target_disk_iops > 0 or self.target_disk_mbps <= 0:
+            return snapshot['disk_read_iops'] + snapshot['disk_write_iops']
+        mbps = snapshot['disk_read_mbps'] + snapshot['disk_write_mbps']
+        return mbps * 1024 * 1024 / self.disk_io.block_size
+
+    def get_psi_target(self, loop: str) -> float:
+        """psi_cpu / psi_memory / psi_io 回路的目标（%）"""
+        return getattr(self, f'target_{loop}')
+
+    def get_current_psi(self, resource: str) -> float:
+        """cpu / memory / io 当前的停顿时间占比（%，按 psi_kind）"""
+        return self.sampler.snapshot[f'psi_{resource}_{self.psi_kind}']
+
+    def get_net_target(self, resource: str) -> float:
+        """net_rx / net_tx 的带宽目标（Mbit/s）"""
+        return self.target_net_rx_mbps if resource == 'net_rx' else self.target_net_tx_mbps
+
+    def is_control_active(self, resource: str) -> bool:
+        """磁盘 IO 和网络回路只在设置了目标且执行机构在运行时参与控制；PSI 回路与同一执行机构的使用率回路二选一"""
+        if resource in PSI_LOOPS:
+            return resource in self.psi_active and self.is_actuator_ready(PSI_LOOPS[resource])
+        if any(actuator == resource and loop in self.psi_active for loop, actuator in PSI_LOOPS.items()):
+            return False
+        if resource == 'disk_io':
+            return self.get_disk_io_setpoint() > 0 and self.disk_io.running
+        if resource in self.net_streamers:
+            return self.get_net_target(resource) > 0 and self.net_streamers[resource].running
+        if resource == 'cpu':
+            # 暂停或重放期间 CPU 回路停止积分，恢复后从之前的速率继续
+            return self.is_actuator_ready('cpu')
+        return True
+
+    def local_generation(self) -> bool:
+        """本进程的 worker 和调度器是否发送请求（暂停、重放或已分布到子进程时不发送）"""
+        return not self.paused and self.replay is None and not self.generators
+
+    def is_actuator_ready(self, actuator: str) -> bool:
+        """执行机构能否接受控制输出（重放期间请求按记录发送，不受 CPU 回路控制）"""
+        if actuator == 'disk_io':
+            return self.disk_io.running
+        if actuator == 'cpu':
+            return not self.paused and self.replay is None
+        return True
+
+    def sync_psi_loops(self):
+        """
+        按 PSI 目标切换回路：切换时新回路从旧回路的当前输出无扰启动
 
-        except Exception as e:
-            print(f"[监控] 获取 CPU 使用率失败: {e}")
-            return 0.0
+        PSI 目标置 0 后使用率回路恢复，从 PSI 回路留下的输出继续调节。
+        """
+        for loop, actuator in PSI_LOOPS.items():
+            active = self.get_psi_target(loop) > 0
+            if active == (loop in self.psi_active):
+                continue
+            if active:
+                self.psi_active.add(loop)
+                self.pids[loop].reset(self.pids[actuator].output)
+                print(f"[PSI] {actuator} 改按 PSI 控制: 目标 {self.psi_kind} {self.get_psi_target(loop):g}%")
+            else:
+                self.psi_active.discard(loop)
+                self.pids[actuator].reset(self.pids[loop].output)
+                print(f"[PSI] {actuator} 恢复按使用率控制")
+
+    def get_reachable_output(self, resource: str) -> Optional[Tuple[float, float]]:
+        """
+        内存 / 磁盘 ballast 本周期能达到的输出范围（占总量的比例），与 adjust_memory / adjust_disk 的步长一致
 
-    async def get_current_memory(self) -> float:
-        """从 Node Exporter 获取当前内存使用率"""
-        try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get('http://localhost:9100/metrics', timeout=5) as response:
-                    if response.status != 200:
-                        return 0.0
-
-                    text = await response.text()
-
-                    # 解析内存指标
-                    mem_total = 0
-                    mem_available = 0
-
-                    for line in text.split('\n'):
-                        if line.startswith('node_memory_MemTotal_bytes'):
-                            parts = line.split()
-                            if len(parts) >= 2:
-                                mem_total = float(parts[1])
-                        elif line.startswith('node_memory_MemAvailable_bytes'):
-                            parts = line.split()
-                            if len(parts) >= 2:
-                                mem_available = float(parts[1])
-
-                    if mem_total > 0:
-                        used = mem_total - mem_available
-                        return (used / mem_total) * 100
-                    return 0.0
+        内存每周期最多增减 memory_step_bytes；磁盘增长按 write_mbps 限速（fallocate 不限），释放不限。
+        其余执行机构立即生效，返回 None。
+        """
+        actuator = PSI_LOOPS.get(resource, resource)
+        if actuator == 'memory':
+            total = self.get_total_memory_bytes()
+            if not total:
+                return None
+            level = self.memory_ballast.size / total
+            step = self.memory_step_bytes / total
+            return level - step, level + step
+        if actuator == 'disk' and self.disk_ballast.mode != 'fallocate':
+            total = self.get_total_disk_bytes()
+            if not total:
+                return None
+            if self.disk_ballast.write_mbps > 0:
+                step = max(self.disk_ballast.write_mbps * 1024 * 1024 * self.control_interval, DISK_WRITE_CHUNK)
+            else:
+                step = DISK_UNLIMITED_STEP
+            return 0.0, self.disk_ballast.size / total + step / total
+        return None
+
+    def get_total_memory_bytes(self) -> int:
+        """系统总内存（字节，读取最新采样快照）"""
+        return int(self.sampler.snapshot['mem_total'])
+
+    def get_total_disk_bytes(self) -> int:
+        """根文件系统总空间（字节，读取最新采样快照）"""
+        return int(self.sampler.snapshot['fs_size'])
+
+    def interval_to_rate(self, interval: float) -> float:
+        """请求间隔 -> 按当前接口权重换算的总请求速率（req/s），见 request_rate_for_interval"""
+        return request_rate_for_interval(self.endpoints, self.workers_per_endpoint, interval)
+
+    def set_request_rate(self, rate: float):
+        """按总请求速率设置 worker 的请求间隔"""
+        self.current_request_interval = self.interval_to_rate(1.0) / max(rate, 1e-6)
+
+    def update_rate_limits(self):
+        """权重之和变化后重新计算 CPU / PSI CPU 回路的输出范围，当前输出和积分项限制到新范围内"""
+        for loop in ('cpu', 'psi_cpu'):
+            pid = self.pids[loop]
+            pid.output_min, pid.output_max = pid_output_range(loop, self.interval_to_rate)
+            pid.output = pid._clamp(pid.output)
+            pid.integral = pid._clamp(pid.integral)
+
+    def get_request_rate(self) -> float:
+        """
+        当前总请求速率（req/s）
 
-        except Exception as e:
-            print(f"[监控] 获取内存使用率失败: {e}")
-            return 0.0
+        CPU 回路、PSI CPU 回路、配比调整和子进程设置都经 set_request_rate 写入请求间隔，
+        调度器、状态和日志统一从这里读取，不直接读某个 PID 的输出。
+        """
+        return self.interval_to_rate(self.current_request_interval)
+
+    def get_resource_value(self, resource: str) -> float:
+        """读取资源当前使用率（%）"""
+        if resource in PSI_LOOPS:
+            return self.get_current_psi(resource[len('psi_'):])
+        if resource == 'cpu':
+            return self.get_current_cpu()
+        if resource == 'memory':
+            return self.get_current_memory()
+        if resource == 'disk_io':
+            return self.get_current_disk_io()
+        if resource in self.net_streamers:
+            if self.sampler.net_interface == 'lo':
+                return self.net_streamers[resource].sample_rate()
+            return self.sampler.snapshot[f'{resource}_mbps']
+        return self.get_current_disk()
+
+    def apply_control_output(self, resource: str, output: float):
+        """把控制器输出作用到执行机构（PSI 回路作用到对应资源的执行机构）"""
+        resource = PSI_LOOPS.get(resource, resource)
+        if resource == 'cpu':
+            self.set_request_rate(output)
+        elif resource == 'memory':
+            self.target_memory_bytes = int(output * self.get_total_memory_bytes())
+        elif resource == 'disk_io':
+            self.disk_io.rate = output
+        elif resource in self.net_streamers:
+            self.net_streamers[resource].rate_mbps = output
+        else:
+            self.target_disk_bytes = int(output * self.get_total_disk_bytes())
+
+    async def autotune(self, resource: str, step: Optional[float] = None):
+        """
+        阶跃测试自动整定
 
-    async def get_current_disk(self) -> float:
-        """从 Node Exporter 获取当前磁盘使用率"""
+        保持当前输出 AUTOTUNE_SETTLE_SECONDS 秒记录基线，然后输出阶跃 step，
+        记录 AUTOTUNE_STEP_SECONDS 秒响应，拟合 FOPDT 模型并按 SIMC 规则设置 PI 参数。
+        """
+        pid = self.pids[resource]
+        base_output = pid.output
+        if step is None:
+            if resource in ('cpu', 'net_rx', 'net_tx'):
+                step = max(base_output * 0.5, 10.0)
+            elif resource == 'disk_io':
+                step = max(base_output * 0.5, 100.0)
+            else:
+                step = 0.05
+        step = min(step, pid.output_max - base_output)
+        if step <= 0:
+            print(f"[整定] {resource} 输出已接近上限，无法进行阶跃测试")
+            return
+
+        self.autotuning = resource
+        print(f"[整定] {resource} 阶跃测试开始: 输出 {base_output:.4g} -> {base_output + step:.4g}")
+        times: List[float] = []
+        values: List[float] = []
+        start = time.monotonic()
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get('http://localhost:9100/metrics', timeout=5) as response:
-                    if response.status != 200:
-                        return 0.0
-
-                    text = await response.text()
-
-                    # 解析根文件系统磁盘指标
-                    fs_size = 0
-                    fs_avail = 0
-
-                    for line in text.split('\n'):
-                        # 只关注根文件系统 (mountpoint="/")
-                        if 'mountpoint="/"' in line and 'fstype=' in line:
-                            if line.startswith('node_filesystem_size_bytes'):
-                                parts = line.split()
-                                if len(parts) >= 2:
-                                    fs_size = float(parts[1])
-                            elif line.startswith('node_filesystem_avail_bytes'):
-                                parts = line.split()
-                                if len(parts) >= 2:
-                                    fs_avail = float(parts[1])
-
-                    if fs_size > 0:
-                        used = fs_size - fs_avail
-                        return (used / fs_size) * 100
-                    return 0.0
-
+            while self.running:
+                elapsed = time.monotonic() - start
+                if elapsed > AUTOTUNE_SETTLE_SECONDS + AUTOTUNE_STEP_SECONDS:
+                    break
+                output = base_output + (step if elapsed >= AUTOTUNE_SETTLE_SECONDS else 0.0)
+                self.apply_control_output(resource, output)
+                times.append(elapsed)
+                values.append(self.get_resource_value(resource))
+                await asyncio.sleep(self.control_interval)
+
+            model = fit_fopdt(times, values, AUTOTUNE_SETTLE_SECONDS, step, self.control_interval)
+            if model['gain'] <= 0:
+                raise ValueError(f"过程增益非正: {model['gain']:.4g}")
+            gains = simc_pi_gains(model['gain'], model['tau'], model['dead_time'],
+                                  sample_period=self.control_interval)
+            pid.set_gains(**gains)
+            self.autotune_results[resource] = {
+                **{k: round(v, 6) for k, v in model.items()},
+                **{k: round(v, 6) for k, v in gains.items()},
+                'step': step,
+                'timestamp': datetime.now().isoformat()
+            }
+            print(f"[整定] {resource} 完成: K={model['gain']:.4g}, tau={model['tau']:.1f}s, "
+                  f"theta={model['dead_time']:.1f}s -> kp={gains['kp']:.4g}, ki={gains['ki']:.4g}")
         except Exception as e:
-            print(f"[监控] 获取磁盘使用率失败: {e}")
-            return 0.0
-
-    async def get_total_memory_bytes(self) -> int:
-        """从 Node Exporter 获取系统总内存（字节）"""
-        try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get('http://localhost:9100/metrics', timeout=5) as response:
-                    if response.status != 200:
-                        return 0
-
-                    text = await response.text()
-
-                    for line in text.split('\n'):
-                        if line.startswith('node_memory_MemTotal_bytes'):
-                            parts = line.split()
-                            if len(parts) >= 2:
-                                return int(float(parts[1]))
-                    return 0
-
-        except Exception:
-            return 0
-
-    async def get_total_disk_bytes(self) -> int:
-        """从 Node Exporter 获取系统总磁盘空间（字节）"""
-        try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get('http://localhost:9100/metrics', timeout=5) as response:
-                    if response.status != 200:
-                        return 0
-
-                    text = await response.text()
-
-                    for line in text.split('\n'):
-                        if 'mountpoint="/"' in line and line.startswith('node_filesystem_size_bytes'):
-                            parts = line.split()
-                            if len(parts) >= 2:
-                                return int(float(parts[1]))
-                    return 0
-
-        except Exception:
-            return 0
+            print(f"[整定] {resource} 自动整定失败: {e}")
+        finally:
+            pid.reset(base_output)
+            self.apply_control_output(resource, base_output)
+            self.autotuning = None
 
     async def adjust_memory(self):
         """调整内存占用以达到目标"""
         try:
-            current_memory_percent = await self.get_current_memory()
-            total_memory = await self.get_total_memory_bytes()
+            current_memory_percent = self.get_current_memory()
+            total_memory = self.get_total_memory_bytes()
 
             if total_memory == 0:
                 return
 
-            # 计算目标内存字节数
-            target_bytes = int(total_memory * self.target_memory / 100)
+            # 目标 ballast 字节数由内存 PID 控制器给出
+            target_bytes = self.target_memory_bytes
 
             # 计算当前 ballast 占用的内存
-            current_ballast_bytes = sum(len(chunk) for chunk in self.memory_ballast)
+            current_ballast_bytes = self.memory_ballast.size
 
             # 计算需要调整的内存量
             delta_bytes = target_bytes - current_ballast_bytes
 
-            if abs(delta_bytes) > 100 * 1024 * 1024:  # 如果差异超过 100MB
+            if abs(delta_bytes) > BALLAST_DEADBAND_BYTES:
+                step = min(abs(delta_bytes), self.memory_step_bytes)
+                start = time.perf_counter()
                 if delta_bytes > 0:
-                    # 需要增加内存
-                    chunk_size = min(delta_bytes, 100 * 1024 * 1024)  # 每次最多分配 100MB
-                    chunk = bytearray(chunk_size)
-                    # 写入数据以确保内存真正分配
-                    for i in range(0, len(chunk), 4096):
-                        chunk[i] = 1
-                    self.memory_ballast.append(chunk)
-                    print(f"[内存] 增加 {chunk_size / 1024 / 1024:.1f}MB "
-                          f"(系统内存: {current_memory_percent:.1f}%, 目标: {self.target_memory:.1f}%, "
-                          f"Ballast: {(current_ballast_bytes + chunk_size) / 1024 / 1024:.1f}MB)")
+                    # 需要增加内存（页面分配在线程中完成，不阻塞事件循环）
+                    changed = await asyncio.to_thread(self.memory_ballast.grow, step)
+                    action = "增加"
                 else:
-                    # 需要释放内存
-                    if self.memory_ballast:
-                        released = self.memory_ballast.pop()
-                        released_size = len(released)
-                        del released
-                        print(f"[内存] 释放 {released_size / 1024 / 1024:.1f}MB "
-                              f"(系统内存: {current_memory_percent:.1f}%, 目标: {self.target_memory:.1f}%, "
-                              f"Ballast: {(current_ballast_bytes - released_size) / 1024 / 1024:.1f}MB)")
+                    # 需要释放内存（munmap / MADV_DONTNEED 立即归还）
+                    changed = await asyncio.to_thread(self.memory_ballast.shrink, step)
+                    action = "释放"
+                elapsed_ms = (time.perf_counter() - start) * 1000
+                print(f"[内存] {action} {changed / 1024 / 1024:.1f}MB，耗时 {elapsed_ms:.0f}ms "
+                      f"(系统内存: {current_memory_percent:.1f}%, 目标: {self.target_memory:.1f}%, "
+                      f"Ballast: {self.memory_ballast.size / 1024 / 1024:.1f}MB)")
         except Exception as e:
             print(f"[内存] 调整内存失败: {e}")
 
     async def adjust_disk(self):
         """调整磁盘占用以达到目标"""
         try:
-            current_disk_percent = await self.get_current_disk()
-            total_disk = await self.get_total_disk_bytes()
+            current_disk_percent = self.get_current_disk()
+            total_disk = self.get_total_disk_bytes()
 
             if total_disk == 0:
                 return
 
-            # 计算目标磁盘字节数
-            target_bytes = int(total_disk * self.target_disk / 100)
+            # 上一次限速写入尚未完成，等待它结束后再调整
+            if self.disk_write_task is not None and not self.disk_write_task.done():
+                return
+
+            # 目标 ballast 字节数由磁盘 PID 控制器给出
+            target_bytes = self.target_disk_bytes
 
             # 获取当前文件大小
-            current_bytes = 0
-            if os.path.exists(self.disk_file_path):
-                current_bytes = os.path.getsize(self.disk_file_path)
+            current_bytes = self.disk_ballast.size
 
             # 计算需要调整的磁盘空间
             delta_bytes = target_bytes - current_bytes
 
-            if abs(delta_bytes) > 100 * 1024 * 1024:  # 如果差异超过 100MB
+            if abs(delta_bytes) > BALLAST_DEADBAND_BYTES:
                 if delta_bytes > 0:
-                    # 需要增加磁盘占用
-                    chunk_size = min(delta_bytes, 500 * 1024 * 1024)  # 每次最多增加 500MB
-
-                    # 以追加模式写入文件
-                    with open(self.disk_file_path, 'ab') as f:
-                        # 写入随机数据
-                        chunk = bytearray(chunk_size)
-                        for i in range(0, len(chunk), 4096):
-                            chunk[i] = i % 256
-                        f.write(chunk)
-
-                    print(f"[磁盘] 增加 {chunk_size / 1024 / 1024:.1f}MB "
-                          f"(系统磁盘: {current_disk_percent:.1f}%, 目标: {self.target_disk:.1f}%, "
-                          f"Ballast: {(current_bytes + chunk_size) / 1024 / 1024:.1f}MB)")
+                    # 需要增加磁盘占用：写入量限制为一个控制周期的速率预算，在线程中执行，
+                    # 控制循环不等待写入完成
+                    if self.disk_ballast.mode == 'fallocate':
+                        step = delta_bytes
+                    elif self.disk_ballast.write_mbps > 0:
+                        budget = int(self.disk_ballast.write_mbps * 1024 * 1024 * self.control_interval)
+                        step = min(delta_bytes, max(budget, DISK_WRITE_CHUNK))
+                    else:
+                        step = min(delta_bytes, DISK_UNLIMITED_STEP)
+                    self.disk_write_task = asyncio.create_task(self.grow_disk(step, current_disk_percent))
                 else:
                     # 需要释放磁盘空间
-                    if current_bytes > 0:
-                        new_size = max(0, current_bytes + delta_bytes)
-                        if new_size == 0:
-                            os.remove(self.disk_file_path)
-                            print(f"[磁盘] 删除文件 "
-                                  f"(系统磁盘: {current_disk_percent:.1f}%, 目标: {self.target_disk:.1f}%)")
-                        else:
-                            os.truncate(self.disk_file_path, new_size)
-                            print(f"[磁盘] 减少 {abs(delta_bytes) / 1024 / 1024:.1f}MB "
-                                  f"(系统磁盘: {current_disk_percent:.1f}%, 目标: {self.target_disk:.1f}%, "
-                                  f"Ballast: {new_size / 1024 / 1024:.1f}MB)")
+                    released = await asyncio.to_thread(self.disk_ballast.shrink, -delta_bytes)
+                    print(f"[磁盘] 减少 {released / 1024 / 1024:.1f}MB "
+                          f"(系统磁盘: {current_disk_percent:.1f}%, 目标: {self.target_disk:.1f}%, "
+                          f"Ballast: {self.disk_ballast.size / 1024 / 1024:.1f}MB)")
         except Exception as e:
             print(f"[磁盘] 调整磁盘失败: {e}")
 
+    async def grow_disk(self, nbytes: int, current_disk_percent: float):
+        """在线程中增加磁盘 ballast"""
+        try:
+            start = time.perf_counter()
+            added = await asyncio.to_thread(self.disk_ballast.grow, nbytes)
+            elapsed = time.perf_counter() - start
+            print(f"[磁盘] 增加 {added / 1024 / 1024:.1f}MB ({self.disk_ballast.mode}，耗时 {elapsed:.1f}s) "
+                  f"(系统磁盘: {current_disk_percent:.1f}%, 目标: {self.target_disk:.1f}%, "
+                  f"Ballast: {self.disk_ballast.size / 1024 / 1024:.1f}MB)")
+        except Exception as e:
+            print(f"[磁盘] 写入磁盘失败: {e}")
+
+    async def adjust_disk_io(self):
+        """按 IO 目标启动或停止 IO 生成器"""
+        if self.disk_io_task is not None and not self.disk_io_task.done():
+            return
+        active = self.get_disk_io_setpoint() > 0 or self.target_psi_io > 0
+        if active and not self.disk_io.running:
+            print(f"[磁盘IO] 启动 IO 生成器: {self.disk_io.threads} 线程, 块 {self.disk_io.block_size // 1024}KB, "
+                  f"读比例 {self.disk_io.read_ratio}, 测试文件 {self.disk_io.file_size // 1024 // 1024}MB")
+            self.disk_io_task = asyncio.create_task(asyncio.to_thread(self.disk_io.start))
+        elif not active and self.disk_io.running:
+            self.pids['disk_io'].reset(0.0)
+            self.pids['psi_io'].reset(0.0)
+            self.apply_control_output('disk_io', 0.0)
+            print("[磁盘IO] IO 目标已关闭，停止 IO 生成器")
+            self.disk_io_task = asyncio.create_task(asyncio.to_thread(self.disk_io.stop))
+
+    async def adjust_network(self):
+        """按带宽目标启动或停止各方向的流量生成器"""
+        for resource, streamer in self.net_streamers.items():
+            active = self.get_net_target(resource) > 0
+            if active and not streamer.running:
+                if not streamer.endpoint:
+                    continue
+                print(f"[网络] 启动 {streamer.direction} 流量: {streamer.endpoint}，{streamer.streams} 个流，"
+                      f"测量网卡 {self.sampler.net_interface}")
+                streamer.start()
+            elif not active and streamer.running:
+                self.pids[resource].reset(0.0)
+                self.apply_control_output(resource, 0.0)
+                await streamer.stop()
+                print(f"[网络] {streamer.direction} 带宽目标已关闭，停止流量生成")
+
+    async def send_request(self, endpoint_name: str, intended_time: Optional[float] = None,
+                           params: Optional[Dict] = None, counted: bool = False):
+        """
+        通过共享会话发送一次请求并更新统计
+
+        Args:
+            endpoint_name: 接口名称
+            intended_time: open 模式下的计划发送时间（事件循环时间）。延迟从计划时间开始计算，
+                调度延迟也计入延迟，避免协同遗漏（coordinated omission）低估延迟
+            params: 查询参数（重放记录时使用记录中的参数）
+            counted: 调用方已计入在途请求（见 spawn_request），本方法不再增减 inflight
+        """
+        endpoint = self.endpoints[endpoint_name]
+        loop = asyncio.get_running_loop()
+        start = intended_time if intended_time is not None else loop.time()
+        self.record_trace(start, endpoint_name, params)
+        if not counted:
+            self.inflight += 1
+        success = False
+        try:
+            async with self.session.request(endpoint['method'], f"{self.base_url}{endpoint['path']}",
+                                            params=params) as response:
+                await response.read()
+                success = response.status == 200
+                if success:
+                    self.record_endpoint_cost(endpoint_name, response.headers)
+        except Exception:
+            pass
+        finally:
+            if not counted:
+                self.inflight -= 1
+
+        self.stats['total_requests'] += 1
+        if success:
+            self.stats['successful_requests'] += 1
+            self.latency_histograms[endpoint_name].record((loop.time() - start) * 1000)
+        else:
+            self.stats['failed_requests'] += 1
+            self.endpoint_errors[endpoint_name] += 1
+
+    def spawn_request(self, pending: set, endpoint_name: str, intended_time: float, params: Optional[Dict] = None):
+        """
+        创建一个不等待的发送任务（open 模式调度器和重放使用）
+
+        在 create_task 之前计入在途请求，任务结束（包括被取消）时减回：调度落后时连续创建任务，
+        max_inflight 检查也能立即看到这些尚未开始运行的请求。
+        """
+        self.inflight += 1
+        task = asyncio.create_task(self.send_request(endpoint_name, intended_time, params, counted=True))
+        pending.add(task)
+        task.add_done_callback(pending.discard)
+        task.add_done_callback(self._release_inflight)
+
+    def _release_inflight(self, task: asyncio.Task):
+        self.inflight -= 1
+
+    def record_trace(self, intended_time: float, endpoint_name: str, params: Optional[Dict] = None):
+        """记录一次请求（事件循环时间即 time.monotonic()，各进程可比）"""
+        if self.trace_recorder is not None:
+            self.trace_recorder.record(intended_time, endpoint_name, params)
+        elif self.trace_buffer is not None:
+            self.trace_buffer.append((intended_time, endpoint_name, params))
+
+    def record_endpoint_cost(self, endpoint_name: str, headers):
+        """
+        从 app.py 的 X-Res-* 响应头更新接口成本
+
+        这些头是进程级计数的增量，并发请求会相互计入，按 X-Res-Concurrency 均摊；
+        服务未开启资源统计（没有这些头）时不更新。
+        """
+        try:
+            cpu_ms = float(headers['X-Res-Cpu-Process-Ms']) + float(headers['X-Res-Cpu-Children-Ms'])
+            rss_kb = float(headers['X-Res-Rss-Peak-Kb'])
+            wall_ms = float(headers['X-Res-Wall-Ms'])
+            concurrency = max(1.0, float(headers.get('X-Res-Concurrency', 1)))
+        except (KeyError, ValueError):
+            return
+        cost = self.endpoint_costs[endpoint_name]
+        alpha = max(COST_EWMA_ALPHA, 1.0 / (cost['samples'] + 1))
+        cost['cpu_ms'] += alpha * (cpu_ms / concurrency - cost['cpu_ms'])
+        cost['rss_kb'] += alpha * (rss_kb / concurrency - cost['rss_kb'])
+        cost['wall_ms'] += alpha * (wall_ms - cost['wall_ms'])
+        cost['samples'] += 1
+
+    def get_endpoint_costs(self) -> Dict[str, Dict]:
+        """控制器自身与各子进程最新回报合并后的成本表"""
+        return combine_endpoint_costs([self.endpoint_costs] + [
+            generator['report']['costs'] for generator in self.generators if generator['report']
+        ])
+
+    @staticmethod
+    def mix_cpu_cost(weights: Dict[str, float], costs: Dict[str, Dict]) -> Optional[float]:
+        """按权重配比的平均单次请求 CPU 成本（ms）；有权重的接口还没有足够样本时返回 None"""
+        total = sum(weights.values())
+        if total <= 0 or any(weight > 0 and costs[name]['samples'] < COST_MIN_SAMPLES
+                             for name, weight in weights.items()):
+            return None
+        return sum(weight * costs[name]['cpu_ms'] for name, weight in weights.items()) / total
+
+    def optimize_endpoint_mix(self, costs: Dict[str, Dict]) -> Optional[Dict[str, float]]:
+        """
+        单次 CPU 成本最高的配比（各接口份额）
+
+        每个接口保留 cost_mix_floor 的份额以持续学习成本，其余份额给单次 CPU 成本最高的接口；
+        平均单次成本最高即达到同一 CPU 目标所需的请求速率最低。
+        任一接口样本不足时返回 None（保持当前配比继续学习，避免只在部分接口之间来回切换）。
+        """
+        if any(costs[name]['samples'] < COST_MIN_SAMPLES for name in self.endpoints):
+            return None
+        floor = min(self.cost_mix_floor, 1.0 / len(self.endpoints))
+        shares = {name: floor for name in self.endpoints}
+        best = max(self.endpoints, key=lambda name: costs[name]['cpu_ms'])
+        shares[best] += 1.0 - floor * len(self.endpoints)
+        return shares
+
+    def adjust_endpoint_mix(self):
+        """
+        cost 模式下每个控制周期按学习到的成本更新配比
+
+        切换配比时按新旧平均单次成本之比缩放请求速率并重置 CPU PID，使预期 CPU 负载不变（前馈），
+        之后再由 PID 修正成本估计的误差。
+        """
+        if self.endpoint_mix != 'cost' or self.autotuning == 'cpu':
+            return
+        costs = self.get_endpoint_costs()
+        shares = self.optimize_endpoint_mix(costs)
+        if shares is None:
+            return
+        old_weights = {name: endpoint['weight'] for name, endpoint in self.endpoints.items()}
+        total_weight = sum(old_weights.values())
+        if max(abs(shares[name] - old_weights[name] / total_weight) for name in shares) < COST_MIX_MIN_CHANGE:
+            return
+
+        new_weights = {name: share * total_weight for name, share in shares.items()}
+        rate = self.get_request_rate()
+        old_cost = self.mix_cpu_cost(old_weights, costs)
+        new_cost = self.mix_cpu_cost(new_weights, costs)
+        if old_cost and new_cost:
+            rate *= old_cost / new_cost
+        for name, weight in new_weights.items():
+            self.endpoints[name]['weight'] = weight
+        # 两个 CPU 执行机构回路都从新的速率继续，PSI 控制期间同样生效
+        for loop in ('cpu', 'psi_cpu'):
+            self.pids[loop].reset(rate)
+        self.set_request_rate(self.pids['cpu'].output)
+        print(f"[配比] 按成本更新接口配比: " + ", ".join(f"{name}={share:.2f}" for name, share in shares.items()) +
+              (f" | 单次 CPU {old_cost:.2f} -> {new_cost:.2f} ms" if old_cost and new_cost else "") +
+              f" | 速率 {self.get_request_rate():.1f} req/s")
+
+    def get_cost_status(self) -> Dict:
+        """成本表、当前配比的平均单次成本和达到 CPU 目标的前馈速率估计"""
+        costs = self.get_endpoint_costs()
+        weights = {name: endpoint['weight'] for name, endpoint in self.endpoints.items()}
+        mix_cost = self.mix_cpu_cost(weights, costs)
+        total_weight = sum(weights.values()) or 1.0
+        # 1 req/s、每次 c ms 占用 c/1000 个 CPU，即 c/10/cpus 个百分点（忽略基础负载和请求外的开销）
+        percent_per_rate = mix_cost / 10 / (os.cpu_count() or 1) if mix_cost else None
+        return {
+            'mode': self.endpoint_mix,
+            'cost_mix_floor': self.cost_mix_floor,
+            'mix_cpu_ms': round(mix_cost, 3) if mix_cost is not None else None,
+            'feedforward_rate': round(self.target_cpu / percent_per_rate, 2) if percent_per_rate else None,
+            'endpoints': {
+                name: {
+                    'share': round(weights[name] / total_weight, 3),
+                    'samples': cost['samples'],
+                    'cpu_ms': round(cost['cpu_ms'], 3),
+                    'rss_kb': round(cost['rss_kb'], 1),
+                    'wall_ms': round(cost['wall_ms'], 3)
+                }
+                for name, cost in costs.items()
+            }
+        }
+
     async def worker(self, endpoint_name: str, worker_id: int):
         """
-        工作协程：持续向指定接口发送请求
+        工作协程（closed 模式）：发送一次请求，等待完成后休眠，再发送下一次
 
         Args:
             endpoint_name: 接口名称 (action, search, terminal, network, sum)
             worker_id: Worker ID
         """
-        endpoint = self.endpoints[endpoint_name]
-        url = f"{self.base_url}{endpoint['path']}"
-        weight = endpoint['weight']
-
         print(f"[Worker] 启动 {endpoint_name} worker {worker_id}")
 
         while self.running:
             try:
-                async with aiohttp.ClientSession() as session:
-                    try:
-                        # health 和 sum 使用 GET，其他使用 POST
-                        if endpoint_name in ['health', 'sum']:
-                            async with session.get(url, timeout=30) as response:
-                                self.stats['total_requests'] += 1
-                                if response.status == 200:
-                                    self.stats['successful_requests'] += 1
-                                else:
-                                    self.stats['failed_requests'] += 1
-                        else:
-                            async with session.post(url, timeout=30) as response:
-                                self.stats['total_requests'] += 1
-                                if response.status == 200:
-                                    self.stats['successful_requests'] += 1
-                                else:
-                                    self.stats['failed_requests'] += 1
-                    except Exception:
-                        self.stats['failed_requests'] += 1
+                # 权重可以通过控制 socket 随时修改，每次循环重新读取
+                weight = self.endpoints[endpoint_name]['weight']
+                if self.load_mode != 'closed' or not self.local_generation() or weight <= 0:
+                    await asyncio.sleep(0.2)
+                    continue
+
+                await self.send_request(endpoint_name)
 
                 # 根据当前请求间隔和权重计算休眠时间
                 # 权重越大的接口，调用越频繁（休眠时间越短）
@@ -339,123 +2423,1025 @@ class LoadControllerService:
                     print(f"[Worker-{endpoint_name}-{worker_id}] 错误: {e}")
                 await asyncio.sleep(1)
 
+    async def dispatcher(self):
+        """
+        请求调度协程（open 模式）
+
+        按目标总速率（CPU PID 输出）生成到达时间（constant 为等间隔，poisson 为指数分布间隔），
+        按接口权重随机选择接口后立即发出请求，不等待之前的请求完成，因此服务变慢时发送速率不会随之下降。
+        在途请求达到 max_inflight 时丢弃该次到达；调度晚于计划时间超过 OPEN_LOOP_LATE_THRESHOLD 记为延迟。
+        """
+        loop = asyncio.get_running_loop()
+        names = list(self.endpoints.keys())
+        next_arrival = loop.time()
+        pending = set()
+
+        while self.running:
+            if self.load_mode != 'open' or not self.local_generation():
+                await asyncio.sleep(0.2)
+                next_arrival = loop.time()
+                continue
+
+            rate = max(self.get_request_rate(), 1e-3)
+            if self.arrival_process == 'poisson':
+                next_arrival += self.rng.expovariate(rate)
+            else:
+                next_arrival += 1.0 / rate
+
+            # 落后于计划时间时也要让出事件循环，否则连续创建任务会饿死控制循环和已发出的请求
+            await asyncio.sleep(max(next_arrival - loop.time(), 0))
+            lag = loop.time() - next_arrival
+            if lag > OPEN_LOOP_LATE_THRESHOLD:
+                self.stats['delayed_arrivals'] += 1
+                self.stats['max_dispatch_lag_ms'] = max(self.stats['max_dispatch_lag_ms'], lag * 1000)
+
+            if self.inflight >= self.max_inflight:
+                self.stats['dropped_arrivals'] += 1
+                continue
+
+            weights = [self.endpoints[name]['weight'] for name in names]
+            endpoint_name = self.rng.choices(names, weights=weights)[0]
+            self.spawn_request(pending, endpoint_name, next_arrival)
+
+        for task in pending:
+            task.cancel()
+
     async def load_config(self):
-        """从配置文件加载目标设置"""
+        """配置文件的修改时间变化时重新读取并应用"""
         try:
-            config_file = "/tmp/load_controller_config.json"
-            if os.path.exists(config_file):
-                import json
-                with open(config_file, 'r') as f:
-                    config = json.load(f)
-
-                    new_cpu = config.get('target_cpu', self.target_cpu)
-                    new_memory = config.get('target_memory', self.target_memory)
-                    new_disk = config.get('target_disk', self.target_disk)
-
-                    if new_cpu != self.target_cpu:
-                        self.target_cpu = new_cpu
-                        print(f"[配置] CPU 目标更新: {self.target_cpu}%")
-
-                    if new_memory != self.target_memory:
-                        self.target_memory = new_memory
-                        print(f"[配置] 内存目标更新: {self.target_memory}%")
-
-                    if new_disk != self.target_disk:
-                        self.target_disk = new_disk
-                        print(f"[配置] 磁盘目标更新: {self.target_disk}%")
+            if not os.path.exists(CONFIG_FILE_PATH):
+                return
+            mtime = os.stat(CONFIG_FILE_PATH).st_mtime_ns
+            if mtime == self.config_mtime:
+                return
+            with open(CONFIG_FILE_PATH, 'r') as f:
+                config = json.load(f)
+            self.config_mtime = mtime
+            await self.apply_config(config)
         except Exception as e:
             print(f"[配置] 加载配置失败: {e}")
 
-    async def save_status(self, current_cpu: float, current_memory: float, current_disk: float):
+    def apply_targets(self, config: Dict):
+        """应用各资源的目标值（未出现的字段保持不变）"""
+        new_cpu = config.get('target_cpu', self.target_cpu)
+        new_memory = config.get('target_memory', self.target_memory)
+        new_disk = config.get('target_disk', self.target_disk)
+
+        if new_cpu != self.target_cpu:
+            self.target_cpu = new_cpu
+            print(f"[配置] CPU 目标更新: {self.target_cpu}%")
+
+        if new_memory != self.target_memory:
+            self.target_memory = new_memory
+            print(f"[配置] 内存目标更新: {self.target_memory}%")
+
+        if new_disk != self.target_disk:
+            self.target_disk = new_disk
+            print(f"[配置] 磁盘目标更新: {self.target_disk}%")
+
+        new_rx = float(config.get('target_net_rx_mbps', self.target_net_rx_mbps))
+        new_tx = float(config.get('target_net_tx_mbps', self.target_net_tx_mbps))
+        if (new_rx, new_tx) != (self.target_net_rx_mbps, self.target_net_tx_mbps):
+            self.target_net_rx_mbps, self.target_net_tx_mbps = new_rx, new_tx
+            print(f"[配置] 网络带宽目标更新: 入向 {new_rx:g} Mbit/s / 出向 {new_tx:g} Mbit/s")
+
+        new_psi = tuple(max(0.0, min(100.0, float(config.get(f'target_{loop}', self.get_psi_target(loop)))))
+                        for loop in PSI_LOOPS)
+        if new_psi != tuple(self.get_psi_target(loop) for loop in PSI_LOOPS):
+            for loop, value in zip(PSI_LOOPS, new_psi):
+                setattr(self, f'target_{loop}', value)
+            print(f"[配置] PSI 目标更新: cpu {new_psi[0]:g}% / memory {new_psi[1]:g}% / io {new_psi[2]:g}%")
+
+        new_iops = float(config.get('target_disk_iops', self.target_disk_iops))
+        new_mbps = float(config.get('target_disk_mbps', self.target_disk_mbps))
+        if (new_iops, new_mbps) != (self.target_disk_iops, self.target_disk_mbps):
+            self.target_disk_iops, self.target_disk_mbps = new_iops, new_mbps
+            print(f"[配置] 磁盘 IO 目标更新: {new_iops:g} IOPS / {new_mbps:g} MB/s")
+
+    def config_error(self, message: str):
+        """打印并记录一条无效配置（其余字段照常应用）"""
+        print(message)
+        self.config_errors.append(message)
+
+    async def apply_config(self, config: Dict) -> List[str]:
+        """应用一组配置字段（来自配置文件或控制 socket 的 set 命令），返回无效配置项的错误信息"""
+        self.config_errors = []
+        self.apply_targets(config)
+        self.configure_profile(config)
+        self.configure_control(config)
+        self.configure_load_mode(config)
+        await self.configure_processes(config)
+        self.configure_ballast(config)
+        self.configure_disk_io(config)
+        await self.configure_network(config)
+        self.configure_journal(config)
+        self.configure_trace(config)
+
+        await self.configure_sampler(
+            config.get('sampler', self.sampler_name),
+            float(config.get('sample_window', self.sample_window)),
+            float(config.get('sample_interval', self.sample_interval))
+        )
+        return self.config_errors
+
+    def configure_profile(self, config: Dict):
+        """读取目标曲线；内容变化时从头开始，null 表示停止"""
+        if 'profile' not in config:
+            return
+        profile = config['profile']
+        current = self.profile.profile if self.profile is not None else None
+        if profile == current:
+            return
+        if not profile:
+            self.profile = None
+            self.profile_targets = {}
+            print("[曲线] 目标曲线已停止，目标保持当前值")
+            return
+        try:
+            self.profile = ProfileScheduler(profile, time.time())
+        except Exception as e:
+            self.config_error(f"[曲线] 目标曲线无效: {e}")
+            return
+        self.profile_targets = {}
+        starts_in = self.profile.start_time - time.time()
+        print(f"[曲线] 目标曲线已加载: {', '.join(self.profile.tracks)}，"
+              f"{max(0.0, starts_in):.1f}s 后开始，速度 x{self.profile.time_scale:g}")
+
+    def apply_profile(self):
+        """每个控制周期按目标曲线更新目标"""
+        if self.profile is None:
+            return
+        targets = self.profile.targets_at(time.time())
+        if targets is None:
+            return
+        for target, value in targets.items():
+            setattr(self, target, value)
+        if not self.profile_targets:
+            print(f"[曲线] 开始播放: {targets}")
+        self.profile_targets = targets
+
+    def get_profile_status(self) -> Optional[Dict]:
+        if self.profile is None:
+            return None
+        now = time.time()
+        play_time = self.profile.play_time(now)
+        if play_time is None:
+            state = 'waiting'
+        elif self.profile.finished(now):
+            state = 'finished'
+        else:
+            state = 'running'
+        return {
+            'state': state,
+            'tracks': list(self.profile.tracks),
+            'starts_in_seconds': round(max(0.0, self.profile.start_time - now), 1),
+            'play_time_seconds': round(play_time, 1) if play_time is not None else None,
+            'time_scale': self.profile.time_scale,
+            'duration': self.profile.duration,
+            'loop': self.profile.loop,
+            'targets': self.profile_targets
+        }
+
+    def set_endpoint_weights(self, weights: Dict[str, float]):
+        """修改接口权重，保持当前总请求速率不变"""
+        unknown = [name for name in weights if name not in self.endpoints]
+        if unknown:
+            raise ValueError(f"未知接口: {', '.join(unknown)}，可选: {', '.join(self.endpoints)}")
+        merged = {name: float(weights.get(name, endpoint['weight'])) for name, endpoint in self.endpoints.items()}
+        if any(weight < 0 for weight in merged.values()) or sum(merged.values()) <= 0:
+            raise ValueError("权重不能为负，且至少一个接口的权重大于 0")
+
+        # worker 的请求间隔由权重之和换算，修改权重后按原速率重新换算
+        rate = self.get_request_rate()
+        for name, weight in merged.items():
+            self.endpoints[name]['weight'] = weight
+        self.update_rate_limits()
+        self.set_request_rate(self.pids['cpu']._clamp(rate))
+        print(f"[控制] 接口权重更新: " + ", ".join(f"{name}={weight:g}" for name, weight in merged.items()))
+
+    async def handle_command(self, command: Dict) -> Dict:
+        """执行一条控制 socket 命令，返回结果"""
+        name = command.get('command')
+        if name == 'set':
+            config = {key: value for key, value in command.items() if key != 'command'}
+            errors = await self.apply_config(config)
+            self.control_event.set()
+            if errors:
+                return {'ok': False, 'command': name, 'error': '; '.join(errors), 'applied': sorted(config)}
+            return {'ok': True, 'command': name, 'applied': sorted(config)}
+        if name in ('pause', 'resume'):
+            paused = name == 'pause'
+            if paused != self.paused:
+                self.paused = paused
+                print(f"[控制] 请求 worker 已{'暂停' if paused else '恢复'}")
+            return {'ok': True, 'command': name, 'paused': self.paused}
+        if name == 'weights':
+            self.set_endpoint_weights(command.get('weights') or {})
+            if self.endpoint_mix != 'fixed':
+                self.endpoint_mix = 'fixed'
+                print("[控制] 手动设置权重，接口配比切换为 fixed")
+            return {'ok': True, 'command': name,
+                    'weights': {endpoint: e['weight'] for endpoint, e in self.endpoints.items()}}
+        if name == 'status':
+            return {'ok': True, 'command': name, 'status': self.get_status()}
+        return {'ok': False, 'error': f"未知命令: {name}，可选: {', '.join(CONTROL_COMMANDS)}"}
+
+    async def handle_control_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """控制 socket 连接：逐行读取 JSON 命令，逐行返回结果"""
+        try:
+            while self.running:
+                line = await reader.readline()
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                try:
+                    command = json.loads(line)
+                    if not isinstance(command, dict):
+                        raise ValueError("命令必须是 JSON 对象")
+                    reply = await self.handle_command(command)
+                except Exception as e:
+                    reply = {'ok': False, 'error': str(e)}
+                writer.write(json.dumps(reply, ensure_ascii=False).encode() + b"\n")
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def start_control_server(self):
+        """启动控制 socket（权限 666，沙箱内的 app.py 以其他用户运行时也可连接）"""
+        if os.path.exists(CONTROL_SOCKET_PATH):
+            os.remove(CONTROL_SOCKET_PATH)
+        self.control_server = await asyncio.start_unix_server(self.handle_control_connection, path=CONTROL_SOCKET_PATH)
+        os.chmod(CONTROL_SOCKET_PATH, 0o666)
+        print(f"[控制] 控制 socket 已启动: {CONTROL_SOCKET_PATH}")
+
+    async def stop_control_server(self):
+        if self.control_server is not None:
+            self.control_server.close()
+            await self.control_server.wait_closed()
+            self.control_server = None
+        if os.path.exists(CONTROL_SOCKET_PATH):
+            os.remove(CONTROL_SOCKET_PATH)
+
+    def configure_control(self, config: Dict):
+        """读取控制周期、PID 参数和自动整定请求"""
+        control_interval = float(config.get('control_interval', self.control_interval))
+        if control_interval > 0 and control_interval != self.control_interval:
+            self.control_interval = control_interval
+            print(f"[配置] 控制周期更新: {self.control_interval}s")
+
+        for resource, pid in self.pids.items():
+            gains = config.get(f'{resource}_pid')
+            if not gains:
+                continue
+            new_gains = (float(gains.get('kp', pid.kp)), float(gains.get('ki', pid.ki)), float(gains.get('kd', pid.kd)))
+            if new_gains != (pid.kp, pid.ki, pid.kd):
+                pid.set_gains(*new_gains)
+                print(f"[配置] {resource} PID 参数更新: kp={pid.kp}, ki={pid.ki}, kd={pid.kd}")
+
+        psi_kind = config.get('psi_kind', self.psi_kind)
+        if psi_kind != self.psi_kind:
+            if psi_kind in PSI_KINDS:
+                self.psi_kind = psi_kind
+                print(f"[配置] PSI 类型切换为: {psi_kind}")
+            else:
+                self.config_error(f"[配置] 未知 PSI 类型: {psi_kind}，可选: {', '.join(PSI_KINDS)}")
+
+        # autotune 字段为资源名，配合 autotune_id 区分不同的整定请求
+        request = (config.get('autotune'), config.get('autotune_id'))
+        if request[0] and request != self.autotune_request:
+            self.autotune_request = request
+            if request[0] not in self.pids:
+                self.config_error(f"[配置] 未知整定资源: {request[0]}，可选: {', '.join(self.pids)}")
+            elif self.autotuning:
+                print(f"[配置] 正在整定 {self.autotuning}，忽略新的整定请求")
+            else:
+                step = config.get('autotune_step')
+                asyncio.create_task(self.autotune(request[0], float(step) if step is not None else None))
+
+    def configure_load_mode(self, config: Dict):
+        """读取负载生成模式、到达过程、接口配比和在途上限"""
+        load_mode = config.get('load_mode', self.load_mode)
+        if load_mode != self.load_mode:
+            if load_mode in LOAD_MODES:
+                self.load_mode = load_mode
+                print(f"[配置] 负载模式切换为: {load_mode}")
+            else:
+                self.config_error(f"[配置] 未知负载模式: {load_mode}，可选: {', '.join(LOAD_MODES)}")
+
+        arrival_process = config.get('arrival_process', self.arrival_process)
+        if arrival_process != self.arrival_process:
+            if arrival_process in ARRIVAL_PROCESSES:
+                self.arrival_process = arrival_process
+                print(f"[配置] 到达过程切换为: {arrival_process}")
+            else:
+                self.config_error(f"[配置] 未知到达过程: {arrival_process}，可选: {', '.join(ARRIVAL_PROCESSES)}")
+
+        endpoint_mix = config.get('endpoint_mix', self.endpoint_mix)
+        if endpoint_mix != self.endpoint_mix:
+            if endpoint_mix in ENDPOINT_MIX_MODES:
+                self.endpoint_mix = endpoint_mix
+                print(f"[配置] 接口配比切换为: {endpoint_mix}")
+            else:
+                self.config_error(f"[配置] 未知接口配比: {endpoint_mix}，可选: {', '.join(ENDPOINT_MIX_MODES)}")
+
+        cost_mix_floor = float(config.get('cost_mix_floor', self.cost_mix_floor))
+        if 0 <= cost_mix_floor and cost_mix_floor != self.cost_mix_floor:
+            self.cost_mix_floor = cost_mix_floor
+            print(f"[配置] 成本配比最低份额更新: {cost_mix_floor}")
+
+        max_inflight = int(config.get('max_inflight', self.max_inflight))
+        if max_inflight > 0 and max_inflight != self.max_inflight:
+            self.max_inflight = max_inflight
+            print(f"[配置] 在途请求上限更新: {max_inflight}（连接池大小在重启后生效）")
+
+    async def configure_processes(self, config: Dict):
+        """读取请求生成子进程数和控制器 CPU 绑定"""
+        if 'controller_cpu' in config:
+            cpu = config['controller_cpu']
+            cpu = None if cpu is None else int(cpu)
+            if cpu is not None and cpu not in self.initial_affinity:
+                print(f"[配置] 控制器 CPU {cpu} 不可用，可选: {self.initial_affinity}")
+            elif cpu != self.controller_cpu:
+                self.controller_cpu = cpu
+                self.apply_affinity()
+
+        processes = int(config.get('processes', self.processes))
+        if processes >= 0 and processes != self.processes:
+            self.processes = processes
+            print(f"[配置] 请求生成子进程数更新: {processes}" if processes else
+                  "[配置] 请求改为在控制器进程内生成")
+            # 减少时停止多余的子进程，增加时由 sync_generators 补齐
+            if len(self.generators) > processes:
+                await self.stop_generators(self.generators[processes:])
+
+    def generator_cpus(self) -> List[int]:
+        """子进程可用的 CPU：启动时的 CPU 集合去掉控制器独占的 CPU，不足时与控制器共用"""
+        cpus = [cpu for cpu in self.initial_affinity if cpu != self.controller_cpu]
+        return cpus or list(self.initial_affinity)
+
+    def apply_affinity(self):
+        """
+        把控制器进程的所有线程绑定到 controller_cpu（None 时恢复启动时的 CPU 集合），子进程绑定到其余 CPU
+
+        sched_setaffinity(0) 只作用于调用线程，已存在的线程（IO 生成器、to_thread 线程池）需要逐个设置。
+        """
+        cpus = {self.controller_cpu} if self.controller_cpu is not None else set(self.initial_affinity)
+        try:
+            for tid in os.listdir('/proc/self/task'):
+                try:
+                    os.sched_setaffinity(int(tid), cpus)
+                except ProcessLookupError:
+                    pass
+            for generator in self.generators:
+                os.sched_setaffinity(generator['process'].pid, self.generator_cpus())
+        except OSError as e:
+            self.config_error(f"[配置] 设置 CPU 绑定失败: {e}")
+            return
+        if self.controller_cpu is not None:
+            print(f"[配置] 控制器绑定到 CPU {self.controller_cpu}，子进程使用 CPU {self.generator_cpus()}")
+        else:
+            print(f"[配置] 取消控制器 CPU 绑定（CPU {self.initial_affinity}）")
+
+    def get_generator_settings(self) -> Dict:
+        """下发给子进程的设置：总速率按子进程数均分，在途上限同样均分"""
+        count = max(len(self.generators), 1)
+        return {
+            'rate': self.get_request_rate() / count,
+            'load_mode': self.load_mode,
+            'arrival_process': self.arrival_process,
+            'max_inflight': max(1, math.ceil(self.max_inflight / count)),
+            'paused': self.paused or self.replay is not None,
+            'seed': self.seed,
+            'trace': self.trace_recorder is not None,
+            'weights': {name: endpoint['weight'] for name, endpoint in self.endpoints.items()}
+        }
+
+    def apply_generator_settings(self, settings: Dict):
+        """子进程应用控制器下发的设置"""
+        for name, weight in settings['weights'].items():
+            self.endpoints[name]['weight'] = weight
+        self.load_mode = settings['load_mode']
+        self.arrival_process = settings['arrival_process']
+        self.max_inflight = settings['max_inflight']
+        self.paused = settings['paused']
+        self.trace_buffer = ([] if self.trace_buffer is None else self.trace_buffer) if settings['trace'] else None
+        if settings['seed'] != self.seed:
+            self.seed = settings['seed']
+            self.rng.seed(None if self.seed is None else self.seed + self.generator_index + 1)
+        # 权重之和参与速率换算，先更新权重再设置速率
+        self.set_request_rate(settings['rate'])
+
+    def start_generator(self, index: int):
+        """启动一个请求生成子进程（spawn 方式，不继承控制器的 ballast 映射和线程）"""
+        context = multiprocessing.get_context('spawn')
+        parent_conn, child_conn = context.Pipe()
+        process = context.Process(
+            target=generator_process_main,
+            args=(index, child_conn, self.base_url, self.get_generator_settings()),
+            name=f'load-generator-{index}',
+            daemon=True
+        )
+        process.start()
+        child_conn.close()
+        generator = {'index': index, 'process': process, 'conn': parent_conn, 'report': None}
+        self.generators.append(generator)
+        try:
+            os.sched_setaffinity(process.pid, self.generator_cpus())
+        except OSError:
+            pass
+        asyncio.get_running_loop().add_reader(parent_conn.fileno(), self.receive_generator_report, generator)
+        print(f"[进程] 启动请求生成子进程 {index}（pid {process.pid}）")
+
+    def receive_generator_report(self, generator: Dict):
+        """读取子进程的累计回报；管道关闭时停止监听，由 sync_generators 回收"""
+        try:
+            report = generator['conn'].recv()
+            self.write_generator_trace(report.pop('trace', []))
+            generator['report'] = report
+        except (EOFError, OSError):
+            asyncio.get_running_loop().remove_reader(generator['conn'].fileno())
+            generator['closed'] = True
+
+    def fold_generator_report(self, report: Optional[Dict]):
+        """把已退出子进程的最终计数和直方图并入控制器自身的统计，保证总数单调"""
+        if not report:
+            return
+        for key in GENERATOR_COUNTERS:
+            if key == 'max_dispatch_lag_ms':
+                self.stats[key] = max(self.stats[key], report['stats'][key])
+            else:
+                self.stats[key] += report['stats'][key]
+        for name, state in report['histograms'].items():
+            self.latency_histograms[name].merge_state(state)
+        for name, errors in report['endpoint_errors'].items():
+            self.endpoint_errors[name] += errors
+        self.endpoint_costs = combine_endpoint_costs([self.endpoint_costs, report['costs']])
+
+    @staticmethod
+    def _stop_generator_process(generator: Dict):
+        """通知子进程退出并等待最终回报（阻塞，在线程中执行）"""
+        conn, process = generator['conn'], generator['process']
+        try:
+            conn.send(None)
+            while conn.poll(GENERATOR_STOP_TIMEOUT):
+                report = conn.recv()
+                generator.setdefault('trace', []).extend(report.pop('trace', []))
+                generator['report'] = report
+                if report.get('final'):
+                    break
+        except (EOFError, OSError):
+            pass
+        process.join(GENERATOR_STOP_TIMEOUT)
+        if process.is_alive():
+            process.terminate()
+            process.join()
+        conn.close()
+
+    async def stop_generators(self, generators: List[Dict]):
+        """停止指定的子进程并汇总它们的最终统计"""
+        loop = asyncio.get_running_loop()
+        generators = list(generators)
+        for generator in generators:
+            if not generator.get('closed'):
+                loop.remove_reader(generator['conn'].fileno())
+        await asyncio.gather(*[asyncio.to_thread(self._stop_generator_process, generator)
+                               for generator in generators])
+        for generator in generators:
+            self.generators.remove(generator)
+            self.write_generator_trace(generator.get('trace', []))
+            self.fold_generator_report(generator['report'])
+            print(f"[进程] 请求生成子进程 {generator['index']} 已停止")
+
+    async def sync_generators(self):
+        """每个控制周期：回收意外退出的子进程，补齐到 processes 个，并下发最新的速率份额和设置"""
+        exited = [generator for generator in self.generators if not generator['process'].is_alive()]
+        for generator in exited:
+            print(f"[进程] 请求生成子进程 {generator['index']} 意外退出（退出码 {generator['process'].exitcode}），重新启动")
+        if exited:
+            await self.stop_generators(exited)
+
+        used = {generator['index'] for generator in self.generators}
+        free = (index for index in range(self.processes) if index not in used)
+        while len(self.generators) < self.processes:
+            self.start_generator(next(free))
+        self.generators.sort(key=lambda generator: generator['index'])
+
+        settings = self.get_generator_settings()
+        for generator in self.generators:
+            try:
+                generator['conn'].send(settings)
+            except OSError:
+                pass
+
+    def merged_stats(self) -> Dict:
+        """控制器自身与各子进程最新回报合计的计数"""
+        stats = dict(self.stats)
+        for generator in self.generators:
+            if generator['report']:
+                for key in GENERATOR_COUNTERS:
+                    if key == 'max_dispatch_lag_ms':
+                        stats[key] = max(stats[key], generator['report']['stats'][key])
+                    else:
+                        stats[key] += generator['report']['stats'][key]
+        return stats
+
+    def merged_latency(self) -> Dict[str, Dict]:
+        """各接口合并后的延迟分布和失败次数"""
+        latency = {}
+        for name, histogram in self.latency_histograms.items():
+            merged = LatencyHistogram()
+            merged.merge(histogram)
+            errors = self.endpoint_errors[name]
+            for generator in self.generators:
+                if generator['report']:
+                    merged.merge_state(generator['report']['histograms'][name])
+                    errors += generator['report']['endpoint_errors'][name]
+            latency[name] = {**merged.to_dict(), 'errors': errors}
+        return latency
+
+    def get_generator_report(self, final: bool = False) -> Dict:
+        """子进程的累计回报"""
+        return {
+            'index': self.generator_index,
+            'pid': os.getpid(),
+            'final': final,
+            'inflight': self.inflight,
+            'stats': {key: self.stats[key] for key in GENERATOR_COUNTERS},
+            'endpoint_errors': dict(self.endpoint_errors),
+            'costs': self.endpoint_costs,
+            'trace': self.take_trace_buffer(),
+            'histograms': {name: histogram.get_state() for name, histogram in self.latency_histograms.items()}
+        }
+
+    def take_trace_buffer(self) -> List[tuple]:
+        """取出子进程暂存的请求记录"""
+        if not self.trace_buffer:
+            return []
+        records, self.trace_buffer = self.trace_buffer, []
+        return records
+
+    def write_generator_trace(self, records: List[tuple]):
+        """把子进程回报中的请求记录写入记录文件"""
+        if self.trace_recorder is not None:
+            for intended_time, endpoint_name, params in records:
+                self.trace_recorder.record(intended_time, endpoint_name, params)
+
+    async def run_generator(self, index: int, conn, settings: Dict):
+        """
+        子进程入口：只运行 worker 和 open 模式调度器，不采样、不控制
+
+        按 GENERATOR_REPORT_INTERVAL 回报累计统计；收到 None 或管道关闭时停止并发送最终回报。
+        """
+        self.generator_index = index
+        self.apply_generator_settings(settings)
+        self.stats['start_time'] = datetime.now()
+        loop = asyncio.get_running_loop()
+        stop = asyncio.Event()
+
+        def on_message():
+            try:
+                message = conn.recv()
+            except (EOFError, OSError):
+                message = None
+            if message is None:
+                loop.remove_reader(conn.fileno())
+                stop.set()
+            else:
+                self.apply_generator_settings(message)
+
+        loop.add_reader(conn.fileno(), on_message)
+        self.session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=self.max_inflight, keepalive_timeout=30),
+            timeout=aiohttp.ClientTimeout(total=30)
+        )
+        for endpoint_name in self.endpoints.keys():
+            for worker_id in range(self.workers_per_endpoint):
+                self.worker_tasks.append(asyncio.create_task(self.worker(endpoint_name, worker_id)))
+        dispatcher_task = asyncio.create_task(self.dispatcher())
+
+        while not stop.is_set():
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=GENERATOR_REPORT_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            if not stop.is_set():
+                try:
+                    conn.send(self.get_generator_report())
+                except OSError:
+                    break
+
+        self.running = False
+        for task in self.worker_tasks:
+            task.cancel()
+        dispatcher_task.cancel()
+        await asyncio.gather(*self.worker_tasks, dispatcher_task, return_exceptions=True)
+        await self.session.close()
+        try:
+            conn.send(self.get_generator_report(final=True))
+        except OSError:
+            pass
+        conn.close()
+
+    def configure_ballast(self, config: Dict):
+        """读取内存和磁盘 ballast 的设置"""
+        memory_step_bytes = int(float(config.get('memory_step_mb', self.memory_step_bytes / 1024 / 1024)) * 1024 * 1024)
+        if memory_step_bytes > 0 and memory_step_bytes != self.memory_step_bytes:
+            self.memory_step_bytes = memory_step_bytes
+            print(f"[配置] 内存调整步长更新: {memory_step_bytes / 1024 / 1024:.0f}MB/周期")
+
+        huge_pages = bool(config.get('memory_huge_pages', self.memory_ballast.huge_pages))
+        if huge_pages != self.memory_ballast.huge_pages:
+            self.memory_ballast.huge_pages = huge_pages
+            print(f"[配置] 内存 ballast 透明大页: {'开启' if huge_pages else '关闭'}（对新分配的映射生效）")
+
+        disk_mode = config.get('disk_ballast_mode', self.disk_ballast.mode)
+        if disk_mode not in DISK_BALLAST_MODES:
+            self.config_error(f"[配置] 未知的磁盘 ballast 方式: {disk_mode}，可选: {', '.join(DISK_BALLAST_MODES)}")
+        elif disk_mode != self.disk_ballast.mode:
+            self.disk_ballast.mode = disk_mode
+            print(f"[配置] 磁盘 ballast 方式更新: {disk_mode}")
+
+        disk_write_mbps = float(config.get('disk_write_mbps', self.disk_ballast.write_mbps))
+        if disk_write_mbps >= 0 and disk_write_mbps != self.disk_ballast.write_mbps:
+            self.disk_ballast.write_mbps = disk_write_mbps
+            print(f"[配置] 磁盘写入限速更新: {disk_write_mbps:g}MB/s" if disk_write_mbps else
+                  "[配置] 磁盘写入不限速")
+
+    def configure_disk_io(self, config: Dict):
+        """读取 IO 生成器的块大小、读写比例、线程数和测试文件大小"""
+        block_kb = int(config.get('disk_io_block_kb', self.disk_io.block_size // 1024))
+        block_size = max(DISK_ALIGNMENT, (block_kb * 1024 + DISK_ALIGNMENT - 1) // DISK_ALIGNMENT * DISK_ALIGNMENT)
+        if block_size != self.disk_io.block_size:
+            self.disk_io.block_size = block_size
+            print(f"[配置] 磁盘 IO 块大小更新: {block_size // 1024}KB")
+
+        read_ratio = max(0.0, min(1.0, float(config.get('disk_io_read_ratio', self.disk_io.read_ratio))))
+        if read_ratio != self.disk_io.read_ratio:
+            self.disk_io.read_ratio = read_ratio
+            print(f"[配置] 磁盘 IO 读比例更新: {read_ratio}")
+
+        threads = int(config.get('disk_io_threads', self.disk_io.threads))
+        file_size = int(float(config.get('disk_io_file_mb', self.disk_io.file_size / 1024 / 1024)) * 1024 * 1024)
+        if threads > 0 and threads != self.disk_io.threads:
+            self.disk_io.threads = threads
+            print(f"[配置] 磁盘 IO 线程数更新: {threads}（生成器下次启动时生效）")
+        if file_size >= DISK_WRITE_CHUNK and file_size != self.disk_io.file_size:
+            self.disk_io.file_size = file_size
+            print(f"[配置] 磁盘 IO 测试文件更新: {file_size // 1024 // 1024}MB（生成器下次启动时生效）")
+
+    async def configure_network(self, config: Dict):
+        """读取流量对端、并发流数和测量网卡"""
+        endpoint = config.get('net_endpoint', self.net_streamers['net_rx'].endpoint) or None
+        streams = int(config.get('net_streams', self.net_streamers['net_rx'].streams))
+        for streamer in self.net_streamers.values():
+            if (endpoint, streams) != (streamer.endpoint, streamer.streams) and streams > 0:
+                # 对端或流数变化时停止，下个控制周期按新设置启动
+                if streamer.running:
+                    await streamer.stop()
+                streamer.endpoint, streamer.streams = endpoint, streams
+                print(f"[配置] 网络 {streamer.direction} 对端更新: {endpoint}，{streams} 个流")
+
+        self.net_interface = config.get('net_interface', self.net_interface) or None
+        self.apply_net_interface()
+
+    def apply_net_interface(self):
+        """把测量网卡同步到采样器：显式配置优先，对端为回环地址时用 lo，否则用默认路由网卡"""
+        interface = self.net_interface
+        if interface is None:
+            host = urlparse(self.net_streamers['net_rx'].endpoint or '').hostname or ''
+            interface = 'lo' if host == 'localhost' or host.startswith('127.') else find_net_interface()
+        if interface != self.sampler.net_interface:
+            self.sampler.net_interface = interface
+            self.sampler.history.clear()
+            print(f"[配置] 带宽测量网卡: {interface}")
+
+    async def configure_sampler(self, name: str, window: float, interval: float):
+        """切换采样后端或调整采样窗口 / 间隔"""
+        if name not in SAMPLERS:
+            self.config_error(f"[配置] 未知采样后端: {name}，可选: {', '.join(SAMPLERS)}")
+            return
+        if interval != self.sample_interval and interval > 0:
+            self.sample_interval = interval
+            print(f"[配置] 采样间隔更新: {self.sample_interval}s")
+        if window != self.sample_window and window > 0:
+            self.sample_window = window
+            self.sampler.window = window
+            print(f"[配置] 采样窗口更新: {self.sample_window}s")
+        if name != self.sampler_name:
+            old_sampler = self.sampler
+            self.sampler = SAMPLERS[name](self.sample_window)
+            self.sampler_name = name
+            self.apply_net_interface()
+            await old_sampler.close()
+            await self.sampler.sample()
+            print(f"[配置] 采样后端切换为: {name}")
+
+    async def sampling_loop(self):
+        """按 sample_interval 持续采样系统指标"""
+        while self.running:
+            await self.sampler.sample()
+            await asyncio.sleep(self.sample_interval)
+
+    def merged_histogram(self) -> LatencyHistogram:
+        """所有接口（含子进程）合并的延迟直方图"""
+        merged = LatencyHistogram()
+        for name, histogram in self.latency_histograms.items():
+            merged.merge(histogram)
+            for generator in self.generators:
+                if generator['report']:
+                    merged.merge_state(generator['report']['histograms'][name])
+        return merged
+
+    def get_journal_values(self) -> List[float]:
+        """一条日志记录的字段值（顺序同 JOURNAL_FIELDS），速率和延迟为距上一条记录的区间值"""
+        now = time.monotonic()
+        stats = self.merged_stats()
+        histogram = self.merged_histogram()
+        achieved_rate = error_rate = 0.0
+        latency = histogram.delta(None)
+        if self.journal_last is not None:
+            last_time, last_stats, last_histogram = self.journal_last
+            elapsed = max(now - last_time, 1e-6)
+            achieved_rate = (stats['total_requests'] - last_stats['total_requests']) / elapsed
+            error_rate = (stats['failed_requests'] - last_stats['failed_requests']) / elapsed
+            latency = histogram.delta(last_histogram)
+        self.journal_last = (now, stats, histogram)
+
+        snapshot = self.sampler.snapshot
+        inflight = self.inflight + sum(generator['report']['inflight']
+                                       for generator in self.generators if generator['report'])
+        return [
+            self.target_cpu, self.get_current_cpu(), self.target_memory, self.get_current_memory(),
+            self.target_disk, self.get_current_disk(), self.get_disk_io_setpoint(), self.get_current_disk_io(),
+            self.target_net_rx_mbps, snapshot['net_rx_mbps'], self.target_net_tx_mbps, snapshot['net_tx_mbps'],
+            self.target_psi_cpu, self.get_current_psi('cpu'), self.target_psi_memory, self.get_current_psi('memory'),
+            self.target_psi_io, self.get_current_psi('io'),
+            self.get_request_rate(), achieved_rate, error_rate, inflight,
+            latency.percentile(50), latency.percentile(90), latency.percentile(99), latency.percentile(100)
+        ]
+
+    async def journal_loop(self):
+        """按 journal_interval 追加采样日志记录"""
+        while self.running:
+            if self.journal_enabled:
+                try:
+                    self.journal.open()
+                    self.journal.append(time.time(), self.get_journal_values())
+                except Exception as e:
+                    print(f"[日志] 写入采样日志失败: {e}")
+            await asyncio.sleep(self.journal_interval)
+
+    def configure_trace(self, config: Dict):
+        """读取随机种子、请求记录和重放设置"""
+        if 'seed' in config:
+            seed = None if config['seed'] is None else int(config['seed'])
+            if seed != self.seed:
+                self.seed = seed
+                self.rng.seed(seed)
+                print(f"[配置] 随机种子: {seed}" if seed is not None else "[配置] 取消固定随机种子")
+
+        if 'trace_record' in config:
+            path = config['trace_record'] or None
+            current = self.trace_recorder.path if self.trace_recorder is not None else None
+            if path != current:
+                self.stop_trace_record()
+                if path:
+                    try:
+                        self.trace_recorder = TraceRecorder(
+                            path, list(self.endpoints), time.monotonic(),
+                            {'seed': self.seed, 'load_mode': self.load_mode, 'arrival_process': self.arrival_process}
+                        )
+                        print(f"[记录] 开始记录请求: {path}")
+                    except OSError as e:
+                        self.config_error(f"[记录] 无法创建记录文件: {e}")
+
+        if 'replay' in config and config['replay'] != self.replay_config:
+            self.replay_config = config['replay']
+            self.stop_replay()
+            if self.replay_config:
+                try:
+                    self.start_replay(self.replay_config)
+                except (OSError, ValueError, KeyError) as e:
+                    self.config_error(f"[重放] 无法加载记录文件: {e}")
+
+    def stop_trace_record(self):
+        if self.trace_recorder is not None:
+            self.trace_recorder.close()
+            print(f"[记录] 停止记录: {self.trace_recorder.path}（{self.trace_recorder.records} 个请求）")
+            self.trace_recorder = None
+
+    def start_replay(self, replay: Dict):
+        """加载记录文件并从头开始重放（由 replay_loop 按计划时间发送）"""
+        path = replay['path']
+        header, records = read_trace(path)
+        unknown = sorted({endpoint for _, endpoint, _ in records if endpoint not in self.endpoints})
+        if unknown:
+            print(f"[重放] 忽略未知接口的请求: {', '.join(unknown)}")
+            records = [record for record in records if record[1] in self.endpoints]
+        time_scale = float(replay.get('time_scale', 1.0))
+        if time_scale <= 0:
+            raise ValueError("time_scale 必须大于 0")
+        self.replay = {
+            'path': path,
+            'header': header,
+            'records': records,
+            'time_scale': time_scale,
+            'loop': bool(replay.get('loop', False)),
+            'position': 0,
+            'iteration': 0,
+            'sent': 0,
+            'dropped': 0,
+            'start': None
+        }
+        duration = records[-1][0] if records else 0.0
+        print(f"[重放] 加载 {path}: {len(records)} 个请求，时长 {duration:.1f}s，速度 x{time_scale:g}"
+              f"{'，循环' if self.replay['loop'] else ''}")
+
+    def stop_replay(self):
+        if self.replay is not None:
+            print(f"[重放] 停止重放: 已发送 {self.replay['sent']} 个请求")
+            self.replay = None
+
+    async def replay_loop(self):
+        """
+        按记录的计划时间重放请求（open 模式，不等待响应）
+
+        计划时间 = 开始时间 + 记录时间 / time_scale；延迟从计划时间开始计算，与 open 模式调度器一致。
+        """
+        loop = asyncio.get_running_loop()
+        pending = set()
+        while self.running:
+            replay = self.replay
+            if replay is None or self.paused or not replay['records']:
+                await asyncio.sleep(0.2)
+                continue
+            if replay['start'] is None:
+                replay['start'] = loop.time()
+
+            offset, endpoint_name, params = replay['records'][replay['position']]
+            intended = replay['start'] + offset / replay['time_scale']
+            # 落后于计划时间时也要让出事件循环，否则连续创建任务会饿死 PID、采样等任务
+            await asyncio.sleep(max(intended - loop.time(), 0))
+            if self.replay is not replay:
+                continue
+
+            if self.inflight >= self.max_inflight:
+                replay['dropped'] += 1
+                self.stats['dropped_arrivals'] += 1
+            else:
+                self.spawn_request(pending, endpoint_name, intended, params)
+                replay['sent'] += 1
+
+            replay['position'] += 1
+            if replay['position'] >= len(replay['records']):
+                replay['iteration'] += 1
+                if not replay['loop']:
+                    print(f"[重放] 重放完成: 发送 {replay['sent']} 个请求，丢弃 {replay['dropped']} 个")
+                    self.replay = None
+                    continue
+                # 下一轮在最后一个请求的计划时间之后开始
+                replay['position'] = 0
+                replay['start'] = intended
+
+        for task in pending:
+            task.cancel()
+
+    def get_replay_status(self) -> Optional[Dict]:
+        if self.replay is None:
+            return None
+        replay = self.replay
+        return {
+            'path': replay['path'],
+            'requests': len(replay['records']),
+            'position': replay['position'],
+            'iteration': replay['iteration'],
+            'sent': replay['sent'],
+            'dropped': replay['dropped'],
+            'time_scale': replay['time_scale'],
+            'loop': replay['loop'],
+            'recorded_seed': replay['header'].get('seed')
+        }
+
+    def configure_journal(self, config: Dict):
+        """读取采样日志的开关、间隔和容量"""
+        enabled = bool(config.get('journal', self.journal_enabled))
+        if enabled != self.journal_enabled:
+            self.journal_enabled = enabled
+            print(f"[配置] 采样日志: {'开启' if enabled else '关闭'}")
+
+        interval = max(0.1, float(config.get('journal_interval', self.journal_interval)))
+        if interval != self.journal_interval:
+            self.journal_interval = interval
+            print(f"[配置] 采样日志间隔更新: {interval}s")
+
+        capacity = int(config.get('journal_capacity', self.journal.capacity))
+        if capacity > 0 and capacity != self.journal.capacity:
+            # 容量变化后文件头不再匹配，下次写入时重新创建文件
+            self.journal.close()
+            self.journal.capacity = capacity
+            print(f"[配置] 采样日志容量更新: {capacity} 条（{self.journal.file_size / 1024 / 1024:.1f}MB）")
+
+    async def save_status(self):
         """保存当前状态到文件"""
         try:
-            status_file = "/tmp/load_controller_status.json"
-            import json
             status = self.get_status()
-            status['current_cpu'] = round(current_cpu, 1)
-            status['current_memory'] = round(current_memory, 1)
-            status['current_disk'] = round(current_disk, 1)
             status['timestamp'] = datetime.now().isoformat()
 
-            with open(status_file, 'w') as f:
+            with open(STATUS_FILE_PATH, 'w') as f:
                 json.dump(status, f, indent=2)
         except Exception as e:
             print(f"[状态] 保存状态失败: {e}")
 
     async def adjust_concurrency(self):
-        """定期调整并发数以达到目标 CPU、内存和磁盘使用率"""
+        """每个控制周期用 PID 控制器调整请求速率、内存和磁盘 ballast"""
+        last_cycle = time.monotonic()
+        last_report = 0.0
         while self.running:
             try:
                 # 加载配置（检查是否有新的目标设置）
                 await self.load_config()
+                self.apply_profile()
 
-                # 获取当前使用率
-                current_cpu = await self.get_current_cpu()
-                current_memory = await self.get_current_memory()
-                current_disk = await self.get_current_disk()
+                # 读取采样循环维护的快照
+                current_cpu = self.get_current_cpu()
+                current_memory = self.get_current_memory()
+                current_disk = self.get_current_disk()
 
                 # 保存状态
-                await self.save_status(current_cpu, current_memory, current_disk)
-
-                # === CPU 控制 ===
-                error = self.target_cpu - current_cpu
-
-                # P 控制器 - 调整请求间隔而不是并发数
-                # 目标 CPU 越高，间隔越短（请求越频繁）
-
-                # 将目标 CPU 映射到请求间隔
-                if self.target_cpu == 0:
-                    target_interval = 10.0  # 几乎不发请求
-                elif self.target_cpu <= 50:
-                    # 0-50%: 线性映射到 10.0-1.0s
-                    target_interval = 10.0 - (self.target_cpu / 50.0) * 9.0
-                elif self.target_cpu <= 75:
-                    # 50-75%: 线性映射到 1.0-0.5s
-                    target_interval = 1.0 - ((self.target_cpu - 50) / 25.0) * 0.5
-                elif self.target_cpu <= 85:
-                    # 75-85%: 线性映射到 0.5-0.3s
-                    target_interval = 0.5 - ((self.target_cpu - 75) / 10.0) * 0.2
-                elif self.target_cpu <= 95:
-                    # 85-95%: 线性映射到 0.3-0.1s
-                    target_interval = 0.3 - ((self.target_cpu - 85) / 10.0) * 0.2
-                else:
-                    # 95-100%: 线性映射到 0.1-0.05s
-                    target_interval = 0.1 - ((self.target_cpu - 95) / 5.0) * 0.05
-
-                # 根据当前 CPU 使用率微调
-                if abs(error) > 10:
-                    # 偏差较大，快速调整
-                    adjustment_factor = 1.0 - (error / 100.0) * 0.5
-                    new_interval = self.current_request_interval * adjustment_factor
-                else:
-                    # 偏差较小，缓慢调整
-                    new_interval = target_interval
-
-                # 限制间隔范围
-                new_interval = max(0.05, min(10.0, new_interval))
-
-                if abs(new_interval - self.current_request_interval) > 0.01:
-                    print(f"[CPU控制] 调整请求间隔: {self.current_request_interval:.3f}s -> {new_interval:.3f}s "
-                          f"(当前: {current_cpu:.1f}%, 目标: {self.target_cpu:.1f}%)")
-                    self.current_request_interval = new_interval
-
-                # === 内存控制 ===
+                await self.save_status()
+
+                now = time.monotonic()
+                dt = now - last_cycle
+                last_cycle = now
+
+                # === PID 控制（正在自动整定的资源由整定任务直接驱动）===
+                self.sync_psi_loops()
+                targets = {'cpu': self.target_cpu, 'memory': self.target_memory, 'disk': self.target_disk,
+                           'disk_io': self.get_disk_io_setpoint(),
+                           'net_rx': self.target_net_rx_mbps, 'net_tx': self.target_net_tx_mbps,
+                           **{loop: self.get_psi_target(loop) for loop in PSI_LOOPS}}
+                for resource, pid in self.pids.items():
+                    if resource == self.autotuning or not self.is_control_active(resource):
+                        continue
+                    output = pid.update(targets[resource], self.get_resource_value(resource), dt,
+                                        self.get_reachable_output(resource))
+                    self.apply_control_output(resource, output)
+
+                # cost 模式下按学习到的成本更新接口配比
+                self.adjust_endpoint_mix()
+
+                # 把新的速率份额下发给请求生成子进程
+                if self.processes or self.generators:
+                    await self.sync_generators()
+
+                # === 内存、磁盘 ballast 跟随目标，IO 生成器按目标启停 ===
                 await self.adjust_memory()
-
-                # === 磁盘控制 ===
                 await self.adjust_disk()
-
-                # 每个调整周期打印状态
-                uptime = (datetime.now() - self.stats['start_time']).total_seconds() if self.stats['start_time'] else 0
-                print(f"[状态] 运行: {int(uptime)}s | CPU: {current_cpu:.1f}%/{self.target_cpu:.1f}% | "
-                      f"内存: {current_memory:.1f}%/{self.target_memory:.1f}% | "
-                      f"磁盘: {current_disk:.1f}%/{self.target_disk:.1f}% | "
-                      f"请求: {self.stats['total_requests']}")
+                await self.adjust_disk_io()
+                await self.adjust_network()
+
+                # 每 5 秒打印一次状态
+                if now - last_report >= 5:
+                    last_report = now
+                    uptime = (datetime.now() - self.stats['start_time']).total_seconds() if self.stats['start_time'] else 0
+                    stats = self.merged_stats()
+                    print(f"[状态] 运行: {int(uptime)}s | CPU: {current_cpu:.1f}%/{self.target_cpu:.1f}% | "
+                          f"内存: {current_memory:.1f}%/{self.target_memory:.1f}% | "
+                          f"磁盘: {current_disk:.1f}%/{self.target_disk:.1f}% | "
+                          f"速率: {self.get_request_rate():.1f} req/s | "
+                          f"请求: {stats['total_requests']}" +
+                          (f"（{len(self.generators)} 个子进程）" if self.generators else ""))
+                    if self.disk_io.running:
+                        snapshot = self.sampler.snapshot
+                        print(f"[磁盘IO] 读 {snapshot['disk_read_iops']:.0f} IOPS / {snapshot['disk_read_mbps']:.1f} MB/s | "
+                              f"写 {snapshot['disk_write_iops']:.0f} IOPS / {snapshot['disk_write_mbps']:.1f} MB/s | "
+                              f"目标 {self.target_disk_iops:g} IOPS / {self.target_disk_mbps:g} MB/s | "
+                              f"生成器 {self.disk_io.rate:.0f} 次/s")
+                    if self.psi_active:
+                        print(f"[PSI] {self.psi_kind} 停顿: " + " | ".join(
+                            f"{resource} {self.get_current_psi(resource):.1f}%/{getattr(self, f'target_psi_{resource}'):g}%"
+                            for resource in PSI_RESOURCES) +
+                              f" | 速率 {self.get_request_rate():.1f} req/s | "
+                              f"内存 ballast {self.memory_ballast.size / 1024 / 1024:.0f}MB | IO {self.disk_io.rate:.0f} 次/s")
+                    if any(streamer.running for streamer in self.net_streamers.values()):
+                        snapshot = self.sampler.snapshot
+                        print(f"[网络] 入向 {snapshot['net_rx_mbps']:.1f}/{self.target_net_rx_mbps:g} Mbit/s | "
+                              f"出向 {snapshot['net_tx_mbps']:.1f}/{self.target_net_tx_mbps:g} Mbit/s | "
+                              f"限速 {self.net_streamers['net_rx'].rate_mbps:.1f} / "
+                              f"{self.net_streamers['net_tx'].rate_mbps:.1f} Mbit/s")
 
             except Exception as e:
                 print(f"[控制器] 调整错误: {e}")
 
-            await asyncio.sleep(5)  # 每 5 秒调整一次
+            # 等待下一个控制周期；socket 的 set 命令会提前唤醒
+            try:
+                await asyncio.wait_for(self.control_event.wait(), timeout=self.control_interval)
+            except asyncio.TimeoutError:
+                pass
+            self.control_event.clear()
 
     async def run(self):
         """运行负载控制服务"""
@@ -464,27 +3450,41 @@ class LoadControllerService:
         print(f"目标 CPU 使用率: {self.target_cpu}%")
         print(f"目标内存使用率: {self.target_memory}%")
         print(f"目标磁盘使用率: {self.target_disk}%")
+        print(f"指标采样: {self.sampler_name}（窗口 {self.sample_window}s，间隔 {self.sample_interval}s）")
         print(f"测试接口: {', '.join(self.endpoints.keys())}")
-        print("策略: 所有接口持续调用，通过频率控制压力；动态调整内存和磁盘占用")
+        print("策略: 所有接口持续调用，PID 控制请求速率；PID 控制内存和磁盘 ballast")
         print("=" * 70)
 
         self.stats['start_time'] = datetime.now()
+        await self.load_config()
+        await self.sampler.sample()
+        await self.start_control_server()
+
+        # 所有请求共用一个保持长连接的连接池
+        self.session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=self.max_inflight, keepalive_timeout=30),
+            timeout=aiohttp.ClientTimeout(total=30)
+        )
 
         # 为每种接口启动固定数量的 worker
         # 每种接口 2 个 worker 以保证覆盖
-        workers_per_endpoint = 2
-
         for endpoint_name in self.endpoints.keys():
-            for worker_id in range(workers_per_endpoint):
+            for worker_id in range(self.workers_per_endpoint):
                 task = asyncio.create_task(
                     self.worker(endpoint_name, worker_id)
                 )
                 self.worker_tasks.append(task)
 
-        print(f"[启动] 已启动 {len(self.worker_tasks)} 个 workers")
+        dispatcher_task = asyncio.create_task(self.dispatcher())
+
+        print(f"[启动] 已启动 {len(self.worker_tasks)} 个 workers 和 1 个 open 模式调度器"
+              f"（当前模式: {self.load_mode}）")
         print(f"[接口] {', '.join(self.endpoints.keys())}")
 
-        # 启动控制器
+        # 启动采样循环和控制器
+        sampling_task = asyncio.create_task(self.sampling_loop())
+        journal_task = asyncio.create_task(self.journal_loop())
+        replay_task = asyncio.create_task(self.replay_loop())
         controller_task = asyncio.create_task(self.adjust_concurrency())
 
         # 等待服务运行
@@ -498,7 +3498,26 @@ class LoadControllerService:
             for task in self.worker_tasks:
                 task.cancel()
 
-            await asyncio.gather(*self.worker_tasks, return_exceptions=True)
+            sampling_task.cancel()
+            journal_task.cancel()
+            replay_task.cancel()
+            dispatcher_task.cancel()
+            # 写入线程无法取消，通知它在当前块写完后退出
+            self.disk_ballast.stopping = True
+            if self.disk_write_task is not None:
+                await asyncio.gather(self.disk_write_task, return_exceptions=True)
+            await asyncio.to_thread(self.disk_io.stop)
+            for streamer in self.net_streamers.values():
+                await streamer.stop()
+            await self.stop_generators(self.generators)
+
+            await asyncio.gather(*self.worker_tasks, sampling_task, journal_task, replay_task, dispatcher_task,
+                                 return_exceptions=True)
+            self.journal.close()
+            self.stop_trace_record()
+            await self.stop_control_server()
+            await self.sampler.close()
+            await self.session.close()
 
             print("负载控制服务已停止")
 
@@ -515,25 +3534,103 @@ class LoadControllerService:
         uptime = (datetime.now() - self.stats['start_time']).total_seconds() if self.stats['start_time'] else 0
 
         # 获取当前内存和磁盘信息
-        memory_ballast_mb = sum(len(chunk) for chunk in self.memory_ballast) / 1024 / 1024
-        disk_ballast_mb = 0
-        if os.path.exists(self.disk_file_path):
-            disk_ballast_mb = os.path.getsize(self.disk_file_path) / 1024 / 1024
+        memory_ballast_mb = self.memory_ballast.size / 1024 / 1024
+        disk_ballast_mb = self.disk_ballast.size / 1024 / 1024
+        snapshot = self.sampler.snapshot
+        stats = self.merged_stats()
+        inflight = self.inflight + sum(generator['report']['inflight']
+                                       for generator in self.generators if generator['report'])
 
         return {
             'running': self.running,
+            'paused': self.paused,
+            'control_socket': CONTROL_SOCKET_PATH if self.control_server is not None else None,
             'target_cpu': self.target_cpu,
             'target_memory': self.target_memory,
             'target_disk': self.target_disk,
+            'current_cpu': round(self.get_current_cpu(), 1),
+            'current_memory': round(self.get_current_memory(), 1),
+            'current_disk': round(self.get_current_disk(), 1),
+            'profile': self.get_profile_status(),
             'current_request_interval': round(self.current_request_interval, 3),
+            'load_mode': self.load_mode,
+            'arrival_process': self.arrival_process,
+            'max_inflight': self.max_inflight,
+            'inflight': inflight,
+            'dropped_arrivals': stats['dropped_arrivals'],
+            'delayed_arrivals': stats['delayed_arrivals'],
+            'max_dispatch_lag_ms': round(stats['max_dispatch_lag_ms'], 2),
+            'processes': self.processes,
+            'controller_cpu': self.controller_cpu,
+            'generators': [
+                {
+                    'index': generator['index'],
+                    'pid': generator['process'].pid,
+                    'alive': generator['process'].is_alive(),
+                    'cpus': self.generator_cpus(),
+                    'requests': generator['report']['stats']['total_requests'] if generator['report'] else 0
+                }
+                for generator in self.generators
+            ],
+            'control_interval': self.control_interval,
+            'request_rate': round(self.get_request_rate(), 2),
+            'target_memory_ballast_mb': round(self.target_memory_bytes / 1024 / 1024, 1),
+            'target_disk_ballast_mb': round(self.target_disk_bytes / 1024 / 1024, 1),
+            'pid': {resource: pid.to_dict() for resource, pid in self.pids.items()},
+            'autotuning': self.autotuning,
+            'autotune_results': self.autotune_results,
+            'sampler': self.sampler_name,
+            'sample_window': self.sample_window,
+            'sample_interval': self.sample_interval,
             'memory_ballast_mb': round(memory_ballast_mb, 1),
+            'memory_step_mb': round(self.memory_step_bytes / 1024 / 1024, 1),
+            'memory_huge_pages': self.memory_ballast.huge_pages,
             'disk_ballast_mb': round(disk_ballast_mb, 1),
-            'active_endpoints': list(self.endpoints.keys()),
+            'disk_ballast_mode': self.disk_ballast.mode,
+            'disk_write_mbps': self.disk_ballast.write_mbps,
+            'disk_write_in_progress': self.disk_write_task is not None and not self.disk_write_task.done(),
+            'disk_last_write_mbps': round(self.disk_ballast.last_write_mbps, 1),
+            'target_disk_iops': self.target_disk_iops,
+            'target_disk_mbps': self.target_disk_mbps,
+            'current_disk_io': {
+                'read_iops': round(snapshot['disk_read_iops'], 1),
+                'write_iops': round(snapshot['disk_write_iops'], 1),
+                'read_mbps': round(snapshot['disk_read_mbps'], 2),
+                'write_mbps': round(snapshot['disk_write_mbps'], 2),
+                'total_iops': round(snapshot['disk_read_iops'] + snapshot['disk_write_iops'], 1),
+                'total_mbps': round(snapshot['disk_read_mbps'] + snapshot['disk_write_mbps'], 2)
+            },
+            'disk_io_generator': self.disk_io.to_dict(),
+            'target_net_rx_mbps': self.target_net_rx_mbps,
+            'target_net_tx_mbps': self.target_net_tx_mbps,
+            'psi_kind': self.psi_kind,
+            'target_psi_cpu': self.target_psi_cpu,
+            'target_psi_memory': self.target_psi_memory,
+            'target_psi_io': self.target_psi_io,
+            'psi_control': sorted(PSI_LOOPS[loop] for loop in self.psi_active),
+            'current_psi': {
+                resource: {kind: round(snapshot[f'psi_{resource}_{kind}'], 2) for kind in PSI_KINDS}
+                for resource in PSI_RESOURCES
+            },
+            'current_net': {
+                'interface': self.sampler.net_interface,
+                'rx_mbps': round(snapshot['net_rx_mbps'], 2),
+                'tx_mbps': round(snapshot['net_tx_mbps'], 2)
+            },
+            'net_streamers': {resource: streamer.to_dict() for resource, streamer in self.net_streamers.items()},
+            'active_endpoints': [name for name, endpoint in self.endpoints.items() if endpoint['weight'] > 0],
+            'endpoint_weights': {name: endpoint['weight'] for name, endpoint in self.endpoints.items()},
+            'endpoint_costs': self.get_cost_status(),
+            'seed': self.seed,
+            'trace_record': self.trace_recorder.to_dict() if self.trace_recorder is not None else None,
+            'replay': self.get_replay_status(),
+            'journal': {**self.journal.to_dict(), 'enabled': self.journal_enabled, 'interval': self.journal_interval},
             'workers_count': len(self.worker_tasks),
             'uptime_seconds': round(uptime, 1),
-            'total_requests': self.stats['total_requests'],
-            'successful_requests': self.stats['successful_requests'],
-            'failed_requests': self.stats['failed_requests']
+            'total_requests': stats['total_requests'],
+            'successful_requests': stats['successful_requests'],
+            'failed_requests': stats['failed_requests'],
+            'latency_ms': self.merged_latency()
         }
 
 
@@ -545,6 +3642,14 @@ controller = LoadControllerService(
 )
 
 
+def generator_process_main(index: int, conn, base_url: str, settings: Dict):
+    """请求生成子进程入口（spawn 后重新导入本模块，使用子进程自己的全局实例）"""
+    # Ctrl+C 会发给整个进程组，子进程由控制器通知退出
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    controller.base_url = base_url
+    asyncio.run(controller.run_generator(index, conn, settings))
+
+
 def signal_handler(sig, frame):
     """处理退出信号"""
     print("\n收到退出信号，正在关闭服务...")
@@ -556,10 +3661,21 @@ def signal_handler(sig, frame):
         controller.memory_ballast.clear()
         print("[清理] 已释放内存")
 
-        # 清理磁盘文件
+        # 停止进行中的写入并清理磁盘文件
+        controller.disk_ballast.stopping = True
+        controller.disk_io.stop()
+        for generator in controller.generators:
+            generator['process'].terminate()
+        if controller.trace_recorder is not None:
+            controller.trace_recorder.close()
         if os.path.exists(controller.disk_file_path):
-            os.remove(controller.disk_file_path)
+            controller.disk_ballast.clear()
             print(f"[清理] 已删除磁盘文件: {controller.disk_file_path}")
+        if os.path.exists(CONTROL_SOCKET_PATH):
+            os.remove(CONTROL_SOCKET_PATH)
+        if os.path.exists(DISK_IO_FILE_PATH):
+            os.remove(DISK_IO_FILE_PATH)
+            print(f"[清理] 已删除 IO 测试文件: {DISK_IO_FILE_PATH}")
     except Exception as e:
         print(f"[清理] 清理资源失败: {e}")
 
@@ -577,4 +3693,14 @@ async def main():
 
 
 if __name__ == '__main__':
-    asyncio.run(main())
+    parser = argparse.ArgumentParser(description="负载控制服务")
+    parser.add_argument("--dump-journal", nargs="?", const=JOURNAL_FILE_PATH, metavar="PATH",
+                        help=f"以 CSV 输出采样日志后退出（默认: {JOURNAL_FILE_PATH}）")
+    parser.add_argument("--dump-trace", metavar="PATH", help="以 CSV 输出请求记录后退出")
+    args = parser.parse_args()
+    if args.dump_journal:
+        dump_journal(args.dump_journal)
+    elif args.dump_trace:
+        dump_trace(args.dump_trace)
+    else:
+        asyncio.run(main())
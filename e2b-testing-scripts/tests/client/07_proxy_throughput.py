@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+沙箱端口转发代理吞吐测试脚本
+
+通过沙箱公网地址访问模板服务的 Blob 端口（app.py, 默认 8081），测量数据
+经过沙箱代理进出沙箱的吞吐:
+- 下载: GET /blob/{size}（服务端优先 sendfile 零拷贝，uvloop 下分块发送）
+- 上传: PUT /blob?sink=discard|disk（服务端流式接收）
+
+测试指标:
+- 各并发级别下的聚合吞吐（MB/s）
+- 单请求耗时分布（P50/P90/P99）
+- 失败请求数
+
+环境变量 (必须通过 .e2b_env 配置):
+- E2B_DOMAIN: E2B 服务域名 (必需)
+- E2B_API_KEY: E2B API 密钥 (必需)
+- E2B_TEMPLATE_NAME: 模板名称 (可选，需包含 app.py 的 Blob 服务)
+
+使用方法:
+  source .e2b_env
+  python3 07_proxy_throughput.py --concurrency 1,4,16 --download-size 64M --upload-size 16M
+  python3 07_proxy_throughput.py --sandbox-id <id> --duration 20
+"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+from typing import List, Dict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.sandbox_service import disable_ssl_verification
+
+# 必须在导入网络库之前禁用 SSL 证书验证
+disable_ssl_verification()
+
+import httpx
+
+from utils.logger import get_logger
+from utils.sandbox_service import open_sandbox, sandbox_url, latency_summary, parse_int_list, parse_size
+
+logger = get_logger(__name__)
+
+UPLOAD_CHUNK = 1024 * 1024
+
+
+class ProxyThroughputTester:
+    """沙箱代理上传/下载吞吐测试器"""
+
+    def __init__(self, base_url: str, concurrency_levels: List[int], download_size: int,
+                 upload_size: int, duration: float, sink: str = "discard"):
+        """
+        初始化测试器
+
+        Args:
+            base_url: Blob 服务地址（https://<port>-<sandbox>.<domain>）
+            concurrency_levels: 要测试的并发级别
+            download_size: 单次下载字节数
+            upload_size: 单次上传字节数
+            duration: 每个并发级别的持续时间（秒）
+            sink: 上传数据的服务端去向（discard 或 disk）
+        """
+        self.base_url = base_url.rstrip("/")
+        self.concurrency_levels = concurrency_levels
+        self.download_size = download_size
+        self.upload_size = upload_size
+        self.duration = duration
+        self.sink = sink
+        # 复用同一块随机数据作为上传内容，避免客户端生成数据成为瓶颈
+        self.upload_buffer = os.urandom(UPLOAD_CHUNK)
+
+    async def _upload_body(self):
+        remaining = self.upload_size
+        while remaining:
+            chunk = self.upload_buffer[:min(remaining, UPLOAD_CHUNK)]
+            remaining -= len(chunk)
+            yield chunk
+
+    async def _download_once(self, client: httpx.AsyncClient) -> int:
+        received = 0
+        async with client.stream("GET", f"{self.base_url}/blob/{self.download_size}") as response:
+            response.raise_for_status()
+            async for data in response.aiter_raw():
+                received += len(data)
+        if received != self.download_size:
+            raise IOError(f"下载字节数不符: {received}/{self.download_size}")
+        return received
+
+    async def _upload_once(self, client: httpx.AsyncClient) -> int:
+        response = await client.put(
+            f"{self.base_url}/blob",
+            params={"sink": self.sink},
+            content=self._upload_body(),
+            headers={"Content-Length": str(self.upload_size)}
+        )
+        response.raise_for_status()
+        return response.json()["bytes"]
+
+    async def _worker(self, client: httpx.AsyncClient, direction: str, deadline: float,
+                      latencies: List[float], totals: Dict):
+        operation = self._download_once if direction == "download" else self._upload_once
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                totals["bytes"] += await operation(client)
+                latencies.append((time.perf_counter() - start) * 1000)
+            except Exception as e:
+                totals["errors"] += 1
+                if totals["errors"] <= 3:
+                    logger.warning(f"  {direction} 请求失败: {e}")
+
+    async def run_level(self, direction: str, concurrency: int) -> Dict:
+        """在指定并发级别下持续 duration 秒，统计聚合吞吐"""
+        latencies: List[float] = []
+        totals = {"bytes": 0, "errors": 0}
+        limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+        timeout = httpx.Timeout(120.0, connect=30.0)
+
+        async with httpx.AsyncClient(limits=limits, timeout=timeout, verify=False) as client:
+            start = time.perf_counter()
+            deadline = start + self.duration
+            await asyncio.gather(*[
+                self._worker(client, direction, deadline, latencies, totals)
+                for _ in range(concurrency)
+            ])
+            elapsed = time.perf_counter() - start
+
+        throughput = totals["bytes"] / 1024 / 1024 / elapsed if elapsed > 0 else 0
+        result = {
+            "direction": direction,
+            "concurrency": concurrency,
+            "request_bytes": self.download_size if direction == "download" else self.upload_size,
+            "requests": len(latencies),
+            "errors": totals["errors"],
+            "total_mb": round(totals["bytes"] / 1024 / 1024, 2),
+            "elapsed_seconds": round(elapsed, 3),
+            "throughput_mb_s": round(throughput, 2),
+            "throughput_mbps": round(throughput * 8 * 1.048576, 2),
+            "latency_ms": latency_summary(latencies)
+        }
+        logger.info(f"  {direction:8s} 并发 {concurrency:3d}: {result['throughput_mb_s']:8.2f} MB/s "
+                    f"({result['requests']} 请求, {result['errors']} 失败, "
+                    f"P50 {result['latency_ms'].get('p50', 0):.1f} ms)")
+        return result
+
+    async def run(self) -> Dict:
+        """按并发级别依次运行下载和上传测试"""
+        results = {"download": [], "upload": []}
+        for direction in ("download", "upload"):
+            logger.info(f"\n开始 {direction} 测试...")
+            for concurrency in self.concurrency_levels:
+                results[direction].append(await self.run_level(direction, concurrency))
+        return results
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="沙箱端口转发代理吞吐测试")
+    parser.add_argument("--sandbox-id", type=str, help="使用已有沙箱（默认基于模板新建）")
+    parser.add_argument("--template", type=str, help="模板名称（默认: E2B_TEMPLATE_NAME）")
+    parser.add_argument("--url", type=str, help="直接指定 Blob 服务地址（跳过沙箱，例如本地调试）")
+    parser.add_argument("--port", type=int, default=8081, help="Blob 服务端口 (默认: 8081)")
+    parser.add_argument("--concurrency", type=str, default="1,4,16", help="并发级别列表 (默认: 1,4,16)")
+    parser.add_argument("--download-size", type=str, default="64M", help="单次下载大小 (默认: 64M)")
+    parser.add_argument("--upload-size", type=str, default="16M", help="单次上传大小 (默认: 16M)")
+    parser.add_argument("--duration", type=float, default=15.0, help="每个并发级别的持续时间（秒）")
+    parser.add_argument("--sink", choices=["discard", "disk"], default="discard", help="上传数据去向")
+    parser.add_argument("--keep", action="store_true", help="测试结束后保留新建的沙箱")
+    parser.add_argument("--output", type=str, default="outputs/07_proxy_throughput.json",
+                        help="输出文件路径 (默认: outputs/07_proxy_throughput.json)")
+    args = parser.parse_args()
+
+    sandbox = None
+    created = False
+    if args.url:
+        base_url = args.url
+    else:
+        missing_vars = [var for var in ['E2B_DOMAIN', 'E2B_API_KEY'] if var not in os.environ]
+        if missing_vars:
+            logger.error(f"缺少必需的环境变量: {', '.join(missing_vars)}")
+            logger.error("请先配置 .e2b_env 文件并运行: source .e2b_env")
+            sys.exit(1)
+        sandbox, created = open_sandbox(args.sandbox_id, args.template)
+        base_url = sandbox_url(sandbox, args.port)
+
+    logger.info("=" * 60)
+    logger.info("沙箱代理吞吐测试")
+    logger.info("=" * 60)
+    logger.info(f"Blob 服务地址: {base_url}")
+    logger.info(f"并发级别: {args.concurrency}, 下载 {args.download_size}, 上传 {args.upload_size} ({args.sink})")
+
+    tester = ProxyThroughputTester(
+        base_url=base_url,
+        concurrency_levels=parse_int_list(args.concurrency),
+        download_size=parse_size(args.download_size),
+        upload_size=parse_size(args.upload_size),
+        duration=args.duration,
+        sink=args.sink
+    )
+
+    try:
+        results = asyncio.run(tester.run())
+    finally:
+        if sandbox is not None and created and not args.keep:
+            sandbox.kill()
+            logger.info("已关闭测试沙箱")
+
+    output = {
+        "test": "proxy_throughput",
+        "base_url": base_url,
+        "sandbox_id": sandbox.sandbox_id if sandbox is not None else None,
+        "config": vars(args),
+        "results": results,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S")
+    }
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump(output, f, indent=2, ensure_ascii=False)
+    logger.info(f"\n结果已保存到: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+沙箱 WebSocket 往返延迟测试脚本
+
+通过沙箱公网地址连接模板服务的 WebSocket 回显接口（app.py /ws/echo），
+在多个并发连接上按固定速率发送消息，测量经过沙箱代理的交互延迟。
+
+测试指标:
+- 建连延迟（TCP + TLS + WebSocket 握手）
+- 消息往返延迟分布（P50/P90/P99/P99.9）
+- 丢失消息数、连接失败数
+
+消息按计划时间发送（不等待回包），往返延迟从计划发送时间开始计算，
+避免发送端积压时低估延迟。
+
+环境变量 (必须通过 .e2b_env 配置):
+- E2B_DOMAIN: E2B 服务域名 (必需)
+- E2B_API_KEY: E2B API 密钥 (必需)
+- E2B_TEMPLATE_NAME: 模板名称 (可选，需包含 app.py)
+
+使用方法:
+  source .e2b_env
+  python3 08_websocket_latency.py --connections 100 --rate 10 --size 256 --duration 30
+"""
+
+import os
+import sys
+import json
+import time
+import struct
+import asyncio
+import argparse
+from typing import List, Dict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.sandbox_service import disable_ssl_verification
+
+# 必须在导入网络库之前禁用 SSL 证书验证
+disable_ssl_verification()
+
+import websockets
+
+from utils.logger import get_logger
+from utils.sandbox_service import open_sandbox, sandbox_url, latency_summary, insecure_ssl_context
+
+logger = get_logger(__name__)
+
+# 消息头: 序号 (uint64) + 计划发送时间 (perf_counter, double)
+HEADER = struct.Struct("<Qd")
+
+
+class WebSocketLatencyTester:
+    """WebSocket 往返延迟测试器"""
+
+    def __init__(self, ws_url: str, connections: int, rate: float, size: int,
+                 duration: float, ramp: float):
+        """
+        初始化测试器
+
+        Args:
+            ws_url: WebSocket 地址（wss://<port>-<sandbox>.<domain>/ws/echo）
+            connections: 并发连接数
+            rate: 每个连接每秒发送的消息数
+            size: 消息大小（字节，至少 16）
+            duration: 发送阶段持续时间（秒）
+            ramp: 建立所有连接的时间窗口（秒），连接在窗口内均匀发起
+        """
+        self.ws_url = ws_url
+        self.connections = connections
+        self.rate = rate
+        self.size = max(size, HEADER.size)
+        self.duration = duration
+        self.ramp = ramp
+        self.ssl_context = insecure_ssl_context() if ws_url.startswith("wss://") else None
+
+        self.connect_latencies: List[float] = []
+        self.rtt_latencies: List[float] = []
+        self.sent = 0
+        self.received = 0
+        self.connect_failures = 0
+        self.errors = 0
+
+    async def _receiver(self, ws):
+        async for message in ws:
+            _, scheduled = HEADER.unpack_from(message)
+            self.rtt_latencies.append((time.perf_counter() - scheduled) * 1000)
+            self.received += 1
+
+    async def _connection(self, index: int, start_at: float, stop_at: float):
+        await asyncio.sleep(max(0.0, start_at - time.perf_counter()))
+        connect_start = time.perf_counter()
+        try:
+            ws = await websockets.connect(
+                self.ws_url, ssl=self.ssl_context, compression=None,
+                open_timeout=30, max_size=None, ping_interval=None
+            )
+        except Exception as e:
+            self.connect_failures += 1
+            if self.connect_failures <= 3:
+                logger.warning(f"  连接 {index} 建立失败: {e}")
+            return
+        self.connect_latencies.append((time.perf_counter() - connect_start) * 1000)
+
+        padding = b"\0" * (self.size - HEADER.size)
+        receiver = asyncio.create_task(self._receiver(ws))
+        try:
+            interval = 1.0 / self.rate
+            next_send = time.perf_counter()
+            seq = 0
+            while next_send < stop_at:
+                delay = next_send - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                await ws.send(HEADER.pack(seq, next_send) + padding)
+                self.sent += 1
+                seq += 1
+                next_send += interval
+            # 等待最后一批回包
+            await asyncio.sleep(min(5.0, 10 * interval + 1.0))
+        except Exception as e:
+            self.errors += 1
+            if self.errors <= 3:
+                logger.warning(f"  连接 {index} 发送失败: {e}")
+        finally:
+            receiver.cancel()
+            await ws.close()
+
+    async def run(self) -> Dict:
+        start = time.perf_counter()
+        stop_at = start + self.ramp + self.duration
+        step = self.ramp / self.connections if self.connections else 0
+        await asyncio.gather(*[
+            self._connection(i, start + i * step, stop_at)
+            for i in range(self.connections)
+        ])
+        elapsed = time.perf_counter() - start
+
+        return {
+            "connections": self.connections,
+            "connected": len(self.connect_latencies),
+            "connect_failures": self.connect_failures,
+            "send_errors": self.errors,
+            "messages_sent": self.sent,
+            "messages_received": self.received,
+            "messages_lost": self.sent - self.received,
+            "elapsed_seconds": round(elapsed, 3),
+            "achieved_rate_per_second": round(self.received / elapsed, 2) if elapsed > 0 else 0,
+            "connect_latency_ms": latency_summary(self.connect_latencies),
+            "rtt_latency_ms": latency_summary(self.rtt_latencies)
+        }
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="沙箱 WebSocket 往返延迟测试")
+    parser.add_argument("--sandbox-id", type=str, help="使用已有沙箱（默认基于模板新建）")
+    parser.add_argument("--template", type=str, help="模板名称（默认: E2B_TEMPLATE_NAME）")
+    parser.add_argument("--url", type=str, help="直接指定服务地址（跳过沙箱，例如 http://127.0.0.1:8080）")
+    parser.add_argument("--port", type=int, default=8080, help="服务端口 (默认: 8080)")
+    parser.add_argument("--connections", type=int, default=50, help="并发连接数 (默认: 50)")
+    parser.add_argument("--rate", type=float, default=10.0, help="每连接每秒消息数 (默认: 10)")
+    parser.add_argument("--size", type=int, default=256, help="消息大小字节数 (默认: 256)")
+    parser.add_argument("--duration", type=float, default=30.0, help="发送持续时间秒数 (默认: 30)")
+    parser.add_argument("--ramp", type=float, default=5.0, help="建连时间窗口秒数 (默认: 5)")
+    parser.add_argument("--keep", action="store_true", help="测试结束后保留新建的沙箱")
+    parser.add_argument("--output", type=str, default="outputs/08_websocket_latency.json",
+                        help="输出文件路径 (默认: outputs/08_websocket_latency.json)")
+    args = parser.parse_args()
+
+    sandbox = None
+    created = False
+    if args.url:
+        base_url = args.url
+    else:
+        missing_vars = [var for var in ['E2B_DOMAIN', 'E2B_API_KEY'] if var not in os.environ]
+        if missing_vars:
+            logger.error(f"缺少必需的环境变量: {', '.join(missing_vars)}")
+            logger.error("请先配置 .e2b_env 文件并运行: source .e2b_env")
+            sys.exit(1)
+        sandbox, created = open_sandbox(args.sandbox_id, args.template)
+        base_url = sandbox_url(sandbox, args.port)
+    ws_url = base_url.replace("https://", "wss://").replace("http://", "ws://").rstrip("/") + "/ws/echo"
+
+    logger.info("=" * 60)
+    logger.info("WebSocket 往返延迟测试")
+    logger.info("=" * 60)
+    logger.info(f"WebSocket 地址: {ws_url}")
+    logger.info(f"连接数: {args.connections}, 速率: {args.rate}/s/连接, 消息大小: {args.size}B, "
+                f"持续: {args.duration}s")
+
+    tester = WebSocketLatencyTester(ws_url, args.connections, args.rate, args.size,
+                                    args.duration, args.ramp)
+    try:
+        results = asyncio.run(tester.run())
+    finally:
+        if sandbox is not None and created and not args.keep:
+            sandbox.kill()
+            logger.info("已关闭测试沙箱")
+
+    connect = results["connect_latency_ms"]
+    rtt = results["rtt_latency_ms"]
+    logger.info("\n统计结果:")
+    logger.info(f"  连接: {results['connected']}/{results['connections']} 成功")
+    logger.info(f"  建连 P50/P99: {connect.get('p50', 0):.2f} / {connect.get('p99', 0):.2f} ms")
+    logger.info(f"  往返 P50/P90/P99/P99.9: {rtt.get('p50', 0):.2f} / {rtt.get('p90', 0):.2f} / "
+                f"{rtt.get('p99', 0):.2f} / {rtt.get('p999', 0):.2f} ms ⭐")
+    logger.info(f"  消息: 发送 {results['messages_sent']}, 接收 {results['messages_received']}, "
+                f"丢失 {results['messages_lost']}")
+
+    output = {
+        "test": "websocket_latency",
+        "ws_url": ws_url,
+        "sandbox_id": sandbox.sandbox_id if sandbox is not None else None,
+        "config": vars(args),
+        "results": results,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S")
+    }
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump(output, f, indent=2, ensure_ascii=False)
+    logger.info(f"\n结果已保存到: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,336 @@
+#!/usr/bin/env python3
+"""
+沙箱空闲长连接扩展测试脚本
+
+通过沙箱公网地址逐级增加到模板服务 /idle/sse 的空闲 SSE 长连接数，同时在
+一条独立连接上持续探测 /health 延迟，找出沙箱代理 / envd / 服务的连接上限。
+
+测试指标:
+- 每一级连接数下的探测延迟（P50/P99）和错误率
+- 建连失败数、被动断开数
+- 沙箱内存随连接数的增长（每连接内存开销）
+- 出现退化时的连接数（延迟超过基线倍数、探测错误或建连失败超过阈值）
+
+环境变量 (必须通过 .e2b_env 配置):
+- E2B_DOMAIN: E2B 服务域名 (必需)
+- E2B_API_KEY: E2B API 密钥 (必需)
+- E2B_TEMPLATE_NAME: 模板名称 (可选，需包含 app.py)
+
+注意:
+- 客户端到同一地址的连接受本机临时端口范围限制（net.ipv4.ip_local_port_range），
+  超过约 2.8 万连接时需扩大端口范围或使用多台客户端
+- 客户端会自动提升自身的文件描述符限制
+
+使用方法:
+  source .e2b_env
+  python3 09_idle_connections.py --step 1000 --max-connections 20000 --hold 10
+"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import resource
+from typing import List, Dict, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.sandbox_service import disable_ssl_verification
+
+# 必须在导入网络库之前禁用 SSL 证书验证
+disable_ssl_verification()
+
+import httpx
+
+from utils.logger import get_logger
+from utils.sandbox_service import (
+    open_sandbox, sandbox_url, latency_summary, insecure_ssl_context, split_host
+)
+
+logger = get_logger(__name__)
+
+
+class IdleConnectionTester:
+    """空闲长连接扩展测试器"""
+
+    def __init__(self, base_url: str, step: int, max_connections: int, hold: float,
+                 open_rate: float, heartbeat: float, probe_interval: float,
+                 latency_factor: float, error_threshold: float, stop_on_degrade: bool = True):
+        """
+        初始化测试器
+
+        Args:
+            base_url: 服务地址
+            step: 每级新增的连接数
+            max_connections: 最大连接数
+            hold: 每级保持并探测的时间（秒）
+            open_rate: 建立连接的速率（连接/秒）
+            heartbeat: 服务端 SSE 心跳间隔（秒）
+            probe_interval: 探测请求间隔（秒）
+            latency_factor: 探测 P99 超过基线多少倍视为退化
+            error_threshold: 探测错误率 / 建连失败率超过该值视为退化
+            stop_on_degrade: 出现退化后是否停止继续加压
+        """
+        self.base_url = base_url.rstrip("/")
+        self.host, self.port, self.use_tls = split_host(self.base_url)
+        self.ssl_context = insecure_ssl_context() if self.use_tls else None
+        self.step = step
+        self.max_connections = max_connections
+        self.hold = hold
+        self.open_rate = open_rate
+        self.heartbeat = heartbeat
+        self.probe_interval = probe_interval
+        self.latency_factor = latency_factor
+        self.error_threshold = error_threshold
+        self.stop_on_degrade = stop_on_degrade
+
+        self.alive = 0
+        self.dropped = 0
+        self.drain_tasks: List[asyncio.Task] = []
+        self.writers: List[asyncio.StreamWriter] = []
+
+    async def _open_one(self) -> bool:
+        """建立一条 SSE 连接并读取响应头，成功后在后台持续读取心跳"""
+        writer: Optional[asyncio.StreamWriter] = None
+        handed_off = False
+        try:
+            reader, writer = await asyncio.wait_for(asyncio.open_connection(
+                self.host, self.port, ssl=self.ssl_context,
+                server_hostname=self.host if self.use_tls else None
+            ), timeout=30)
+            writer.write(
+                f"GET /idle/sse?heartbeat={self.heartbeat} HTTP/1.1\r\n"
+                f"Host: {self.host}\r\nAccept: text/event-stream\r\n\r\n".encode()
+            )
+            await writer.drain()
+            status_line = await asyncio.wait_for(reader.readline(), timeout=30)
+            if b" 200 " not in status_line:
+                return False
+            while (await reader.readline()) not in (b"\r\n", b""):
+                pass
+
+            self.alive += 1
+            self.writers.append(writer)
+            self.drain_tasks.append(asyncio.create_task(self._drain(reader)))
+            handed_off = True
+            return True
+        except Exception:
+            return False
+        finally:
+            # 没有交给连接池的连接（状态码错误、超时、读取失败、被取消）在这里关闭，避免泄漏 socket
+            if writer is not None and not handed_off:
+                writer.close()
+
+    async def _drain(self, reader: asyncio.StreamReader):
+        try:
+            while await reader.read(4096):
+                pass
+        except Exception:
+            pass
+        self.alive -= 1
+        self.dropped += 1
+
+    async def _open_batch(self, count: int) -> int:
+        """按 open_rate 建立 count 条连接，返回失败数"""
+        failures = 0
+        pending = []
+        interval = 1.0 / self.open_rate
+        for _ in range(count):
+            pending.append(asyncio.create_task(self._open_one()))
+            await asyncio.sleep(interval)
+        for ok in await asyncio.gather(*pending):
+            if not ok:
+                failures += 1
+        return failures
+
+    async def _probe(self, client: httpx.AsyncClient, duration: float) -> Dict:
+        """在独立连接上持续探测 /health"""
+        latencies: List[float] = []
+        errors = 0
+        deadline = time.perf_counter() + duration
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                response = await client.get(f"{self.base_url}/health")
+                response.raise_for_status()
+                latencies.append((time.perf_counter() - start) * 1000)
+            except Exception:
+                errors += 1
+            await asyncio.sleep(self.probe_interval)
+        total = len(latencies) + errors
+        return {
+            "latency_ms": latency_summary(latencies),
+            "errors": errors,
+            "error_rate": round(errors / total, 4) if total else 0.0
+        }
+
+    async def _server_stats(self, client: httpx.AsyncClient) -> Optional[Dict]:
+        try:
+            response = await client.get(f"{self.base_url}/idle/stats")
+            return response.json()
+        except Exception:
+            return None
+
+    def _degradation(self, baseline_p99: float, level: Dict) -> Optional[str]:
+        probe = level["probe"]
+        p99 = probe["latency_ms"].get("p99")
+        if probe["error_rate"] > self.error_threshold:
+            return f"探测错误率 {probe['error_rate']:.2%}"
+        if p99 is not None and p99 > max(baseline_p99 * self.latency_factor, baseline_p99 + 5):
+            return f"探测 P99 {p99:.1f}ms 超过基线 {baseline_p99:.1f}ms 的 {self.latency_factor} 倍"
+        if level["opened"] and level["open_failures"] / level["opened"] > self.error_threshold:
+            return f"建连失败 {level['open_failures']}/{level['opened']}"
+        return None
+
+    async def run(self) -> Dict:
+        limits = httpx.Limits(max_connections=1, max_keepalive_connections=1)
+        async with httpx.AsyncClient(limits=limits, timeout=10.0, verify=False) as client:
+            baseline_stats = await self._server_stats(client)
+            baseline_probe = await self._probe(client, self.hold)
+            baseline_p99 = baseline_probe["latency_ms"].get("p99", 0.0)
+            baseline_mem = (baseline_stats or {}).get("system_memory", {}).get("used_mb")
+            baseline_rss = (baseline_stats or {}).get("process_rss_mb")
+            logger.info(f"基线: 探测 P99 {baseline_p99:.2f} ms, 沙箱已用内存 {baseline_mem} MB")
+
+            levels = []
+            degraded = None
+            target = 0
+            while target < self.max_connections:
+                count = min(self.step, self.max_connections - target)
+                target += count
+                failures = await self._open_batch(count)
+                probe = await self._probe(client, self.hold)
+                stats = await self._server_stats(client)
+
+                level = {
+                    "target_connections": target,
+                    "alive_connections": self.alive,
+                    "opened": count,
+                    "open_failures": failures,
+                    "dropped_total": self.dropped,
+                    "probe": probe,
+                    "server": stats
+                }
+                if stats and baseline_mem is not None and self.alive > 0:
+                    level["memory_per_connection_kb"] = round(
+                        (stats["system_memory"]["used_mb"] - baseline_mem) * 1024 / self.alive, 2)
+                    level["rss_per_connection_kb"] = round(
+                        (stats["process_rss_mb"] - baseline_rss) * 1024 / self.alive, 2)
+                levels.append(level)
+
+                logger.info(
+                    f"  连接 {self.alive:6d}/{target:6d} | 建连失败 {failures:4d} | 断开 {self.dropped:4d} | "
+                    f"探测 P50 {probe['latency_ms'].get('p50', 0):7.2f} ms P99 {probe['latency_ms'].get('p99', 0):7.2f} ms | "
+                    f"每连接内存 {level.get('memory_per_connection_kb', '-')} KB"
+                )
+
+                reason = self._degradation(baseline_p99, level)
+                if reason and degraded is None:
+                    degraded = {"connections": self.alive, "target_connections": target, "reason": reason}
+                    logger.warning(f"  ⚠ 出现退化: {reason}")
+                    if self.stop_on_degrade:
+                        break
+
+        for writer in self.writers:
+            writer.close()
+        for task in self.drain_tasks:
+            task.cancel()
+        await asyncio.gather(*self.drain_tasks, return_exceptions=True)
+
+        return {
+            "baseline": {"probe": baseline_probe, "server": baseline_stats},
+            "levels": levels,
+            "degraded_at": degraded,
+            "max_alive_connections": max((lvl["alive_connections"] for lvl in levels), default=0)
+        }
+
+
+def raise_client_nofile_limit():
+    """提升客户端自身的文件描述符限制"""
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < hard:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+    return resource.getrlimit(resource.RLIMIT_NOFILE)[0]
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="沙箱空闲长连接扩展测试")
+    parser.add_argument("--sandbox-id", type=str, help="使用已有沙箱（默认基于模板新建）")
+    parser.add_argument("--template", type=str, help="模板名称（默认: E2B_TEMPLATE_NAME）")
+    parser.add_argument("--url", type=str, help="直接指定服务地址（跳过沙箱，例如 http://127.0.0.1:8080）")
+    parser.add_argument("--port", type=int, default=8080, help="服务端口 (默认: 8080)")
+    parser.add_argument("--step", type=int, default=1000, help="每级新增连接数 (默认: 1000)")
+    parser.add_argument("--max-connections", type=int, default=20000, help="最大连接数 (默认: 20000)")
+    parser.add_argument("--hold", type=float, default=10.0, help="每级保持探测秒数 (默认: 10)")
+    parser.add_argument("--open-rate", type=float, default=500.0, help="建连速率 连接/秒 (默认: 500)")
+    parser.add_argument("--heartbeat", type=float, default=15.0, help="SSE 心跳间隔秒数 (默认: 15)")
+    parser.add_argument("--probe-interval", type=float, default=0.2, help="探测间隔秒数 (默认: 0.2)")
+    parser.add_argument("--latency-factor", type=float, default=3.0, help="P99 退化倍数阈值 (默认: 3)")
+    parser.add_argument("--error-threshold", type=float, default=0.01, help="错误率退化阈值 (默认: 0.01)")
+    parser.add_argument("--no-stop", action="store_true", help="出现退化后继续加压到最大连接数")
+    parser.add_argument("--keep", action="store_true", help="测试结束后保留新建的沙箱")
+    parser.add_argument("--output", type=str, default="outputs/09_idle_connections.json",
+                        help="输出文件路径 (默认: outputs/09_idle_connections.json)")
+    args = parser.parse_args()
+
+    nofile = raise_client_nofile_limit()
+    if nofile < args.max_connections + 100:
+        logger.warning(f"客户端文件描述符限制 {nofile} 低于目标连接数，请调整 ulimit -n")
+
+    sandbox = None
+    created = False
+    if args.url:
+        base_url = args.url
+    else:
+        missing_vars = [var for var in ['E2B_DOMAIN', 'E2B_API_KEY'] if var not in os.environ]
+        if missing_vars:
+            logger.error(f"缺少必需的环境变量: {', '.join(missing_vars)}")
+            logger.error("请先配置 .e2b_env 文件并运行: source .e2b_env")
+            sys.exit(1)
+        sandbox, created = open_sandbox(args.sandbox_id, args.template)
+        base_url = sandbox_url(sandbox, args.port)
+
+    logger.info("=" * 60)
+    logger.info("空闲长连接扩展测试")
+    logger.info("=" * 60)
+    logger.info(f"服务地址: {base_url}")
+    logger.info(f"每级 +{args.step} 连接，最多 {args.max_connections}，每级保持 {args.hold}s")
+
+    tester = IdleConnectionTester(
+        base_url=base_url, step=args.step, max_connections=args.max_connections,
+        hold=args.hold, open_rate=args.open_rate, heartbeat=args.heartbeat,
+        probe_interval=args.probe_interval, latency_factor=args.latency_factor,
+        error_threshold=args.error_threshold, stop_on_degrade=not args.no_stop
+    )
+    try:
+        results = asyncio.run(tester.run())
+    finally:
+        if sandbox is not None and created and not args.keep:
+            sandbox.kill()
+            logger.info("已关闭测试沙箱")
+
+    logger.info("\n统计结果:")
+    logger.info(f"  最大存活连接数: {results['max_alive_connections']}")
+    if results["degraded_at"]:
+        logger.info(f"  退化连接数: {results['degraded_at']['connections']} ⭐ ({results['degraded_at']['reason']})")
+    else:
+        logger.info("  未出现退化")
+
+    output = {
+        "test": "idle_connections",
+        "base_url": base_url,
+        "sandbox_id": sandbox.sandbox_id if sandbox is not None else None,
+        "config": vars(args),
+        "results": results,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S")
+    }
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump(output, f, indent=2, ensure_ascii=False)
+    logger.info(f"\n结果已保存到: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,358 @@
+#!/usr/bin/env python3
+"""
+沙箱集群负载目标设置与状态汇总脚本
+
+发现基于模板运行中的沙箱，通过有界连接池并发调用每个沙箱模板服务的 /load/target
+（app.py，转发到 load_controller.py 的控制 socket），批量设置 CPU / 内存 / 磁盘 / 网络目标，
+可选再发送一条 /load/control 命令；随后并发读取 /load/status，汇总为一张表。
+
+测试指标:
+- 设置目标的总耗时、单个请求耗时分布（P50/P90/P99）、失败沙箱数
+- 每个沙箱的目标与实际使用率、请求速率、接口延迟
+- 集群汇总：各资源实际值的均值 / 最小 / 最大、与目标的平均绝对误差、延迟分布
+
+环境变量 (必须通过 .e2b_env 配置):
+- E2B_DOMAIN: E2B 服务域名 (必需)
+- E2B_API_KEY: E2B API 密钥 (必需)
+- E2B_TEMPLATE_NAME: 模板名称 (可选，需包含 app.py 和 load_controller.py)
+
+使用方法:
+  source .e2b_env
+  python3 10_fleet_load.py --cpu 60 --memory 40 --disk 30 --net-rx 100 --concurrency 64
+  python3 10_fleet_load.py --cpu 20 --control '{"command": "set", "load_mode": "open"}' --settle 30
+  python3 10_fleet_load.py --status-only
+"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import statistics
+from typing import List, Dict, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.sandbox_service import disable_ssl_verification
+
+# 必须在导入网络库之前禁用 SSL 证书验证
+disable_ssl_verification()
+
+import httpx
+
+from utils.logger import get_logger
+from utils.sandbox_service import list_sandboxes, sandbox_id_url, latency_summary
+
+logger = get_logger(__name__)
+
+# 命令行参数 -> /load/target 请求体字段
+TARGET_ARGS = {
+    "cpu": "target_cpu",
+    "memory": "target_memory",
+    "disk": "target_disk",
+    "disk_iops": "target_disk_iops",
+    "disk_mbps": "target_disk_mbps",
+    "net_rx": "target_net_rx_mbps",
+    "net_tx": "target_net_tx_mbps",
+    "psi_cpu": "target_psi_cpu",
+    "psi_memory": "target_psi_memory",
+    "psi_io": "target_psi_io"
+}
+
+
+def summarize_status(status: Dict) -> Dict:
+    """从 /load/status 中提取汇总表需要的字段"""
+    latency = status.get("latency_ms") or {}
+    counted = [entry for entry in latency.values() if entry.get("count")]
+    total = sum(entry["count"] for entry in counted)
+    current_net = status.get("current_net") or {}
+    return {
+        "target_cpu": status.get("target_cpu"),
+        "current_cpu": status.get("current_cpu"),
+        "target_memory": status.get("target_memory"),
+        "current_memory": status.get("current_memory"),
+        "target_disk": status.get("target_disk"),
+        "current_disk": status.get("current_disk"),
+        "target_net_rx_mbps": status.get("target_net_rx_mbps"),
+        "net_rx_mbps": current_net.get("rx_mbps"),
+        "target_net_tx_mbps": status.get("target_net_tx_mbps"),
+        "net_tx_mbps": current_net.get("tx_mbps"),
+        "request_rate": status.get("request_rate"),
+        "total_requests": status.get("total_requests"),
+        "failed_requests": status.get("failed_requests"),
+        "paused": status.get("paused"),
+        # 各接口按请求数加权的平均延迟，以及最差接口的 P99
+        "latency_mean_ms": round(sum(e["mean"] * e["count"] for e in counted) / total, 3) if total else None,
+        "latency_max_p99_ms": max((e["p99"] for e in counted), default=None)
+    }
+
+
+class FleetLoadController:
+    """集群负载目标设置器"""
+
+    def __init__(self, urls: Dict[str, str], targets: Dict[str, float], control: Optional[Dict],
+                 concurrency: int, timeout: float):
+        """
+        初始化
+
+        Args:
+            urls: 沙箱 ID -> 模板服务地址
+            targets: /load/target 请求体（为空时只读取状态）
+            control: 设置目标后发送的 /load/control 命令（可选）
+            concurrency: 最大并发请求数（同时也是连接池大小）
+            timeout: 单个请求超时（秒）
+        """
+        self.urls = urls
+        self.targets = targets
+        self.control = control
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.semaphore = asyncio.Semaphore(concurrency)
+
+    async def _request(self, client: httpx.AsyncClient, method: str, url: str,
+                       body: Optional[Dict] = None) -> Dict:
+        """发送一次请求，返回 {ok, latency_ms, response 或 error}"""
+        async with self.semaphore:
+            start = time.perf_counter()
+            try:
+                response = await client.request(method, url, json=body)
+                latency_ms = (time.perf_counter() - start) * 1000
+                if response.status_code != 200:
+                    return {"ok": False, "latency_ms": latency_ms,
+                            "error": f"HTTP {response.status_code}: {response.text[:200]}"}
+                return {"ok": True, "latency_ms": latency_ms, "response": response.json()}
+            except Exception as e:
+                return {"ok": False, "latency_ms": (time.perf_counter() - start) * 1000,
+                        "error": f"{type(e).__name__}: {e}"}
+
+    async def _apply(self, client: httpx.AsyncClient, sandbox_id: str) -> Dict:
+        base_url = self.urls[sandbox_id].rstrip("/")
+        result = {"ok": True, "latency_ms": 0.0}
+        if self.targets:
+            result = await self._request(client, "POST", f"{base_url}/load/target", self.targets)
+            if result["ok"]:
+                result["applied_via"] = result.pop("response").get("applied_via")
+        if self.control is not None and result["ok"]:
+            control = await self._request(client, "POST", f"{base_url}/load/control", self.control)
+            result["latency_ms"] += control["latency_ms"]
+            result["control_ok"] = control["ok"]
+            if not control["ok"]:
+                result["control_error"] = control["error"]
+        return {"sandbox_id": sandbox_id, **result}
+
+    async def _status(self, client: httpx.AsyncClient, sandbox_id: str) -> Dict:
+        result = await self._request(client, "GET", f"{self.urls[sandbox_id].rstrip('/')}/load/status")
+        if result["ok"]:
+            result["status"] = summarize_status(result.pop("response"))
+        return {"sandbox_id": sandbox_id, **result}
+
+    def _client(self) -> httpx.AsyncClient:
+        limits = httpx.Limits(max_connections=self.concurrency, max_keepalive_connections=self.concurrency)
+        return httpx.AsyncClient(limits=limits, timeout=httpx.Timeout(self.timeout), verify=False)
+
+    async def apply_targets(self) -> Dict:
+        """并发向所有沙箱设置目标"""
+        async with self._client() as client:
+            start = time.perf_counter()
+            results = await asyncio.gather(*[self._apply(client, sandbox_id) for sandbox_id in self.urls])
+            elapsed = time.perf_counter() - start
+
+        failed = [r for r in results if not r["ok"] or r.get("control_ok") is False]
+        for r in failed[:5]:
+            logger.warning(f"  {r['sandbox_id']}: {r.get('error') or r.get('control_error')}")
+        return {
+            "sandboxes": len(results),
+            "succeeded": len(results) - len(failed),
+            "failed": len(failed),
+            "applied_via": {via: sum(1 for r in results if r.get("applied_via") == via)
+                            for via in ("socket", "file")},
+            "elapsed_seconds": round(elapsed, 3),
+            "latency_ms": latency_summary([r["latency_ms"] for r in results if r["ok"]]),
+            "results": results
+        }
+
+    async def gather_status(self) -> Dict:
+        """并发读取所有沙箱的 /load/status"""
+        async with self._client() as client:
+            start = time.perf_counter()
+            results = await asyncio.gather(*[self._status(client, sandbox_id) for sandbox_id in self.urls])
+            elapsed = time.perf_counter() - start
+        return {
+            "elapsed_seconds": round(elapsed, 3),
+            "failed": sum(1 for r in results if not r["ok"]),
+            "results": results
+        }
+
+
+def aggregate(rows: List[Dict]) -> Dict:
+    """按资源汇总实际值的分布和与目标的平均绝对误差"""
+    summary = {}
+    for resource, target_key, current_key in (
+        ("cpu", "target_cpu", "current_cpu"),
+        ("memory", "target_memory", "current_memory"),
+        ("disk", "target_disk", "current_disk"),
+        ("net_rx", "target_net_rx_mbps", "net_rx_mbps"),
+        ("net_tx", "target_net_tx_mbps", "net_tx_mbps")
+    ):
+        values = [row[current_key] for row in rows if row.get(current_key) is not None]
+        errors = [abs(row[current_key] - row[target_key]) for row in rows
+                  if row.get(current_key) is not None and row.get(target_key) is not None]
+        if values:
+            summary[resource] = {
+                "mean": round(statistics.mean(values), 2),
+                "min": round(min(values), 2),
+                "max": round(max(values), 2),
+                "mean_abs_error": round(statistics.mean(errors), 2) if errors else None
+            }
+    summary["request_rate_total"] = round(sum(row.get("request_rate") or 0 for row in rows), 2)
+    summary["latency_mean_ms"] = latency_summary([row["latency_mean_ms"] for row in rows
+                                                  if row.get("latency_mean_ms") is not None])
+    summary["latency_max_p99_ms"] = latency_summary([row["latency_max_p99_ms"] for row in rows
+                                                     if row.get("latency_max_p99_ms") is not None])
+    return summary
+
+
+def format_value(current, target) -> str:
+    if current is None:
+        return "-"
+    return f"{current:.1f}/{target:g}" if target is not None else f"{current:.1f}"
+
+
+def print_table(status_results: List[Dict]):
+    """打印每个沙箱一行的汇总表"""
+    logger.info(f"\n{'沙箱':<24s} {'CPU%':>11s} {'内存%':>11s} {'磁盘%':>11s} {'入向Mbps':>12s} "
+                f"{'出向Mbps':>12s} {'速率':>8s} {'均延迟ms':>9s} {'P99ms':>9s}")
+    for result in sorted(status_results, key=lambda r: r["sandbox_id"]):
+        if not result["ok"]:
+            logger.info(f"{result['sandbox_id']:<24s} 读取失败: {result['error'][:80]}")
+            continue
+        row = result["status"]
+        latency_mean = row["latency_mean_ms"]
+        latency_p99 = row["latency_max_p99_ms"]
+        logger.info(
+            f"{result['sandbox_id']:<24s} "
+            f"{format_value(row['current_cpu'], row['target_cpu']):>11s} "
+            f"{format_value(row['current_memory'], row['target_memory']):>11s} "
+            f"{format_value(row['current_disk'], row['target_disk']):>11s} "
+            f"{format_value(row['net_rx_mbps'], row['target_net_rx_mbps']):>12s} "
+            f"{format_value(row['net_tx_mbps'], row['target_net_tx_mbps']):>12s} "
+            f"{row['request_rate'] or 0:8.1f} "
+            f"{latency_mean if latency_mean is not None else 0:9.2f} "
+            f"{latency_p99 if latency_p99 is not None else 0:9.2f}"
+        )
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="沙箱集群负载目标设置与状态汇总")
+    parser.add_argument("--template", type=str, help="模板名称或 ID（默认: E2B_TEMPLATE_NAME）")
+    parser.add_argument("--sandbox-ids", type=str, help="逗号分隔的沙箱 ID（跳过按模板发现）")
+    parser.add_argument("--urls", type=str, help="逗号分隔的服务地址（跳过沙箱，例如本地调试 http://127.0.0.1:8080）")
+    parser.add_argument("--port", type=int, default=8080, help="服务端口 (默认: 8080)")
+    parser.add_argument("--limit", type=int, help="最多操作的沙箱数")
+    parser.add_argument("--cpu", type=float, help="目标 CPU 使用率（%%）")
+    parser.add_argument("--memory", type=float, help="目标内存使用率（%%）")
+    parser.add_argument("--disk", type=float, help="目标磁盘使用率（%%）")
+    parser.add_argument("--disk-iops", type=float, help="目标磁盘 IOPS（0 表示关闭）")
+    parser.add_argument("--disk-mbps", type=float, help="目标磁盘吞吐 MB/s（0 表示关闭）")
+    parser.add_argument("--net-rx", type=float, help="目标入向带宽 Mbit/s（0 表示关闭）")
+    parser.add_argument("--net-tx", type=float, help="目标出向带宽 Mbit/s（0 表示关闭）")
+    parser.add_argument("--psi-cpu", type=float, help="目标 CPU PSI 停顿占比（%%，0 表示关闭）")
+    parser.add_argument("--psi-memory", type=float, help="目标内存 PSI 停顿占比（%%，0 表示关闭）")
+    parser.add_argument("--psi-io", type=float, help="目标 IO PSI 停顿占比（%%，0 表示关闭）")
+    parser.add_argument("--control", type=str,
+                        help='设置目标后发送的 /load/control 命令（JSON），例如 \'{"command": "resume"}\'')
+    parser.add_argument("--status-only", action="store_true", help="只读取并汇总状态，不设置目标")
+    parser.add_argument("--settle", type=float, default=0.0, help="设置目标后等待多少秒再读取状态 (默认: 0)")
+    parser.add_argument("--concurrency", type=int, default=64, help="最大并发请求数 / 连接池大小 (默认: 64)")
+    parser.add_argument("--timeout", type=float, default=10.0, help="单个请求超时秒数 (默认: 10)")
+    parser.add_argument("--output", type=str, default="outputs/10_fleet_load.json",
+                        help="输出文件路径 (默认: outputs/10_fleet_load.json)")
+    args = parser.parse_args()
+
+    targets = {field: getattr(args, arg) for arg, field in TARGET_ARGS.items() if getattr(args, arg) is not None}
+    control = None
+    if args.control:
+        try:
+            control = json.loads(args.control)
+        except ValueError as e:
+            parser.error(f"--control 不是合法的 JSON: {e}")
+    if not args.status_only and not targets and control is None:
+        parser.error("至少需要一个目标参数或 --control，或使用 --status-only")
+
+    if args.urls:
+        urls = {url.strip(): url.strip() for url in args.urls.split(",") if url.strip()}
+    else:
+        missing_vars = [var for var in ['E2B_DOMAIN', 'E2B_API_KEY'] if var not in os.environ]
+        if missing_vars:
+            logger.error(f"缺少必需的环境变量: {', '.join(missing_vars)}")
+            logger.error("请先配置 .e2b_env 文件并运行: source .e2b_env")
+            sys.exit(1)
+        if args.sandbox_ids:
+            sandbox_ids = [sandbox_id.strip() for sandbox_id in args.sandbox_ids.split(",") if sandbox_id.strip()]
+        else:
+            template = args.template or os.environ.get('E2B_TEMPLATE_NAME')
+            sandbox_ids = [info.sandbox_id for info in list_sandboxes(template)]
+            logger.info(f"模板 {template or '(全部)'} 下运行中的沙箱: {len(sandbox_ids)} 个")
+        urls = {sandbox_id: sandbox_id_url(sandbox_id, args.port) for sandbox_id in sandbox_ids}
+    if args.limit:
+        urls = dict(list(urls.items())[:args.limit])
+    if not urls:
+        logger.error("没有找到可操作的沙箱")
+        sys.exit(1)
+
+    logger.info("=" * 60)
+    logger.info("沙箱集群负载目标设置")
+    logger.info("=" * 60)
+    logger.info(f"沙箱数: {len(urls)}, 并发: {args.concurrency}")
+    if not args.status_only:
+        logger.info(f"目标: {targets or '(不变)'}" + (f", 控制命令: {control}" if control else ""))
+
+    fleet = FleetLoadController(urls, targets, control, args.concurrency, args.timeout)
+    apply_results = None
+    if not args.status_only:
+        apply_results = asyncio.run(fleet.apply_targets())
+        latency = apply_results["latency_ms"]
+        logger.info(f"\n设置完成: {apply_results['succeeded']}/{apply_results['sandboxes']} 成功，"
+                    f"耗时 {apply_results['elapsed_seconds']:.2f}s "
+                    f"(socket {apply_results['applied_via']['socket']}, 文件 {apply_results['applied_via']['file']})")
+        logger.info(f"  请求 P50/P90/P99: {latency.get('p50', 0):.1f} / {latency.get('p90', 0):.1f} / "
+                    f"{latency.get('p99', 0):.1f} ms")
+        if args.settle > 0:
+            logger.info(f"等待 {args.settle:g}s 后读取状态...")
+            time.sleep(args.settle)
+
+    status_results = asyncio.run(fleet.gather_status())
+    print_table(status_results["results"])
+    rows = [result["status"] for result in status_results["results"] if result["ok"]]
+    summary = aggregate(rows)
+
+    logger.info(f"\n集群汇总（{len(rows)}/{len(urls)} 个沙箱，读取耗时 {status_results['elapsed_seconds']:.2f}s）:")
+    for resource in ("cpu", "memory", "disk", "net_rx", "net_tx"):
+        if resource in summary:
+            entry = summary[resource]
+            logger.info(f"  {resource:8s} 均值 {entry['mean']:8.2f}  最小 {entry['min']:8.2f}  最大 {entry['max']:8.2f}  "
+                        f"平均绝对误差 {entry['mean_abs_error'] if entry['mean_abs_error'] is not None else '-'}")
+    logger.info(f"  总请求速率: {summary['request_rate_total']:.1f} req/s")
+    mean_latency = summary["latency_mean_ms"]
+    logger.info(f"  沙箱平均延迟 P50/P90/最大: {mean_latency.get('p50', 0):.2f} / {mean_latency.get('p90', 0):.2f} / "
+                f"{mean_latency.get('max', 0):.2f} ms ⭐")
+
+    output = {
+        "test": "fleet_load",
+        "config": vars(args),
+        "targets": targets,
+        "control": control,
+        "apply": apply_results,
+        "status": status_results,
+        "summary": summary,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S")
+    }
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump(output, f, indent=2, ensure_ascii=False)
+    logger.info(f"\n结果已保存到: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+沙箱内模板服务（app.py）的客户端公共工具
+
+供通过沙箱公网地址访问 app.py 的测试驱动复用：
+- 禁用 SSL 证书验证（与其他客户端测试一致，必须在导入 e2b 之前调用）
+- 创建或连接沙箱，获取端口对应的公网地址
+- 按模板列出运行中的沙箱
+- 延迟统计
+
+使用方法:
+    from utils.sandbox_service import disable_ssl_verification
+    disable_ssl_verification()
+
+    from utils.sandbox_service import open_sandbox, sandbox_url, latency_summary
+"""
+
+import os
+import math
+import ssl
+import statistics
+from typing import List, Dict, Optional, Tuple
+
+
+def disable_ssl_verification():
+    """禁用所有 SSL 证书验证（自建 E2B 环境通常使用自签名证书）"""
+    os.environ['PYTHONHTTPSVERIFY'] = '0'
+    os.environ['CURL_CA_BUNDLE'] = ''
+    os.environ['REQUESTS_CA_BUNDLE'] = ''
+    os.environ['SSL_CERT_FILE'] = ''
+    os.environ['SSL_CERT_DIR'] = ''
+    os.environ['REQUESTS_VERIFY'] = 'false'
+
+    ssl._create_default_https_context = ssl._create_unverified_context
+
+    original_create_default_context = ssl.create_default_context
+
+    def _patched_create_default_context(*args, **kwargs):
+        ctx = original_create_default_context(*args, **kwargs)
+        ctx.check_hostname = False
+        ctx.verify_mode = ssl.CERT_NONE
+        return ctx
+    ssl.create_default_context = _patched_create_default_context
+
+    try:
+        import httpx
+        original_client_init = httpx.Client.__init__
+        original_async_client_init = httpx.AsyncClient.__init__
+
+        def _patched_client_init(self, *args, verify=False, **kwargs):
+            return original_client_init(self, *args, verify=False, **kwargs)
+
+        def _patched_async_client_init(self, *args, verify=False, **kwargs):
+            return original_async_client_init(self, *args, verify=False, **kwargs)
+
+        httpx.Client.__init__ = _patched_client_init
+        httpx.AsyncClient.__init__ = _patched_async_client_init
+    except (ImportError, AttributeError):
+        pass
+
+
+def insecure_ssl_context() -> ssl.SSLContext:
+    """返回不验证证书的 SSL 上下文（用于 websockets / 原始 socket 连接）"""
+    ctx = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
+    ctx.check_hostname = False
+    ctx.verify_mode = ssl.CERT_NONE
+    return ctx
+
+
+def open_sandbox(sandbox_id: Optional[str] = None, template: Optional[str] = None,
+                 timeout: int = 1800):
+    """
+    连接已有沙箱，或基于模板创建新沙箱
+
+    Args:
+        sandbox_id: 已有沙箱 ID（优先）
+        template: 模板名称或 ID，默认取 E2B_TEMPLATE_NAME
+        timeout: 新建沙箱的存活时间（秒）
+
+    Returns:
+        (sandbox, created): 沙箱实例，以及是否由本次调用创建
+    """
+    from e2b import Sandbox
+
+    if sandbox_id:
+        return Sandbox.connect(sandbox_id), False
+
+    template = template or os.environ.get('E2B_TEMPLATE_NAME')
+    if template:
+        return Sandbox(template, timeout=timeout), True
+    return Sandbox(timeout=timeout), True
+
+
+def sandbox_url(sandbox, port: int, scheme: str = "https") -> str:
+    """获取沙箱端口的公网访问地址"""
+    return f"{scheme}://{sandbox.get_host(port)}"
+
+
+def sandbox_id_url(sandbox_id: str, port: int, scheme: str = "https") -> str:
+    """按沙箱 ID 拼出端口的公网访问地址（与 Sandbox.get_host 相同规则，无需逐个连接沙箱）"""
+    return f"{scheme}://{port}-{sandbox_id}.{os.environ['E2B_DOMAIN']}"
+
+
+def list_sandboxes(template: Optional[str] = None) -> List:
+    """
+    列出运行中的沙箱
+
+    Args:
+        template: 模板名称或 ID，只返回基于该模板的沙箱；None 时返回全部
+
+    Returns:
+        SandboxInfo 列表（sandbox_id / template_id / name / metadata / started_at）
+    """
+    from e2b import Sandbox
+
+    sandboxes = Sandbox.list()
+    if template:
+        sandboxes = [info for info in sandboxes if template in (info.name, info.template_id)]
+    return sandboxes
+
+
+def percentile(sorted_values: List[float], p: float) -> float:
+    """最近秩法百分位（输入需已排序）"""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, math.ceil(p * len(sorted_values) / 100) - 1))
+    return sorted_values[index]
+
+
+def latency_summary(values_ms: List[float]) -> Dict:
+    """计算延迟统计（毫秒）"""
+    if not values_ms:
+        return {"count": 0}
+    values = sorted(values_ms)
+    return {
+        "count": len(values),
+        "min": round(values[0], 3),
+        "max": round(values[-1], 3),
+        "mean": round(statistics.mean(values), 3),
+        "stdev": round(statistics.stdev(values), 3) if len(values) > 1 else 0.0,
+        "p50": round(percentile(values, 50), 3),
+        "p90": round(percentile(values, 90), 3),
+        "p99": round(percentile(values, 99), 3),
+        "p999": round(percentile(values, 99.9), 3)
+    }
+
+
+def parse_int_list(text: str) -> List[int]:
+    """解析逗号分隔的整数列表，例如 "1,4,16" """
+    return [int(x) for x in text.split(",") if x.strip()]
+
+
+def parse_size(text: str) -> int:
+    """解析字节大小，支持 64K、16M、1G 等写法"""
+    units = {"K": 1024, "M": 1024 ** 2, "G": 1024 ** 3}
+    text = text.strip().upper().rstrip("B")
+    if text and text[-1] in units:
+        return int(float(text[:-1]) * units[text[-1]])
+    return int(text)
+
+
+def split_host(url: str) -> Tuple[str, int, bool]:
+    """把 https://host[:port] 拆分为 (host, port, use_tls)"""
+    use_tls = url.startswith("https://")
+    hostport = url.split("://", 1)[1].rstrip("/")
+    if ":" in hostport:
+        host, port = hostport.rsplit(":", 1)
+        return host, int(port), use_tls
+    return hostport, 443 if use_tls else 80, use_tls